@@ -1,14 +1,200 @@
 import os
 import time
+import queue
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from pdf_to_txt import converter_pdf_para_txt, converter_pdf_para_docx
+from pdf_to_txt import converter_pdf
+from escritores import normalizar_formatos
+from motor_ocr import MotorOCR
+from cache_conversao import CacheConversao, calcular_hash_arquivo
+from agendador_lote import AgendadorLote
+from indice_processados import IndiceProcessados, descrever_opcoes, reaproveitar_saida
+from indice_busca import abrir_indice_busca
+from metricas import registro_metricas, registrar_espera_fila, iniciar_servidor_metricas
+
+# Intervalo, em segundos, entre as gravações do arquivo de métricas
+INTERVALO_METRICAS = 15
+
+def _arquivo_liberado(caminho):
+    """Verifica se o arquivo pode ser aberto para leitura (no Windows, uma cópia em andamento o mantém bloqueado)"""
+    try:
+        with open(caminho, 'rb'):
+            return True
+    except OSError:
+        return False
+
+class FilaConversao:
+    """
+    Fila de conversões do monitor. Os eventos do watchdog apenas registram o
+    caminho; uma thread acompanha o tamanho e a data de modificação de cada
+    arquivo até que eles parem de mudar, e só então o arquivo entra em uma
+    fila limitada consumida por um pool de threads de conversão.
+
+    Eventos repetidos do mesmo arquivo são agrupados. Quando a fila está
+    cheia, a verificação de estabilidade espera, e quando há arquivos demais
+    aguardando estabilidade, quem gera os eventos também espera. Arquivos que
+    continuam vazios (cópias abortadas, arquivos reservados) saem da espera
+    depois de um tempo e só voltam com um novo evento.
+    """
+
+    def __init__(self, processar, num_workers=None, max_fila=100, max_pendentes=10000,
+                 intervalo_estabilidade=0.5, checagens_estaveis=2, tempo_maximo_vazio=60):
+        """
+        :param processar: Função chamada com o caminho de cada PDF pronto para conversão
+        :param num_workers: Número de conversões simultâneas (padrão: um por núcleo)
+        :param max_fila: Máximo de arquivos prontos aguardando conversão
+        :param max_pendentes: Máximo de arquivos aguardando o fim da cópia
+        :param intervalo_estabilidade: Intervalo, em segundos, entre as verificações de tamanho
+        :param checagens_estaveis: Verificações seguidas sem mudança para considerar a cópia concluída
+        :param tempo_maximo_vazio: Segundos que um arquivo pode ficar com zero bytes antes de deixar a espera
+        """
+        self.processar = processar
+        self.num_workers = max(1, num_workers or os.cpu_count() or 1)
+        self.max_pendentes = max_pendentes
+        self.intervalo_estabilidade = intervalo_estabilidade
+        self.checagens_estaveis = checagens_estaveis
+        self.tempo_maximo_vazio = tempo_maximo_vazio
+
+        self._fila = queue.Queue(maxsize=max_fila)
+        # Arquivos aguardando estabilidade:
+        # caminho -> [tamanho, data de modificação, checagens sem mudança, vazio desde (time.monotonic())]
+        self._pendentes = {}
+        # Arquivos estáveis que já estão na fila de conversão
+        self._enfileirados = set()
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        """Inicia a thread de verificação de estabilidade e as threads de conversão"""
+        self._parar.clear()
+        self._threads = [threading.Thread(target=self._verificar_estabilidade, daemon=True)]
+        self._threads += [threading.Thread(target=self._trabalhar, daemon=True) for _ in range(self.num_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def adicionar(self, caminho):
+        """Registra um arquivo criado ou alterado na pasta monitorada"""
+        with self._condicao:
+            if caminho in self._enfileirados:
+                return
+            if caminho in self._pendentes:
+                # O arquivo ainda está mudando: recomeça a contagem de estabilidade
+                self._pendentes[caminho][2] = 0
+                return
+            while len(self._pendentes) >= self.max_pendentes and not self._parar.is_set():
+                self._condicao.wait(self.intervalo_estabilidade)
+            self._pendentes[caminho] = [None, None, 0, None]
+
+    def _verificar_estabilidade(self):
+        while not self._parar.wait(self.intervalo_estabilidade):
+            with self._condicao:
+                caminhos = list(self._pendentes)
+
+            prontos = []
+            for caminho in caminhos:
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    info = None
+
+                with self._condicao:
+                    estado = self._pendentes.get(caminho)
+                    if estado is None:
+                        continue
+                    if info is None:
+                        # O arquivo foi removido ou renomeado antes de terminar a cópia
+                        del self._pendentes[caminho]
+                        self._condicao.notify_all()
+                        continue
+                    if info.st_size == 0:
+                        agora = time.monotonic()
+                        if estado[3] is None:
+                            estado[3] = agora
+                        elif agora - estado[3] > self.tempo_maximo_vazio:
+                            # Um arquivo vazio não conta para sempre no limite de pendentes
+                            print(f'Arquivo vazio ignorado: {caminho}')
+                            del self._pendentes[caminho]
+                            self._condicao.notify_all()
+                            continue
+                    if info.st_size > 0 and estado[:2] == [info.st_size, info.st_mtime]:
+                        estado[2] += 1
+                    else:
+                        estado[:] = [info.st_size, info.st_mtime, 0, estado[3] if info.st_size == 0 else None]
+                    if estado[2] >= self.checagens_estaveis:
+                        prontos.append(caminho)
+
+            for caminho in prontos:
+                if not _arquivo_liberado(caminho):
+                    continue
+                with self._condicao:
+                    del self._pendentes[caminho]
+                    self._enfileirados.add(caminho)
+                    self._condicao.notify_all()
+                # Espera enquanto a fila de conversão estiver cheia
+                while not self._parar.is_set():
+                    try:
+                        self._fila.put((caminho, time.monotonic()), timeout=self.intervalo_estabilidade)
+                        break
+                    except queue.Full:
+                        pass
+
+    def _trabalhar(self):
+        while True:
+            item = self._fila.get()
+            caminho = item[0] if item else None
+            try:
+                if item is None:
+                    return
+                registrar_espera_fila('monitor', time.monotonic() - item[1], caminho)
+                with self._condicao:
+                    self._enfileirados.discard(caminho)
+                self.processar(caminho)
+            except Exception as e:
+                print(f'Erro ao processar {caminho}: {str(e)}')
+            finally:
+                self._fila.task_done()
+
+    def tamanho(self):
+        """Retorna quantos arquivos aguardam estabilidade e quantos aguardam conversão"""
+        with self._condicao:
+            return len(self._pendentes), self._fila.qsize()
+
+    def atualizar_metricas(self):
+        """Publica o tamanho atual das filas no registro de métricas"""
+        pendentes, prontos = self.tamanho()
+        registro_metricas.definir('conversor_fila_tamanho', pendentes, fila='estabilidade')
+        registro_metricas.definir('conversor_fila_tamanho', prontos, fila='conversao')
+
+    def parar(self):
+        """Interrompe a fila depois que as conversões em andamento terminam"""
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+        for _ in range(self.num_workers):
+            self._fila.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
 
 class PDFHandler(FileSystemEventHandler):
-    def __init__(self, pasta_saida, formato_saida='txt', usar_ocr=False):
+    def __init__(self, pasta_saida, formato_saida='txt', usar_ocr=False, motor_ocr=None, cache=None,
+                 num_workers=None, indice=None, indice_busca=None):
         self.pasta_saida = pasta_saida
-        self.formato_saida = formato_saida
+        self.formatos = normalizar_formatos(formato_saida)
         self.usar_ocr = usar_ocr
+        self.motor_ocr = motor_ocr
+        self.cache = cache
+        self.indice = indice
+        self.indice_busca = indice_busca
+        # Os eventos só registram o arquivo; a conversão acontece nas threads da fila
+        self.fila = FilaConversao(self.processar_pdf, num_workers)
+        # Arquivos do mesmo tamanho são processados um de cada vez, para que uma cópia
+        # que chega junto com o original encontre a saída dele no índice:
+        # tamanho -> [trava, threads usando a trava]
+        self._travas_tamanho = {}
+        self._lock_travas = threading.Lock()
 
     def on_created(self, event):
         if event.is_directory:
@@ -16,38 +202,234 @@ class PDFHandler(FileSystemEventHandler):
         
         if event.src_path.lower().endswith('.pdf'):
             print(f'\nNovo arquivo PDF detectado: {event.src_path}')
-            # Aguarda um momento para garantir que o arquivo foi completamente copiado
-            time.sleep(1)
-            self.processar_pdf(event.src_path)
+            self.fila.adicionar(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+
+        # Programas de cópia costumam gravar em um nome temporário e renomear no final
+        if event.dest_path.lower().endswith('.pdf'):
+            print(f'\nNovo arquivo PDF detectado: {event.dest_path}')
+            self.fila.adicionar(event.dest_path)
 
     def processar_pdf(self, caminho_pdf):
         """Processa um arquivo PDF"""
-        nome_arquivo = os.path.basename(caminho_pdf)
-        caminho_saida = os.path.join(self.pasta_saida, os.path.splitext(nome_arquivo)[0] + '.' + self.formato_saida)
-        
-        if self.formato_saida == 'txt':
-            converter_pdf_para_txt(caminho_pdf, caminho_saida, self.usar_ocr)
-        else:  # docx
-            converter_pdf_para_docx(caminho_pdf, caminho_saida, self.usar_ocr)
+        info = os.stat(caminho_pdf)
+        with self._lock_travas:
+            trava = self._travas_tamanho.setdefault(info.st_size, [threading.Lock(), 0])
+            trava[1] += 1
+        try:
+            with trava[0]:
+                return self._processar_pdf(caminho_pdf, info)
+        finally:
+            with self._lock_travas:
+                trava[1] -= 1
+                if not trava[1]:
+                    del self._travas_tamanho[info.st_size]
+
+    def _processar_pdf(self, caminho_pdf, info):
+        opcoes = descrever_opcoes(self.formatos, self.usar_ocr)
+        # Um PDF convertido antes de o índice de busca existir é convertido de novo (pelo cache) para ser indexado
+        indexar = self.indice_busca is not None and self.indice_busca.precisa_indexar(caminho_pdf, info)
+        if self.indice is not None and not indexar and not self.indice.precisa_converter(caminho_pdf, info, opcoes):
+            print(f'Arquivo já convertido anteriormente: {caminho_pdf}')
+            return None
+
+        nome_arquivo = os.path.splitext(os.path.basename(caminho_pdf))[0]
+        caminhos_saida = {formato: os.path.join(self.pasta_saida, nome_arquivo + '.' + formato)
+                          for formato in self.formatos}
+        caminho_saida = caminhos_saida[self.formatos[0]]
 
-def processar_pdfs_existentes(pasta_entrada, pasta_saida, formato_saida, usar_ocr):
-    """Processa todos os PDFs existentes na pasta de entrada"""
+        # Um PDF com o mesmo conteúdo de outro já convertido reusa as saídas existentes
+        hash_arquivo = None
+        if self.indice is not None:
+            saida_existente, hash_arquivo = self.indice.buscar_conteudo(caminho_pdf, info, opcoes)
+            if saida_existente is not None and _reaproveitar(saida_existente, caminhos_saida):
+                print(f'Conteúdo idêntico a {os.path.basename(saida_existente)}: {caminho_saida}')
+                self.indice.registrar(caminho_pdf, info, caminho_saida, opcoes, hash_arquivo)
+                # As páginas do PDF original são copiadas no índice de busca
+                if not indexar or self.indice_busca.copiar_documento(saida_existente, caminho_pdf, info,
+                                                                     caminho_saida, hash_arquivo):
+                    return caminhos_saida
+
+        documento_indice = None
+        if indexar:
+            documento_indice = self.indice_busca.iniciar_documento(caminho_pdf, info, caminho_saida, hash_arquivo)
+
+        # Uma única extração (e um único OCR) grava todos os formatos
+        estatisticas = {}
+        resultado = converter_pdf(caminho_pdf, caminhos_saida, self.usar_ocr, self.motor_ocr, cache=self.cache,
+                                  retomar=True, estatisticas=estatisticas,
+                                  ao_concluir_pagina=documento_indice.adicionar_pagina if indexar else None)
+
+        if documento_indice is not None:
+            if resultado:
+                documento_indice.concluir(not estatisticas.get('paginas_sem_ocr'))
+            else:
+                documento_indice.descartar()
+        # Com páginas que ficaram sem OCR, o PDF não é registrado e é convertido de novo na próxima vez
+        if resultado and self.indice is not None and not estatisticas.get('paginas_sem_ocr'):
+            self.indice.registrar(caminho_pdf, info, caminho_saida, opcoes, hash_arquivo)
+        return resultado
+
+def _reaproveitar(saida_existente, caminhos_saida):
+    """
+    Cria as saídas de um PDF duplicado a partir das saídas já convertidas e
+    conta nas métricas. O índice guarda a saída do primeiro formato; as dos
+    outros formatos têm o mesmo nome com outra extensão.
+    :param saida_existente: Saída do primeiro formato do PDF já convertido
+    :param caminhos_saida: Dicionário formato -> arquivo a ser criado
+    :return: 'link' ou 'copia', ou None se alguma das saídas anteriores não existir mais
+    """
+    base = os.path.splitext(saida_existente)[0]
+    origens = {formato: f'{base}.{formato}' for formato in caminhos_saida}
+    if not all(os.path.exists(origem) for origem in origens.values()):
+        return None
+    modos = {reaproveitar_saida(origens[formato], caminho) for formato, caminho in caminhos_saida.items()}
+    modo = 'copia' if 'copia' in modos else 'link'
+    registro_metricas.incrementar('conversor_duplicados_total', modo=modo)
+    return modo
+
+def _separar_duplicados(arquivos, indice, opcoes, agendador, indice_busca=None):
+    """
+    Separa os PDFs do lote cujo conteúdo já foi convertido ou se repete no
+    próprio lote. Os já convertidos reusam as saídas na hora; das cópias
+    repetidas no lote, apenas a primeira é convertida.
+    :param arquivos: Dicionário caminho -> stat dos PDFs a converter (os duplicados são removidos)
+    :param agendador: AgendadorLote que define os arquivos de saída de cada PDF
+    :param indice_busca: IndiceBusca onde as páginas do PDF original são copiadas (opcional)
+    :return: Tupla (cópias por PDF convertido: caminho -> [caminhos], hashes calculados: caminho -> hash)
+    """
+    hashes = {}
+    por_tamanho = {}
+    for caminho, info in list(arquivos.items()):
+        saida_existente, hash_arquivo = indice.buscar_conteudo(caminho, info, opcoes)
+        if hash_arquivo:
+            hashes[caminho] = hash_arquivo
+        if saida_existente is not None and _reaproveitar(saida_existente, agendador.caminhos_saida(caminho)):
+            indice.registrar(caminho, info, agendador.caminho_saida(caminho), opcoes, hash_arquivo)
+            # Sem as páginas do original no índice de busca, o PDF é convertido para ser indexado
+            if indice_busca is None or indice_busca.copiar_documento(saida_existente, caminho, info,
+                                                                     agendador.caminho_saida(caminho), hash_arquivo):
+                del arquivos[caminho]
+                continue
+        por_tamanho.setdefault(info.st_size, []).append(caminho)
+
+    # Só arquivos com o mesmo tamanho de outro do lote têm o hash calculado
+    copias = {}
+    for caminhos in por_tamanho.values():
+        if len(caminhos) < 2:
+            continue
+        primeiros = {}
+        for caminho in caminhos:
+            if caminho not in hashes:
+                hashes[caminho] = calcular_hash_arquivo(caminho)
+            primeiro = primeiros.setdefault(hashes[caminho], caminho)
+            if primeiro != caminho:
+                copias.setdefault(primeiro, []).append(caminho)
+    return copias, hashes
+
+def processar_pdfs_existentes(pasta_entrada, pasta_saida, formato_saida, usar_ocr, motor_ocr=None, cache=None,
+                              indice=None, indice_busca=None):
+    """
+    Processa os PDFs da pasta de entrada, vários ao mesmo tempo. Com um índice
+    de arquivos processados, apenas os PDFs novos ou alterados são convertidos.
+    Com um índice de busca, os PDFs que ainda não estão nele também são
+    convertidos (o cache evita uma nova extração) para serem indexados.
+    """
     print('\nProcessando PDFs existentes...')
-    for arquivo in os.listdir(pasta_entrada):
-        if arquivo.lower().endswith('.pdf'):
-            caminho_pdf = os.path.join(pasta_entrada, arquivo)
-            print(f'\nProcessando: {arquivo}')
-            handler = PDFHandler(pasta_saida, formato_saida, usar_ocr)
-            handler.processar_pdf(caminho_pdf)
-
-def monitorar_pasta(pasta_entrada, pasta_saida, formato_saida='txt', usar_ocr=False):
+    formatos = normalizar_formatos(formato_saida)
+    opcoes = descrever_opcoes(formatos, usar_ocr)
+
+    # O stat de cada arquivo é feito uma única vez e reaproveitado no registro do índice
+    arquivos = {}
+    with os.scandir(pasta_entrada) as entradas:
+        for entrada in entradas:
+            if not entrada.name.lower().endswith('.pdf') or not entrada.is_file():
+                continue
+            info = entrada.stat()
+            if indice is not None and not indice.precisa_converter(entrada.path, info, opcoes):
+                if indice_busca is None or not indice_busca.precisa_indexar(entrada.path, info):
+                    continue
+            arquivos[entrada.path] = info
+
+    print(f'{len(arquivos)} arquivo(s) novo(s) ou alterado(s) para converter.')
+    if not arquivos:
+        return
+
+    def concluir_arquivo(resultado):
+        print(f'\n{"Concluído" if resultado["sucesso"] else "Falhou"}: {os.path.basename(resultado["arquivo"])}')
+        if indice is None:
+            return
+        caminho = resultado['arquivo']
+        if not resultado['sucesso']:
+            # As cópias que esperavam por este PDF são convertidas na próxima rodada
+            if caminho in copias:
+                orfas.append(copias.pop(caminho))
+            return
+        # Com páginas que ficaram sem OCR, as saídas existem mas o PDF não é registrado como processado
+        completo = not resultado['paginas_sem_ocr']
+        if completo:
+            indice.registrar(caminho, arquivos[caminho], resultado['saida'], opcoes, hashes.get(caminho))
+        for copia in copias.get(caminho, ()):
+            _reaproveitar(resultado['saida'], agendador.caminhos_saida(copia))
+            if completo:
+                indice.registrar(copia, info_copias[copia], agendador.caminho_saida(copia), opcoes, hashes[caminho])
+            if indice_busca is not None:
+                indice_busca.copiar_documento(resultado['saida'], copia, info_copias[copia],
+                                              agendador.caminho_saida(copia), hashes[caminho])
+
+    agendador = AgendadorLote(
+        pasta_saida,
+        formatos,
+        usar_ocr,
+        motor_ocr,
+        cache,
+        ao_concluir_arquivo=concluir_arquivo,
+        indice_busca=indice_busca
+    )
+
+    copias, hashes, info_copias = {}, {}, {}
+    orfas = []
+    if indice is not None:
+        total = len(arquivos)
+        copias, hashes = _separar_duplicados(arquivos, indice, opcoes, agendador, indice_busca)
+        info_copias = {copia: arquivos.pop(copia) for lista in copias.values() for copia in lista}
+        if len(arquivos) < total:
+            print(f'{total - len(arquivos)} arquivo(s) com conteúdo idêntico a outro não serão convertidos de novo.')
+        if not arquivos:
+            return
+
+    resultados = agendador.executar(list(arquivos))
+    # Quando o original de um grupo de cópias falha, a cópia seguinte é convertida no lugar dele
+    while orfas:
+        originais = []
+        for original, *restantes in orfas:
+            arquivos[original] = info_copias.pop(original)
+            if restantes:
+                copias[original] = restantes
+            originais.append(original)
+        orfas.clear()
+        resultados += agendador.executar(originais)
+    falhas = sum(1 for resultado in resultados if not resultado['sucesso'])
+    print(f'\n{len(resultados) - falhas} arquivo(s) convertido(s), {falhas} falha(s).')
+
+def monitorar_pasta(pasta_entrada, pasta_saida, formato_saida='txt', usar_ocr=False, ocr_workers=None,
+                    arquivo_metricas=None, porta_metricas=None):
     """
     Monitora uma pasta para converter PDFs automaticamente
     :param pasta_entrada: Pasta onde os PDFs serão colocados
     :param pasta_saida: Pasta onde os arquivos convertidos serão salvos
-    :param formato_saida: Formato de saída ('txt' ou 'docx')
+    :param formato_saida: Formato de saída ('txt', 'docx' ou 'jsonl') ou um conjunto de formatos,
+                          como {'docx', 'jsonl'}, gerados juntos com uma única extração de cada PDF
     :param usar_ocr: Se True, usa OCR para extrair texto de imagens
+    :param ocr_workers: Número de processos de OCR (padrão: um por núcleo)
+    :param arquivo_metricas: Arquivo regravado periodicamente com as métricas no formato do Prometheus (opcional)
+    :param porta_metricas: Porta local em que as métricas são servidas em /metrics (opcional)
     """
+    formatos = normalizar_formatos(formato_saida)
+    descricao_formatos = ', '.join(formato.upper() for formato in formatos)
     # Cria as pastas se não existirem
     os.makedirs(pasta_entrada, exist_ok=True)
     os.makedirs(pasta_saida, exist_ok=True)
@@ -55,29 +437,60 @@ def monitorar_pasta(pasta_entrada, pasta_saida, formato_saida='txt', usar_ocr=Fa
     print(f'=== Monitor de PDF ===')
     print(f'Pasta de entrada: {pasta_entrada}')
     print(f'Pasta de saída: {pasta_saida}')
-    print(f'Formato de saída: {formato_saida.upper()}')
+    print(f'Formato de saída: {descricao_formatos}')
     print(f'OCR: {"Ativado" if usar_ocr else "Desativado"}')
     print('\nColoque seus arquivos PDF na pasta de entrada.')
-    print(f'Os arquivos {formato_saida.upper()} serão gerados automaticamente na pasta de saída.')
+    print(f'Os arquivos {descricao_formatos} serão gerados automaticamente na pasta de saída.')
     print('Pressione Ctrl+C para encerrar o programa.\n')
 
-    # Processa PDFs existentes
-    processar_pdfs_existentes(pasta_entrada, pasta_saida, formato_saida, usar_ocr)
+    # O pool de OCR e o cache de conversões são compartilhados por todas as conversões do monitor
+    motor_ocr = MotorOCR(ocr_workers)
+    cache = CacheConversao()
+    indice = IndiceProcessados(pasta_saida)
+    # Índice de busca do texto convertido, atualizado página a página
+    indice_busca = abrir_indice_busca(pasta_saida)
+
+    servidor_metricas = None
+    if porta_metricas:
+        servidor_metricas = iniciar_servidor_metricas(porta_metricas)
+        print(f'Métricas disponíveis em http://127.0.0.1:{porta_metricas}/metrics')
+
+    # Processa PDFs novos ou alterados desde a última execução
+    processar_pdfs_existentes(pasta_entrada, pasta_saida, formatos, usar_ocr, motor_ocr, cache, indice, indice_busca)
 
     # Configura o observador
-    event_handler = PDFHandler(pasta_saida, formato_saida, usar_ocr)
+    event_handler = PDFHandler(pasta_saida, formatos, usar_ocr, motor_ocr, cache, indice=indice,
+                               indice_busca=indice_busca)
+    event_handler.fila.iniciar()
     observer = Observer()
     observer.schedule(event_handler, pasta_entrada, recursive=False)
     observer.start()
 
     try:
+        ultima_gravacao = time.monotonic()
         while True:
             time.sleep(1)
+            event_handler.fila.atualizar_metricas()
+            if arquivo_metricas and time.monotonic() - ultima_gravacao >= INTERVALO_METRICAS:
+                registro_metricas.gravar_prometheus(arquivo_metricas)
+                ultima_gravacao = time.monotonic()
     except KeyboardInterrupt:
         observer.stop()
         print('\nPrograma encerrado.')
     
     observer.join()
+    event_handler.fila.parar()
+    motor_ocr.encerrar()
+    indice.fechar()
+    if indice_busca is not None:
+        indice_busca.fechar()
+    event_handler.fila.atualizar_metricas()
+    if arquivo_metricas:
+        registro_metricas.gravar_prometheus(arquivo_metricas)
+    if servidor_metricas is not None:
+        servidor_metricas.shutdown()
+    estatisticas = cache.estatisticas()
+    print(f'Cache de conversões: {estatisticas["acertos"]} acertos, {estatisticas["falhas"]} falhas')
 
 if __name__ == '__main__':
     # Define as pastas padrão
@@ -87,15 +500,15 @@ if __name__ == '__main__':
     print('=== Monitor de PDF ===')
     print('1. Converter para TXT')
     print('2. Converter para DOCX')
-    opcao = input('Escolha o formato de saída (1 ou 2): ').strip()
-    
-    if opcao == '1':
-        formato_saida = 'txt'
-    elif opcao == '2':
-        formato_saida = 'docx'
-    else:
+    print('3. Converter para JSONL (texto com a posição das palavras reconhecidas pelo OCR)')
+    opcao = input('Escolha os formatos de saída (por exemplo 1 ou 1,3): ').strip()
+
+    opcoes_formato = {'1': 'txt', '2': 'docx', '3': 'jsonl'}
+    escolhas = [escolha.strip() for escolha in opcao.split(',') if escolha.strip()]
+    if not escolhas or any(escolha not in opcoes_formato for escolha in escolhas):
         print('Opção inválida!')
         exit(1)
+    formato_saida = {opcoes_formato[escolha] for escolha in escolhas}
     
     # Pergunta se deseja usar OCR
     usar_ocr = input('Deseja usar OCR para extrair texto de imagens? (s/n): ').strip().lower() == 's'
@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pdf_to_txt import converter_pdf
+from escritores import normalizar_formatos
+from metricas import registrar_espera_fila
+
+# Peso relativo de uma página com OCR em relação a uma página com camada de texto
+PESO_PAGINA_OCR = 20
+
+def tamanho_arquivo(caminho_pdf):
+    """
+    Tamanho do PDF em bytes, usado para estimar o custo sem interpretar o arquivo
+    :return: Tamanho ou 0 se o arquivo não puder ser lido
+    """
+    try:
+        return os.path.getsize(caminho_pdf)
+    except OSError:
+        return 0
+
+class AgendadorLote:
+    """
+    Converte vários PDFs ao mesmo tempo em um pool limitado de threads.
+    Os documentos mais caros (tamanho x peso do OCR) começam primeiro, para
+    que o lote não termine esperando por um único arquivo grande. Uma falha
+    afeta apenas o arquivo em que ocorreu, e o progresso é contado por página:
+    o total cresce à medida que cada documento é aberto pela sua conversão.
+
+    As threads dividem o mesmo MotorOCR, então o OCR de todos os documentos
+    continua limitado ao número de processos do motor.
+    """
+
+    def __init__(self, pasta_saida, formato_saida='txt', usar_ocr=False, motor_ocr=None, cache=None,
+                 retomar=True, max_documentos=None, ao_progresso=None, ao_concluir_arquivo=None, extrator='auto',
+                 perfil=None, paginas=None, max_caracteres=None, indice_busca=None):
+        """
+        :param pasta_saida: Pasta onde os arquivos convertidos serão salvos (None: ao lado de cada PDF)
+        :param formato_saida: Formato de saída ('txt', 'docx' ou 'jsonl') ou um conjunto de formatos,
+                              todos gerados com uma única extração de cada PDF
+        :param usar_ocr: Se True, usa OCR em todas as páginas
+        :param motor_ocr: MotorOCR compartilhado pelos documentos (opcional)
+        :param cache: CacheConversao compartilhado pelos documentos (opcional)
+        :param retomar: Se True, retoma conversões interrompidas pelo diário de páginas
+        :param max_documentos: Máximo de documentos convertidos ao mesmo tempo (padrão: um por núcleo)
+        :param ao_progresso: Função chamada com (páginas concluídas, total de páginas, segundos restantes)
+        :param ao_concluir_arquivo: Função chamada com o resultado de cada arquivo
+        :param extrator: Extrator da camada de texto (nome registrado em extratores_texto ou 'auto')
+        :param perfil: 'cpu' ou 'memoria' para gravar um relatório de perfil ao lado de cada saída;
+                       os documentos passam a ser convertidos um de cada vez
+        :param paginas: Páginas convertidas em cada documento, como '1-3,10-' ou os intervalos de
+                        interpretar_paginas() (padrão: todas)
+        :param max_caracteres: Encerra cada conversão quando o texto gravado atinge esse total (opcional)
+        :param indice_busca: IndiceBusca que recebe as páginas de cada PDF novo ou alterado (opcional)
+        """
+        self.pasta_saida = pasta_saida
+        self.formatos = normalizar_formatos(formato_saida)
+        self.usar_ocr = usar_ocr
+        self.motor_ocr = motor_ocr
+        self.cache = cache
+        self.retomar = retomar
+        # Conversões simultâneas misturariam as medidas dos perfis
+        self.max_documentos = 1 if perfil else max(1, max_documentos or os.cpu_count() or 1)
+        self.ao_progresso = ao_progresso
+        self.ao_concluir_arquivo = ao_concluir_arquivo
+        self.extrator = extrator
+        self.perfil = perfil
+        self.paginas = paginas
+        self.max_caracteres = max_caracteres
+        self.indice_busca = indice_busca
+
+        self._lock = threading.Lock()
+        self._paginas_concluidas = {}
+        self._paginas_previstas = {}
+        self._concluidas = 0
+        self._total_paginas = 0
+        self._inicio = None
+
+    def estimar_custo(self, tamanho):
+        """Estima o custo relativo de converter um documento com o tamanho em bytes informado"""
+        return tamanho * (PESO_PAGINA_OCR if self.usar_ocr else 1)
+
+    def caminhos_saida(self, caminho_pdf):
+        """
+        Retorna os arquivos convertidos de um PDF (sem pasta de saída, ao lado do PDF)
+        :return: Dicionário formato -> caminho
+        """
+        nome_arquivo = os.path.splitext(os.path.basename(caminho_pdf))[0]
+        pasta_saida = self.pasta_saida or os.path.dirname(caminho_pdf)
+        return {formato: os.path.join(pasta_saida, nome_arquivo + '.' + formato) for formato in self.formatos}
+
+    def caminho_saida(self, caminho_pdf):
+        """Retorna o arquivo convertido de um PDF no primeiro dos formatos de saída"""
+        return self.caminhos_saida(caminho_pdf)[self.formatos[0]]
+
+    def executar(self, arquivos):
+        """
+        Converte uma lista de PDFs
+        :param arquivos: Caminhos dos arquivos PDF
+        :return: Lista de resultados (dicionários) na ordem dos arquivos recebidos, sem repetições
+        """
+        if self.pasta_saida:
+            os.makedirs(self.pasta_saida, exist_ok=True)
+        arquivos = list(dict.fromkeys(arquivos))
+        self._paginas_concluidas = {arquivo: 0 for arquivo in arquivos}
+        self._paginas_previstas = {arquivo: 0 for arquivo in arquivos}
+        self._concluidas = 0
+        self._total_paginas = 0
+        self._inicio = time.monotonic()
+
+        # Os documentos mais caros entram primeiro no pool; cada PDF só é interpretado pela sua conversão
+        ordem = sorted(arquivos, key=lambda arquivo: self.estimar_custo(tamanho_arquivo(arquivo)), reverse=True)
+
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=self.max_documentos) as executor:
+            futuros = {executor.submit(self._converter_arquivo, arquivo): arquivo for arquivo in ordem}
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados[futuros[futuro]] = resultado
+                if self.ao_concluir_arquivo is not None:
+                    self.ao_concluir_arquivo(resultado)
+
+        return [resultados[arquivo] for arquivo in arquivos]
+
+    def _converter_arquivo(self, caminho_pdf):
+        """Converte um único arquivo, isolando qualquer falha no seu próprio resultado"""
+        inicio = time.monotonic()
+        # Tempo que o arquivo esperou por uma thread livre do pool
+        espera = inicio - self._inicio
+        registrar_espera_fila('lote', espera, caminho_pdf)
+        caminhos_saida = self.caminhos_saida(caminho_pdf)
+        estatisticas = {}
+        erro = None
+        documento_indice = None
+        try:
+            # As páginas entram no índice de busca à medida que são gravadas
+            if self.indice_busca is not None and self.indice_busca.precisa_indexar(caminho_pdf, None, self.paginas,
+                                                                                    self.max_caracteres):
+                documento_indice = self.indice_busca.iniciar_documento(
+                    caminho_pdf, saida=caminhos_saida[self.formatos[0]], paginas=self.paginas,
+                    max_caracteres=self.max_caracteres)
+            saidas = converter_pdf(
+                caminho_pdf,
+                caminhos_saida,
+                self.usar_ocr,
+                self.motor_ocr,
+                cache=self.cache,
+                retomar=self.retomar,
+                progresso=lambda numero: self._registrar_progresso(caminho_pdf, numero,
+                                                                   estatisticas.get('paginas_previstas')),
+                estatisticas=estatisticas,
+                extrator=self.extrator,
+                perfil=self.perfil,
+                paginas=self.paginas,
+                max_caracteres=self.max_caracteres,
+                ao_concluir_pagina=documento_indice.adicionar_pagina if documento_indice is not None else None
+            )
+            if not saidas:
+                erro = 'Não foi possível converter o arquivo'
+        except Exception as e:
+            erro = str(e)
+        if documento_indice is not None:
+            if erro is None:
+                # Páginas que ficaram sem OCR fazem o PDF ser indexado de novo na próxima conversão
+                documento_indice.concluir(not estatisticas.get('paginas_sem_ocr'))
+            else:
+                documento_indice.descartar()
+
+        # Um arquivo que falhou ou parou no limite de caracteres não deixa páginas pendentes no total
+        paginas = estatisticas.get('paginas', 0)
+        self._registrar_progresso(caminho_pdf, paginas, paginas)
+
+        return {
+            'arquivo': caminho_pdf,
+            'saida': caminhos_saida[self.formatos[0]] if erro is None else None,
+            'saidas': caminhos_saida if erro is None else {},
+            'sucesso': erro is None,
+            'erro': erro,
+            'paginas': paginas,
+            'paginas_ocr': estatisticas.get('paginas_ocr', 0),
+            'paginas_sem_ocr': estatisticas.get('paginas_sem_ocr', 0),
+            'paginas_retomadas': estatisticas.get('paginas_retomadas', 0),
+            'cache': estatisticas.get('cache', False),
+            'duracao': time.monotonic() - inicio,
+            'espera': espera,
+        }
+
+    def _registrar_progresso(self, caminho_pdf, paginas_concluidas, paginas_previstas=None):
+        with self._lock:
+            anteriores = self._paginas_concluidas[caminho_pdf]
+            if paginas_concluidas > anteriores:
+                self._paginas_concluidas[caminho_pdf] = paginas_concluidas
+                self._concluidas += paginas_concluidas - anteriores
+            # Sem a previsão (por exemplo, com o texto vindo do cache), contam as páginas já concluídas
+            previstas = self._paginas_previstas[caminho_pdf]
+            if paginas_previstas is None:
+                paginas_previstas = previstas
+            paginas_previstas = max(paginas_previstas, self._paginas_concluidas[caminho_pdf])
+            self._paginas_previstas[caminho_pdf] = paginas_previstas
+            self._total_paginas += paginas_previstas - previstas
+            concluidas = self._concluidas
+            total = self._total_paginas
+
+        if self.ao_progresso is None:
+            return
+        decorrido = time.monotonic() - self._inicio
+        restante = None
+        if concluidas:
+            restante = decorrido / concluidas * (total - concluidas)
+        self.ao_progresso(concluidas, total, restante)
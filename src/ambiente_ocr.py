@@ -0,0 +1,133 @@
+import os
+import sys
+import glob
+import shutil
+import subprocess
+import threading
+
+# Variáveis de ambiente que permitem indicar os caminhos manualmente
+VARIAVEL_TESSERACT = 'TESSERACT_CMD'
+VARIAVEL_POPPLER = 'POPPLER_PATH'
+VARIAVEL_TESSDATA = 'TESSDATA_PREFIX'
+
+def _pasta_executavel():
+    """Pasta do executável empacotado pelo PyInstaller ou a raiz do projeto"""
+    return getattr(sys, '_MEIPASS', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _candidatos_tesseract():
+    """Locais comuns de instalação do Tesseract, na ordem em que são testados"""
+    if os.environ.get(VARIAVEL_TESSERACT):
+        yield os.environ[VARIAVEL_TESSERACT]
+
+    encontrado = shutil.which('tesseract')
+    if encontrado:
+        yield encontrado
+
+    if sys.platform == 'win32':
+        yield os.path.join(_pasta_executavel(), 'Tesseract-OCR', 'tesseract.exe')
+        yield r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        yield r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe'
+        yield os.path.expanduser('~\\AppData\\Local\\Programs\\Tesseract-OCR\\tesseract.exe')
+        yield from glob.glob(os.path.expanduser('~\\AppData\\Local\\Programs\\Python\\Python3*\\Scripts\\tesseract.exe'))
+        yield from glob.glob(os.path.expanduser(
+            '~\\AppData\\Local\\Packages\\PythonSoftwareFoundation.Python.3*\\LocalCache'
+            '\\local-packages\\Python3*\\Scripts\\tesseract.exe'
+        ))
+    else:
+        yield '/usr/bin/tesseract'
+        yield '/usr/local/bin/tesseract'
+        yield '/opt/homebrew/bin/tesseract'
+
+def _candidatos_poppler():
+    """Pastas comuns dos executáveis do Poppler (None: os executáveis estão no PATH)"""
+    if os.environ.get(VARIAVEL_POPPLER):
+        yield os.environ[VARIAVEL_POPPLER]
+
+    if shutil.which('pdftoppm'):
+        yield None
+
+    if sys.platform == 'win32':
+        yield os.path.join(_pasta_executavel(), 'poppler')
+        yield r'C:\Program Files\poppler\Library\bin'
+    else:
+        yield '/usr/bin'
+        yield '/usr/local/bin'
+        yield '/opt/homebrew/bin'
+
+def _listar_idiomas(tesseract_cmd):
+    """Lista os idiomas instalados consultando o próprio Tesseract, ou as pastas tessdata conhecidas"""
+    try:
+        resultado = subprocess.run(
+            [tesseract_cmd, '--list-langs'],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        # A primeira linha é um cabeçalho ("List of available languages ...")
+        linhas = (resultado.stdout or resultado.stderr).splitlines()[1:]
+        idiomas = {linha.strip() for linha in linhas if linha.strip()}
+        if idiomas:
+            return idiomas
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+    pastas = [os.path.join(os.path.dirname(tesseract_cmd), 'tessdata')]
+    if os.environ.get(VARIAVEL_TESSDATA):
+        pastas.insert(0, os.environ[VARIAVEL_TESSDATA])
+    pastas += glob.glob('/usr/share/tesseract-ocr/*/tessdata') + ['/usr/share/tessdata', '/usr/local/share/tessdata']
+    idiomas = set()
+    for pasta in pastas:
+        for arquivo in glob.glob(os.path.join(pasta, '*.traineddata')):
+            idiomas.add(os.path.splitext(os.path.basename(arquivo))[0])
+    return idiomas
+
+class AmbienteOCR:
+    """Ferramentas de OCR encontradas nesta máquina"""
+
+    def __init__(self, tesseract_cmd=None, poppler_path=None, poppler_disponivel=False, idiomas=()):
+        """
+        :param tesseract_cmd: Caminho do executável do Tesseract (None se não encontrado)
+        :param poppler_path: Pasta dos executáveis do Poppler (None se estiverem no PATH)
+        :param poppler_disponivel: Se o Poppler foi encontrado
+        :param idiomas: Idiomas instalados no Tesseract
+        """
+        self.tesseract_cmd = tesseract_cmd
+        self.poppler_path = poppler_path
+        self.poppler_disponivel = poppler_disponivel
+        self.idiomas = set(idiomas)
+
+    def idioma_disponivel(self, idioma):
+        """Verifica se todos os idiomas de uma combinação como 'por+eng' estão instalados"""
+        return all(parte in self.idiomas for parte in idioma.split('+'))
+
+def descobrir_ambiente_ocr():
+    """Procura o Tesseract, o Poppler e os idiomas instalados (sem usar o cache)"""
+    tesseract_cmd = next((c for c in _candidatos_tesseract() if c and os.path.isfile(c)), None)
+
+    poppler_path = None
+    poppler_disponivel = False
+    for candidato in _candidatos_poppler():
+        executavel = 'pdftoppm.exe' if sys.platform == 'win32' else 'pdftoppm'
+        if candidato is None or os.path.isfile(os.path.join(candidato, executavel)):
+            poppler_path = candidato
+            poppler_disponivel = True
+            break
+
+    idiomas = _listar_idiomas(tesseract_cmd) if tesseract_cmd else set()
+    return AmbienteOCR(tesseract_cmd, poppler_path, poppler_disponivel, idiomas)
+
+_ambiente = None
+_lock_ambiente = threading.Lock()
+
+def obter_ambiente_ocr(recarregar=False):
+    """
+    Retorna as ferramentas de OCR desta máquina. A busca só acontece no
+    primeiro uso do OCR e o resultado fica guardado para as próximas
+    conversões.
+    :param recarregar: Se True, refaz a busca (por exemplo, após instalar o Tesseract)
+    """
+    global _ambiente
+    with _lock_ambiente:
+        if _ambiente is None or recarregar:
+            _ambiente = descobrir_ambiente_ocr()
+        return _ambiente
@@ -0,0 +1,161 @@
+import os
+import pytesseract
+from PIL import Image
+from texto_pagina import TextoPagina
+
+try:
+    import tesserocr
+except ImportError:
+    # Dependência opcional: sem ela só o backend pytesseract fica disponível
+    tesserocr = None
+
+# Backend usado quando nenhum outro é escolhido
+BACKEND_PADRAO = 'pytesseract'
+
+# Backends de OCR disponíveis, pelo nome
+BACKENDS_OCR = {}
+
+def registrar_backend(classe):
+    """Registra uma classe de backend de OCR pelo seu atributo nome (pode ser usada como decorador)"""
+    BACKENDS_OCR[classe.nome] = classe
+    return classe
+
+def obter_classe_backend(nome):
+    """
+    Retorna a classe do backend de OCR registrado com o nome informado
+    :raises ValueError: Se o backend não existir
+    """
+    try:
+        return BACKENDS_OCR[nome]
+    except KeyError:
+        raise ValueError(f'Backend de OCR desconhecido: {nome} (disponíveis: {", ".join(sorted(BACKENDS_OCR))})')
+
+def _dimensoes(imagem):
+    """Largura e altura em pixels de uma imagem PIL ou de um arquivo de imagem (só o cabeçalho é lido)"""
+    if isinstance(imagem, str):
+        with Image.open(imagem) as aberta:
+            return aberta.size
+    return imagem.size
+
+def _palavras_tsv(tsv):
+    """Lê as palavras (nível 5) da saída TSV do Tesseract"""
+    palavras = []
+    for linha in tsv.splitlines()[1:]:
+        colunas = linha.split('\t')
+        if len(colunas) < 12 or colunas[0] != '5' or not colunas[11].strip():
+            continue
+        esquerda, topo, largura, altura = (int(valor) for valor in colunas[6:10])
+        palavras.append({'texto': colunas[11], 'caixa': [esquerda, topo, esquerda + largura, topo + altura],
+                         'confianca': round(float(colunas[10]), 2)})
+    return palavras
+
+@registrar_backend
+class BackendPytesseract:
+    """
+    Backend que executa o Tesseract pelo pytesseract: cada página é gravada
+    em disco e reconhecida por um novo processo do executável.
+
+    Todo backend recebe o AmbienteOCR e o idioma na criação, é criado uma
+    única vez em cada processo de OCR e oferece reconhecer(imagem),
+    reconhecer_palavras(imagem) e encerrar().
+    """
+
+    nome = 'pytesseract'
+
+    # Como instalar o que falta quando o backend não está disponível
+    instalacao = 'Instale o Tesseract e adicione-o ao PATH, ou informe o executável na variável TESSERACT_CMD.'
+
+    @staticmethod
+    def disponivel(ambiente):
+        """Verifica se o backend pode ser usado com as ferramentas encontradas"""
+        return ambiente.tesseract_cmd is not None
+
+    @staticmethod
+    def idiomas(ambiente):
+        """Retorna os idiomas que o backend consegue reconhecer"""
+        return ambiente.idiomas
+
+    def __init__(self, ambiente, idioma):
+        """
+        :param ambiente: AmbienteOCR com o caminho do Tesseract
+        :param idioma: Idioma usado pelo Tesseract
+        """
+        if ambiente.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = ambiente.tesseract_cmd
+        self.idioma = idioma
+
+    def reconhecer(self, imagem):
+        """
+        Extrai o texto de uma página
+        :param imagem: Imagem PIL ou caminho do arquivo de imagem da página
+        """
+        return pytesseract.image_to_string(imagem, lang=self.idioma)
+
+    def reconhecer_palavras(self, imagem):
+        """
+        Extrai o texto e a posição das palavras de uma página em uma única
+        execução do Tesseract, que grava as saídas TXT e TSV juntas
+        :param imagem: Imagem PIL ou caminho do arquivo de imagem da página
+        :return: TextoPagina com o texto e as palavras
+        """
+        with pytesseract.pytesseract.save(imagem) as (base, entrada):
+            pytesseract.pytesseract.run_tesseract(entrada, base, 'txt', self.idioma, '-c tessedit_create_tsv=1')
+            with open(base + os.extsep + 'txt', 'rb') as arquivo:
+                texto = arquivo.read().decode('utf-8')
+            with open(base + os.extsep + 'tsv', 'rb') as arquivo:
+                palavras = _palavras_tsv(arquivo.read().decode('utf-8'))
+        return TextoPagina(texto, palavras, *_dimensoes(imagem))
+
+    def encerrar(self):
+        pass
+
+@registrar_backend
+class BackendTesserocr:
+    """
+    Backend que usa a API C do Tesseract pelo tesserocr, dentro do próprio
+    processo: o modelo do idioma é carregado uma única vez por processo de OCR
+    e as páginas são reconhecidas sem gravar arquivos nem iniciar processos.
+    """
+
+    nome = 'tesserocr'
+    instalacao = 'Instale o pacote tesserocr (pip install tesserocr), que usa a biblioteca do Tesseract.'
+
+    @staticmethod
+    def disponivel(ambiente):
+        return tesserocr is not None
+
+    @staticmethod
+    def idiomas(ambiente):
+        return set(tesserocr.get_languages()[1]) if tesserocr is not None else set()
+
+    def __init__(self, ambiente, idioma):
+        """
+        :param ambiente: AmbienteOCR (não usado: a biblioteca tem a própria pasta tessdata)
+        :param idioma: Idioma usado pelo Tesseract
+        """
+        self.idioma = idioma
+        self._api = tesserocr.PyTessBaseAPI(lang=idioma)
+
+    def reconhecer(self, imagem):
+        if isinstance(imagem, str):
+            self._api.SetImageFile(imagem)
+        else:
+            self._api.SetImage(imagem)
+        return self._api.GetUTF8Text()
+
+    def reconhecer_palavras(self, imagem):
+        texto = self.reconhecer(imagem)
+        # As palavras vêm do mesmo reconhecimento, percorrido pelo iterador da API
+        palavras = []
+        iterador = self._api.GetIterator()
+        nivel = tesserocr.RIL.WORD
+        if iterador is not None:
+            for palavra in tesserocr.iterate_level(iterador, nivel):
+                conteudo = palavra.GetUTF8Text(nivel)
+                if conteudo and conteudo.strip():
+                    palavras.append({'texto': conteudo, 'caixa': list(palavra.BoundingBox(nivel)),
+                                     'confianca': round(palavra.Confidence(nivel), 2)})
+        return TextoPagina(texto, palavras, *_dimensoes(imagem))
+
+    def encerrar(self):
+        self._api.End()
@@ -0,0 +1,398 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import datetime
+import functools
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    import resource
+except ImportError:
+    # Não existe no Windows: o pico de memória não é medido
+    resource = None
+
+# Palavras usadas no texto sintético (com acentos, para exercitar a codificação)
+PALAVRAS = (
+    'conversão arquivo página texto documento relatório análise processo informação sistema dados '
+    'resultado período contrato cláusula parágrafo número valor pagamento prazo empresa cliente '
+    'serviço produto município estado federal lei artigo inciso alínea decisão ação reunião ata '
+    'de do da em para com por que não uma os as ao no na se mais como foi são também'
+).split()
+
+# Documentos do corpus: nome -> (tipo de cada página, largura e altura em pontos)
+CORPUS = {
+    'texto': (['texto'] * 20, (595, 842)),
+    'escaneado': (['imagem'] * 5, (595, 842)),
+    'misto': (['texto', 'imagem'] * 5, (595, 842)),
+    'longo': (['texto'] * 1000, (595, 842)),
+    'largo': (['texto'] * 10, (3370, 842)),
+    'capa': (['imagem'] + ['texto'] * 39, (595, 842)),
+}
+
+# Combinações de conversor e modo medidas por padrão
+MODOS = ('hibrido', 'ocr')
+FORMATOS = ('txt', 'docx')
+
+def _linhas_sinteticas(gerador, largura_pontos, tamanho_fonte, quantidade):
+    """Gera linhas de palavras aleatórias (reprodutíveis pela semente) que cabem na largura da página"""
+    caracteres_por_linha = int((largura_pontos - 100) / (tamanho_fonte * 0.5))
+    linhas = []
+    for _ in range(quantidade):
+        palavras = []
+        while sum(len(p) + 1 for p in palavras) < caracteres_por_linha - 12:
+            palavras.append(gerador.choice(PALAVRAS))
+        linhas.append(' '.join(palavras))
+    return linhas
+
+def _escapar_texto_pdf(texto):
+    """Codifica uma linha para um operador de texto do PDF (WinAnsi, com escapes)"""
+    saida = []
+    for byte in texto.encode('cp1252', errors='replace'):
+        if byte in b'()\\':
+            saida.append('\\' + chr(byte))
+        elif byte > 126:
+            saida.append(f'\\{byte:03o}')
+        else:
+            saida.append(chr(byte))
+    return ''.join(saida)
+
+def _gravar_pdf_texto(caminho, paginas, largura, altura, tamanho_fonte=11):
+    """
+    Grava um PDF com camada de texto sem bibliotecas externas
+    :param paginas: Lista com as linhas de cada página
+    """
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # Árvore de páginas, preenchida no final
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    referencias_paginas = []
+    for linhas in paginas:
+        comandos = [f'BT /F1 {tamanho_fonte} Tf {tamanho_fonte + 3} TL 50 {altura - 60} Td']
+        comandos += [f'({_escapar_texto_pdf(linha)}) \'' for linha in linhas]
+        comandos.append('ET')
+        conteudo = '\n'.join(comandos).encode('latin-1')
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(conteudo) + conteudo + b'\nendstream')
+        objetos.append((f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {largura} {altura}] '
+                        f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>').encode('ascii'))
+        referencias_paginas.append(f'{len(objetos)} 0 R')
+    objetos[1] = f'<< /Type /Pages /Kids [{" ".join(referencias_paginas)}] /Count {len(paginas)} >>'.encode('ascii')
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'%PDF-1.4\n')
+        posicoes = []
+        for numero, objeto in enumerate(objetos, 1):
+            posicoes.append(arquivo.tell())
+            arquivo.write(b'%d 0 obj\n' % numero + objeto + b'\nendobj\n')
+        inicio_xref = arquivo.tell()
+        arquivo.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+        for posicao in posicoes:
+            arquivo.write(b'%010d 00000 n \n' % posicao)
+        arquivo.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref))
+
+def _gravar_pdf_imagem(caminho, paginas, largura, altura, dpi=150):
+    """
+    Grava um PDF de páginas escaneadas: cada página é só uma imagem com o texto desenhado
+    :param paginas: Lista com as linhas de cada página
+    """
+    tamanho = (int(largura / 72 * dpi), int(altura / 72 * dpi))
+    fonte = ImageFont.load_default()
+    imagens = []
+    for linhas in paginas:
+        imagem = Image.new('L', tamanho, 255)
+        desenho = ImageDraw.Draw(imagem)
+        for i, linha in enumerate(linhas):
+            desenho.text((int(dpi * 0.7), int(dpi * 0.8) + i * int(dpi * 0.2)), linha, fill=0, font=fonte)
+        imagens.append(imagem)
+    # Datas fixas: o mesmo corpus gera sempre os mesmos bytes
+    data = time.gmtime(0)
+    imagens[0].save(caminho, 'PDF', resolution=dpi, save_all=True, append_images=imagens[1:], creationDate=data,
+                    modDate=data)
+
+def gerar_corpus(pasta, semente=2024):
+    """
+    Gera (ou reaproveita) o corpus sintético de PDFs do benchmark. Com a mesma
+    semente, o texto de todos os documentos é sempre o mesmo.
+    :param pasta: Pasta onde os PDFs são gravados
+    :param semente: Semente do gerador de texto
+    :return: Dicionário nome do documento -> caminho do PDF
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = {}
+    for nome, (tipos, (largura, altura)) in CORPUS.items():
+        caminho = os.path.join(pasta, f'{nome}_{semente}.pdf')
+        caminhos[nome] = caminho
+        if os.path.exists(caminho):
+            continue
+
+        gerador = random.Random(f'{semente}-{nome}')
+        paginas = [_linhas_sinteticas(gerador, largura, 11, 45 if tipo == 'texto' else 25) for tipo in tipos]
+        if set(tipos) == {'texto'}:
+            _gravar_pdf_texto(caminho, paginas, largura, altura)
+        elif set(tipos) == {'imagem'}:
+            _gravar_pdf_imagem(caminho, paginas, largura, altura)
+        else:
+            # Documento misto: intercala páginas de texto e escaneadas na ordem dos tipos
+            caminho_texto, caminho_imagem = caminho + '.texto.tmp', caminho + '.imagem.tmp'
+            _gravar_pdf_texto(caminho_texto, [p for p, t in zip(paginas, tipos) if t == 'texto'], largura, altura)
+            _gravar_pdf_imagem(caminho_imagem, [p for p, t in zip(paginas, tipos) if t == 'imagem'], largura, altura)
+            with open(caminho_texto, 'rb') as arquivo_texto, open(caminho_imagem, 'rb') as arquivo_imagem:
+                fontes = {'texto': iter(PyPDF2.PdfReader(arquivo_texto).pages),
+                          'imagem': iter(PyPDF2.PdfReader(arquivo_imagem).pages)}
+                escritor = PyPDF2.PdfWriter()
+                for tipo in tipos:
+                    escritor.add_page(next(fontes[tipo]))
+                with open(caminho, 'wb') as arquivo:
+                    escritor.write(arquivo)
+            os.remove(caminho_texto)
+            os.remove(caminho_imagem)
+    return caminhos
+
+class _Cronometro:
+    """Soma o tempo gasto em cada etapa da conversão envolvendo as funções de cada uma"""
+
+    def __init__(self):
+        self.etapas = {'parse': 0.0, 'rasterizacao': 0.0, 'ocr': 0.0, 'escrita': 0.0}
+
+    def funcao(self, etapa, funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                self.etapas[etapa] += time.perf_counter() - inicio
+        return medida
+
+    def gerador(self, etapa, funcao):
+        @functools.wraps(funcao)
+        def medido(*args, **kwargs):
+            iterador = iter(funcao(*args, **kwargs))
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    return
+                finally:
+                    self.etapas[etapa] += time.perf_counter() - inicio
+                yield item
+        return medido
+
+    def instalar(self):
+        import motor_ocr
+        import escritores
+        import extratores_texto
+        for classe in extratores_texto.EXTRATORES_TEXTO.values():
+            classe.paginas = self.gerador('parse', classe.paginas)
+        motor_ocr.rasterizar_paginas = self.funcao('rasterizacao', motor_ocr.rasterizar_paginas)
+        motor_ocr.MotorOCR.reconhecer = self.funcao('ocr', motor_ocr.MotorOCR.reconhecer)
+        for classe in escritores.ESCRITORES.values():
+            classe.adicionar_pagina = self.funcao('escrita', classe.adicionar_pagina)
+            classe.fechar = self.funcao('escrita', classe.fechar)
+
+def _pico_memoria_mb():
+    """Maior uso de memória residente do processo e dos seus filhos (poppler, tesseract, pool de OCR)"""
+    if resource is None:
+        return None
+    # ru_maxrss é medido em KB no Linux e em bytes no macOS
+    escala = 1 if sys.platform == 'darwin' else 1024
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * escala
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * escala
+    return round(max(proprio, filhos) / (1024 * 1024), 1)
+
+def _executar_caso(caminho_pdf, formato, modo, pasta_saida, extrator, ocr_workers):
+    """Converte um documento em um processo novo, para que tempo e memória de um caso não afetem o outro"""
+    cronometro = _Cronometro()
+    cronometro.instalar()
+    from pdf_to_txt import converter_pdf_para_txt, converter_pdf_para_docx
+    from motor_ocr import MotorOCR
+
+    converter = converter_pdf_para_txt if formato == 'txt' else converter_pdf_para_docx
+    caminho_saida = os.path.join(pasta_saida, f'{os.path.splitext(os.path.basename(caminho_pdf))[0]}_{modo}.{formato}')
+    estatisticas = {}
+    with open(os.devnull, 'w') as nulo:
+        saida_padrao, sys.stdout = sys.stdout, nulo
+        try:
+            with MotorOCR(ocr_workers) as motor_ocr:
+                inicio = time.perf_counter()
+                saida = converter(caminho_pdf, caminho_saida, modo == 'ocr', motor_ocr, estatisticas=estatisticas,
+                                  extrator=extrator)
+                duracao = time.perf_counter() - inicio
+        finally:
+            sys.stdout = saida_padrao
+
+    paginas = estatisticas.get('paginas', 0)
+    return {
+        'sucesso': saida is not None,
+        'erro': None if saida is not None else 'A conversão não gerou o arquivo de saída',
+        'paginas': paginas,
+        'paginas_ocr': estatisticas.get('paginas_ocr', 0),
+        'segundos': round(duracao, 4),
+        'paginas_por_segundo': round(paginas / duracao, 2) if duracao and paginas else None,
+        'pico_memoria_mb': _pico_memoria_mb(),
+        'etapas': {etapa: round(segundos, 4) for etapa, segundos in cronometro.etapas.items()},
+    }
+
+def _verificar_limite_caracteres(caminho_pdf, pasta_saida, ocr_workers, max_caracteres):
+    from pdf_to_txt import converter_pdf
+    from motor_ocr import MotorOCR
+    import extratores_texto
+
+    extraidas = []
+    def contar(paginas):
+        @functools.wraps(paginas)
+        def contadas(*args, **kwargs):
+            for texto in paginas(*args, **kwargs):
+                extraidas.append(texto)
+                yield texto
+        return contadas
+    for classe in extratores_texto.EXTRATORES_TEXTO.values():
+        classe.paginas = contar(classe.paginas)
+
+    caminho_saida = os.path.join(pasta_saida, os.path.splitext(os.path.basename(caminho_pdf))[0] + '_limite.txt')
+    with open(os.devnull, 'w') as nulo:
+        saida_padrao, sys.stdout = sys.stdout, nulo
+        try:
+            with MotorOCR(ocr_workers) as motor_ocr:
+                converter_pdf(caminho_pdf, {'txt': caminho_saida}, motor_ocr=motor_ocr, max_caracteres=max_caracteres)
+                janela = motor_ocr.max_paginas_residentes
+        finally:
+            sys.stdout = saida_padrao
+    return {'paginas_extraidas': len(extraidas), 'maximo': janela, 'sucesso': len(extraidas) <= janela}
+
+def verificar_limite_caracteres(pasta_corpus, pasta_saida, ocr_workers=None, semente=2024, max_caracteres=50):
+    """
+    Verifica que o limite de caracteres encerra a extração cedo mesmo quando a
+    primeira página precisa de OCR: no documento 'capa' (uma página escaneada
+    seguida de páginas de texto), no máximo uma janela de OCR
+    (max_paginas_residentes páginas) pode ser extraída
+    :return: Dicionário com as páginas extraídas, o máximo aceito e se a verificação passou
+    """
+    caminho_pdf = gerar_corpus(pasta_corpus, semente)['capa']
+    os.makedirs(pasta_saida, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_verificar_limite_caracteres, caminho_pdf, pasta_saida, ocr_workers,
+                               max_caracteres).result()
+
+def executar_benchmark(pasta_corpus, pasta_saida, documentos=None, formatos=FORMATOS, modos=MODOS, extrator='auto',
+                       ocr_workers=None, repeticoes=1, semente=2024):
+    """
+    Mede todos os conversores e modos sobre o corpus sintético
+    :return: Lista de resultados, um por documento, formato, modo e repetição
+    """
+    caminhos = gerar_corpus(pasta_corpus, semente)
+    os.makedirs(pasta_saida, exist_ok=True)
+    contexto = multiprocessing.get_context('spawn')
+    resultados = []
+    for documento in documentos or list(CORPUS):
+        for formato in formatos:
+            for modo in modos:
+                for repeticao in range(1, repeticoes + 1):
+                    print(f'{documento} / {formato} / {modo} ({repeticao}/{repeticoes})...', file=sys.stderr)
+                    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                        try:
+                            resultado = executor.submit(
+                                _executar_caso, caminhos[documento], formato, modo, pasta_saida, extrator, ocr_workers
+                            ).result()
+                        except Exception as e:
+                            resultado = {'sucesso': False, 'erro': str(e)}
+                    resultados.append({'documento': documento, 'formato': formato, 'modo': modo,
+                                       'repeticao': repeticao, **resultado})
+    return resultados
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def comparar_resultados(anteriores, atuais):
+    """Imprime a variação de páginas por segundo de cada caso em relação a uma execução anterior"""
+    def por_caso(resultados):
+        casos = {}
+        for r in resultados:
+            if r.get('paginas_por_segundo'):
+                casos.setdefault((r['documento'], r['formato'], r['modo']), []).append(r['paginas_por_segundo'])
+        return {caso: sum(valores) / len(valores) for caso, valores in casos.items()}
+
+    antes, depois = por_caso(anteriores), por_caso(atuais)
+    for caso in sorted(set(antes) & set(depois)):
+        variacao = (depois[caso] / antes[caso] - 1) * 100
+        print(f'{" / ".join(caso):<28} {antes[caso]:>9.2f} -> {depois[caso]:>9.2f} pág/s ({variacao:+.1f}%)')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Mede páginas por segundo, pico de memória e tempo por etapa (parse, rasterização, OCR, '
+                    'escrita) de cada conversor e modo sobre um corpus sintético reprodutível.'
+    )
+    parser.add_argument('--pasta-corpus', default=os.path.join('benchmark', 'corpus'),
+                        help='Onde o corpus é gerado (e reaproveitado nas próximas execuções)')
+    parser.add_argument('--pasta-saida', default=os.path.join('benchmark', 'saida'),
+                        help='Onde os arquivos convertidos são gravados')
+    parser.add_argument('-d', '--documentos', nargs='+', choices=list(CORPUS), help='Documentos medidos (padrão: todos)')
+    parser.add_argument('-f', '--formatos', nargs='+', choices=FORMATOS, default=list(FORMATOS))
+    parser.add_argument('-m', '--modos', nargs='+', choices=MODOS, default=list(MODOS),
+                        help='hibrido: OCR só nas páginas sem texto; ocr: OCR em todas as páginas')
+    parser.add_argument('--extrator', default='auto', help='Extrator da camada de texto')
+    parser.add_argument('--ocr-workers', type=int, default=None)
+    parser.add_argument('-n', '--repeticoes', type=int, default=1)
+    parser.add_argument('--semente', type=int, default=2024, help='Semente do texto do corpus')
+    parser.add_argument('-o', '--saida', default='benchmark_resultados.json', help='Arquivo JSON dos resultados')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Só verifica que o limite de caracteres não extrai o documento inteiro quando a '
+                             'primeira página precisa de OCR (código de saída 1 se falhar)')
+    args = parser.parse_args(argv)
+
+    if args.verificar:
+        verificacao = verificar_limite_caracteres(args.pasta_corpus, args.pasta_saida, args.ocr_workers,
+                                                  args.semente)
+        print(f'Limite de caracteres com capa escaneada: {verificacao["paginas_extraidas"]} página(s) extraída(s) '
+              f'(máximo {verificacao["maximo"]}): {"ok" if verificacao["sucesso"] else "FALHOU"}')
+        return 0 if verificacao['sucesso'] else 1
+
+    resultados = executar_benchmark(args.pasta_corpus, args.pasta_saida, args.documentos, args.formatos, args.modos,
+                                    args.extrator, args.ocr_workers, args.repeticoes, args.semente)
+    relatorio = {
+        'commit': _commit_atual(),
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'semente': args.semente,
+        'extrator': args.extrator,
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+
+    print(f'{"documento / formato / modo":<28} {"pág/s":>9} {"memória":>9} {"parse":>8} {"raster":>8} '
+          f'{"ocr":>8} {"escrita":>8}')
+    for r in resultados:
+        caso = f'{r["documento"]} / {r["formato"]} / {r["modo"]}'
+        if not r['sucesso']:
+            print(f'{caso:<28} {"falhou":>9} {r.get("erro") or ""}')
+            continue
+        etapas = r['etapas']
+        print(f'{caso:<28} {r["paginas_por_segundo"] or 0:>9.2f} {r["pico_memoria_mb"] or 0:>7.1f}MB '
+              f'{etapas["parse"]:>7.3f}s {etapas["rasterizacao"]:>7.3f}s {etapas["ocr"]:>7.3f}s {etapas["escrita"]:>7.3f}s')
+    print(f'Resultados gravados em {args.saida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar_resultados(json.load(arquivo)['resultados'], resultados)
+    return 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import sys
+import json
+import time
+import argparse
+import difflib
+import tempfile
+import PyPDF2
+from PIL import Image
+from pdf2image import convert_from_path
+from ambiente_ocr import obter_ambiente_ocr
+from backends_ocr import BACKEND_PADRAO, BACKENDS_OCR, obter_classe_backend
+from preprocessamento_ocr import PreprocessamentoOCR
+
+# Configurações comparadas; 'original' reproduz a rasterização anterior (colorida, 200 DPI fixo)
+CONFIGURACOES = {
+    'original': PreprocessamentoOCR('cor', dpi=200, dpi_minimo=200, dpi_maximo=200, max_pixels_lado=10 ** 6),
+    'cinza': PreprocessamentoOCR('cinza'),
+    'binario': PreprocessamentoOCR('binario'),
+    'binario_inclinacao': PreprocessamentoOCR('binario', corrigir_inclinacao=True),
+}
+
+def similaridade(referencia, reconhecido):
+    """Fração das palavras da camada de texto que o OCR reconheceu na mesma ordem (0 a 1)"""
+    palavras_referencia = referencia.split()
+    palavras_reconhecidas = reconhecido.split()
+    if not palavras_referencia:
+        return 1.0 if not palavras_reconhecidas else 0.0
+    comparador = difflib.SequenceMatcher(None, palavras_referencia, palavras_reconhecidas, autojunk=False)
+    return comparador.ratio()
+
+def medir_pagina(caminho_pdf, numero, referencia, preprocessamento, backend, poppler_path, pasta, inclinacao):
+    """Mede rasterização, pré-processamento e OCR de uma página com uma configuração"""
+    with open(caminho_pdf, 'rb') as arquivo_pdf:
+        caixa = PyPDF2.PdfReader(arquivo_pdf).pages[numero - 1].mediabox
+    dpi = preprocessamento.dpi_pagina(float(caixa.width), float(caixa.height))
+
+    inicio = time.perf_counter()
+    caminho_imagem = convert_from_path(
+        caminho_pdf,
+        dpi=dpi,
+        poppler_path=poppler_path,
+        first_page=numero,
+        last_page=numero,
+        output_folder=pasta,
+        grayscale=preprocessamento.tons_de_cinza,
+        paths_only=True
+    )[0]
+    tempo_rasterizacao = time.perf_counter() - inicio
+
+    imagem = caminho_imagem
+    if inclinacao:
+        # Simula uma página escaneada torta
+        with Image.open(caminho_imagem) as aberta:
+            imagem = aberta.rotate(inclinacao, resample=Image.BILINEAR, expand=True, fillcolor='white')
+
+    inicio = time.perf_counter()
+    imagem = preprocessamento.processar(imagem)
+    tempo_preprocessamento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    texto = backend.reconhecer(imagem)
+    tempo_ocr = time.perf_counter() - inicio
+
+    return {
+        'dpi': dpi,
+        'rasterizacao': tempo_rasterizacao,
+        'preprocessamento': tempo_preprocessamento,
+        'ocr': tempo_ocr,
+        'precisao': similaridade(referencia, texto),
+    }
+
+def comparar(arquivos, nomes_configuracoes, nome_backend=BACKEND_PADRAO, idioma='por', inclinacao=0.0,
+             max_paginas=None):
+    """
+    Executa o OCR das páginas com camada de texto de cada PDF em todas as
+    configurações e usa a própria camada de texto como referência de precisão
+    :return: Dicionário configuração -> resumo das medições
+    """
+    ambiente = obter_ambiente_ocr()
+    backend = obter_classe_backend(nome_backend)(ambiente, idioma)
+    medicoes = {nome: [] for nome in nomes_configuracoes}
+    try:
+        with tempfile.TemporaryDirectory(prefix='benchmark_ocr_') as pasta:
+            for caminho_pdf in arquivos:
+                with open(caminho_pdf, 'rb') as arquivo_pdf:
+                    referencias = [pagina.extract_text() for pagina in PyPDF2.PdfReader(arquivo_pdf).pages]
+                paginas = [numero for numero, texto in enumerate(referencias, 1) if texto.strip()]
+                for numero in paginas[:max_paginas]:
+                    for nome in nomes_configuracoes:
+                        print(f'{caminho_pdf} página {numero}: {nome}', file=sys.stderr)
+                        medicoes[nome].append(medir_pagina(
+                            caminho_pdf, numero, referencias[numero - 1], CONFIGURACOES[nome], backend,
+                            ambiente.poppler_path, pasta, inclinacao
+                        ))
+    finally:
+        backend.encerrar()
+
+    resumo = {}
+    for nome, paginas in medicoes.items():
+        if not paginas:
+            continue
+        total = sum(p['rasterizacao'] + p['preprocessamento'] + p['ocr'] for p in paginas)
+        resumo[nome] = {
+            'paginas': len(paginas),
+            'paginas_por_segundo': len(paginas) / total if total else None,
+            'rasterizacao_media': sum(p['rasterizacao'] for p in paginas) / len(paginas),
+            'preprocessamento_medio': sum(p['preprocessamento'] for p in paginas) / len(paginas),
+            'ocr_medio': sum(p['ocr'] for p in paginas) / len(paginas),
+            'precisao_media': sum(p['precisao'] for p in paginas) / len(paginas),
+        }
+    return resumo
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compara velocidade e precisão do OCR com e sem o pré-processamento das páginas. '
+                    'Use PDFs digitais: a camada de texto de cada página é a referência da precisão.'
+    )
+    parser.add_argument('arquivos', nargs='+', help='PDFs com camada de texto')
+    parser.add_argument('-c', '--configuracoes', nargs='+', choices=list(CONFIGURACOES), default=list(CONFIGURACOES))
+    parser.add_argument('--backend-ocr', choices=sorted(BACKENDS_OCR), default=BACKEND_PADRAO)
+    parser.add_argument('--idioma', default='por')
+    parser.add_argument('--inclinacao', type=float, default=0.0,
+                        help='Gira as páginas rasterizadas (graus) para simular digitalizações tortas')
+    parser.add_argument('--max-paginas', type=int, default=None, help='Máximo de páginas medidas por PDF')
+    parser.add_argument('--json', help='Grava o resumo neste arquivo JSON')
+    args = parser.parse_args(argv)
+
+    resumo = comparar(args.arquivos, args.configuracoes, args.backend_ocr, args.idioma, args.inclinacao,
+                      args.max_paginas)
+
+    print(f'{"configuração":<20} {"pág/s":>7} {"raster":>8} {"pré":>8} {"ocr":>8} {"precisão":>9}')
+    for nome, medidas in resumo.items():
+        print(f'{nome:<20} {medidas["paginas_por_segundo"] or 0:>7.2f} {medidas["rasterizacao_media"]:>7.3f}s '
+              f'{medidas["preprocessamento_medio"]:>7.3f}s {medidas["ocr_medio"]:>7.3f}s '
+              f'{medidas["precisao_media"]:>9.1%}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'inclinacao': args.inclinacao, 'backend': args.backend_ocr, 'resultados': resumo},
+                      arquivo, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
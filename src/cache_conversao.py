@@ -0,0 +1,188 @@
+import os
+import sys
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from texto_pagina import registro_pagina, texto_do_registro
+
+# Tamanho máximo padrão do cache em disco (500 MB)
+TAMANHO_MAXIMO_PADRAO = 500 * 1024 * 1024
+
+EXTENSAO_ENTRADA = '.jsonl.gz'
+
+def calcular_hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo lendo-o em blocos
+    :param caminho: Caminho do arquivo
+    :param tamanho_bloco: Quantidade de bytes lida por vez
+    :return: Hash em hexadecimal
+    """
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+def gerar_chave_conversao(caminho_pdf, usar_ocr, idioma, min_caracteres, opcoes_ocr='', extrator='', selecao=''):
+    """
+    Gera a chave de uma conversão a partir do conteúdo do PDF e das opções de extração
+    :param caminho_pdf: Caminho do arquivo PDF
+    :param usar_ocr: Se o OCR foi forçado em todas as páginas
+    :param idioma: Idioma usado no OCR
+    :param min_caracteres: Mínimo de caracteres para uma página não passar pelo OCR
+    :param opcoes_ocr: Backend e pré-processamento do OCR, gerados por MotorOCR.descricao()
+    :param extrator: Extrator da camada de texto
+    :param selecao: Páginas selecionadas e limite de caracteres ('' para o documento inteiro)
+    """
+    opcoes = (f'{calcular_hash_arquivo(caminho_pdf)}|ocr={int(bool(usar_ocr))}|{idioma}|{min_caracteres}'
+              f'|{opcoes_ocr}|{extrator}')
+    if selecao:
+        # Conversões do documento inteiro mantêm as chaves anteriores
+        opcoes += f'|{selecao}'
+    return hashlib.sha256(opcoes.encode('utf-8')).hexdigest()
+
+def variante_chave(chave, variante):
+    """
+    Deriva de uma chave de conversão a chave de uma variante da mesma extração,
+    sem calcular de novo o hash do PDF
+    :param chave: Chave gerada por gerar_chave_conversao()
+    :param variante: Nome da variante (por exemplo, 'palavras')
+    """
+    return hashlib.sha256(f'{chave}|{variante}'.encode('utf-8')).hexdigest()
+
+def pasta_cache_padrao():
+    """Retorna a pasta padrão do cache de conversões do usuário"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~\\AppData\\Local'))
+        return os.path.join(base, 'ConversorPDF', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return os.path.join(base, 'conversor_pdf')
+
+class _EntradaCache:
+    """Grava as páginas de uma entrada do cache à medida que são extraídas"""
+
+    def __init__(self, cache, chave):
+        self._cache = cache
+        self._chave = chave
+        descritor, self._caminho_temporario = tempfile.mkstemp(dir=cache.pasta, suffix='.tmp')
+        self._arquivo = gzip.open(os.fdopen(descritor, 'wb'), 'wt', encoding='utf-8')
+
+    def adicionar_pagina(self, texto):
+        """Acrescenta o texto de uma página à entrada (com as palavras, se o OCR as tiver informado)"""
+        self._arquivo.write(json.dumps(registro_pagina(texto), ensure_ascii=False) + '\n')
+
+    def confirmar(self, chave=None):
+        """
+        Publica a entrada no cache depois que todas as páginas foram gravadas
+        :param chave: Chave em que a entrada é publicada, quando só se sabe ao final (padrão: a da criação)
+        """
+        chave = chave or self._chave
+        self._arquivo.close()
+        caminho = self._cache._caminho_entrada(chave)
+        os.replace(self._caminho_temporario, caminho)
+        self._cache._registrar(chave, os.path.getsize(caminho))
+
+    def descartar(self):
+        """Remove a entrada incompleta (por exemplo, após um erro na conversão)"""
+        self._arquivo.close()
+        if os.path.exists(self._caminho_temporario):
+            os.remove(self._caminho_temporario)
+
+class CacheConversao:
+    """
+    Cache em disco do texto extraído de cada página, endereçado pelo conteúdo
+    do PDF e pelas opções de extração. Como o texto é guardado por página e
+    não por formato, uma nova conversão do mesmo arquivo para TXT ou DOCX
+    reaproveita a extração e o OCR anteriores. Quando o tamanho total passa
+    do limite, as entradas usadas há mais tempo são removidas.
+    """
+
+    def __init__(self, pasta=None, tamanho_maximo=TAMANHO_MAXIMO_PADRAO):
+        """
+        :param pasta: Pasta onde as entradas são gravadas (padrão: pasta de cache do usuário)
+        :param tamanho_maximo: Tamanho máximo do cache em bytes
+        """
+        self.pasta = pasta or pasta_cache_padrao()
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.pasta, exist_ok=True)
+
+        # Índice em memória: chave -> [tamanho, último uso]
+        self._entradas = {}
+        for entrada in os.scandir(self.pasta):
+            if entrada.name.endswith(EXTENSAO_ENTRADA):
+                info = entrada.stat()
+                chave = entrada.name[:-len(EXTENSAO_ENTRADA)]
+                self._entradas[chave] = [info.st_size, info.st_mtime]
+
+    def _caminho_entrada(self, chave):
+        return os.path.join(self.pasta, chave + EXTENSAO_ENTRADA)
+
+    def obter(self, chave, *alternativas):
+        """
+        Procura uma conversão no cache
+        :param chave: Chave gerada por gerar_chave_conversao()
+        :param alternativas: Outras chaves que também servem, procuradas em ordem
+        :return: Gerador com o texto de cada página ou None se não estiver no cache
+        """
+        with self._lock:
+            for chave in (chave,) + alternativas:
+                caminho = self._caminho_entrada(chave)
+                if chave in self._entradas and os.path.exists(caminho):
+                    break
+                self._entradas.pop(chave, None)
+            else:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            # Marca a entrada como usada recentemente
+            os.utime(caminho)
+            self._entradas[chave][1] = os.path.getmtime(caminho)
+        return self._ler_paginas(caminho)
+
+    def _ler_paginas(self, caminho):
+        with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                yield texto_do_registro(json.loads(linha))
+
+    def iniciar_entrada(self, chave):
+        """
+        Cria uma nova entrada que recebe as páginas conforme são extraídas
+        :param chave: Chave gerada por gerar_chave_conversao()
+        :return: Objeto com adicionar_pagina(), confirmar() e descartar()
+        """
+        return _EntradaCache(self, chave)
+
+    def _registrar(self, chave, tamanho):
+        with self._lock:
+            self._entradas[chave] = [tamanho, os.path.getmtime(self._caminho_entrada(chave))]
+            self._remover_excedente()
+
+    def _remover_excedente(self):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite"""
+        tamanho_total = sum(tamanho for tamanho, _ in self._entradas.values())
+        if tamanho_total <= self.tamanho_maximo:
+            return
+        for chave, (tamanho, _) in sorted(self._entradas.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(self._caminho_entrada(chave))
+            except FileNotFoundError:
+                pass
+            del self._entradas[chave]
+            tamanho_total -= tamanho
+            if tamanho_total <= self.tamanho_maximo:
+                break
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos e falhas e a ocupação atual do cache"""
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'entradas': len(self._entradas),
+                'tamanho': sum(tamanho for tamanho, _ in self._entradas.values()),
+            }
@@ -0,0 +1,173 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+import logging
+import contextlib
+import multiprocessing
+from motor_ocr import MotorOCR
+from cache_conversao import CacheConversao
+from agendador_lote import AgendadorLote
+from backends_ocr import BACKEND_PADRAO, BACKENDS_OCR
+from preprocessamento_ocr import MODOS_COR, PreprocessamentoOCR
+from extratores_texto import EXTRATORES_TEXTO
+from escritores import ESCRITORES
+from metricas import registro_metricas, configurar_log_metricas
+from perfil_conversao import MODOS_PERFIL
+from selecao_paginas import interpretar_paginas
+from indice_busca import abrir_indice_busca
+
+def expandir_entradas(entradas, recursivo=False):
+    """
+    Transforma arquivos, pastas e padrões glob em uma lista de PDFs sem repetições
+    :param entradas: Caminhos ou padrões informados na linha de comando
+    :param recursivo: Se True, também procura PDFs nas subpastas das pastas informadas
+    """
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            padrao = os.path.join(entrada, '**', '*') if recursivo else os.path.join(entrada, '*')
+            candidatos = glob.glob(padrao, recursive=recursivo)
+        elif glob.has_magic(entrada):
+            candidatos = glob.glob(entrada, recursive=True)
+        else:
+            candidatos = [entrada]
+        arquivos += sorted(c for c in candidatos if c.lower().endswith('.pdf') and not os.path.isdir(c))
+    return list(dict.fromkeys(os.path.abspath(arquivo) for arquivo in arquivos))
+
+def _selecao_paginas(valor):
+    """Valida a opção --paginas mostrando a mensagem de interpretar_paginas()"""
+    try:
+        return interpretar_paginas(valor)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description='Converte PDFs para TXT, DOCX ou JSONL em lote, sem interface gráfica. '
+                    'Cada arquivo gera uma linha JSON na saída padrão; as mensagens '
+                    'de andamento vão para a saída de erro.'
+    )
+    parser.add_argument('entradas', nargs='+', help='Arquivos PDF, pastas ou padrões glob (ex.: "docs/**/*.pdf")')
+    parser.add_argument('-o', '--saida', help='Pasta dos arquivos convertidos (padrão: ao lado de cada PDF)')
+    parser.add_argument('-f', '--formato', choices=list(ESCRITORES), action='append',
+                        help='Formato de saída (padrão: txt); repita a opção, como em -f docx -f jsonl, para gerar '
+                             'vários formatos com uma única extração. O JSONL traz a posição e a confiança das '
+                             'palavras reconhecidas pelo OCR')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Documentos convertidos ao mesmo tempo (padrão: um por núcleo)')
+    parser.add_argument('--ocr', choices=['auto', 'sempre'], default='auto',
+                        help='auto: OCR só nas páginas sem texto; sempre: OCR em todas as páginas')
+    parser.add_argument('--extrator', choices=['auto'] + sorted(EXTRATORES_TEXTO), default='auto',
+                        help='Extrator da camada de texto (auto: o mais rápido instalado, com pypdf2 como reserva)')
+    parser.add_argument('--idioma', default='por', help='Idioma do Tesseract (padrão: por)')
+    parser.add_argument('--backend-ocr', choices=sorted(BACKENDS_OCR), default=BACKEND_PADRAO,
+                        help='pytesseract: um processo do Tesseract por página; '
+                             'tesserocr: biblioteca do Tesseract carregada uma vez por processo de OCR')
+    parser.add_argument('--ocr-cor', choices=MODOS_COR, default='cinza',
+                        help='Imagens entregues ao OCR: cor, cinza (padrão) ou binario (limiar de Otsu)')
+    parser.add_argument('--ocr-dpi', type=int, default=200,
+                        help='DPI das páginas de tamanho comum; páginas pequenas e grandes são ajustadas (padrão: 200)')
+    parser.add_argument('--corrigir-inclinacao', action='store_true',
+                        help='Endireita páginas escaneadas tortas antes do OCR')
+    parser.add_argument('--sempre-rasterizar', action='store_true',
+                        help='Rasteriza também as páginas digitalizadas, em vez de entregar ao OCR a imagem embutida')
+    parser.add_argument('--ocr-workers', type=int, default=None,
+                        help='Processos de OCR compartilhados pelos documentos (padrão: um por núcleo)')
+    parser.add_argument('-r', '--recursivo', action='store_true', help='Procura PDFs nas subpastas das pastas informadas')
+    parser.add_argument('--sem-cache', action='store_true', help='Não usa o cache de conversões')
+    parser.add_argument('--pasta-cache', help='Pasta do cache de conversões')
+    parser.add_argument('--log-metricas', metavar='ARQUIVO',
+                        help='Grava as métricas de cada conversão em JSON-lines ("-": saída de erro)')
+    parser.add_argument('--metricas-por-pagina', action='store_true',
+                        help='Inclui no log de métricas o tempo de cada etapa por página')
+    parser.add_argument('--perfil', choices=MODOS_PERFIL,
+                        help='Perfila cada conversão (cpu: cProfile; memoria: tracemalloc) e grava o relatório '
+                             'em <saída>.perfil.txt; os arquivos são convertidos um de cada vez, com OCR no processo')
+    parser.add_argument('--paginas', type=_selecao_paginas, metavar='SELEÇÃO',
+                        help='Converte só as páginas indicadas, como "1-3,5,10-" (10- vai da página 10 ao fim)')
+    parser.add_argument('--max-caracteres', type=int, metavar='N',
+                        help='Encerra cada conversão na página em que o texto gravado atinge N caracteres')
+    parser.add_argument('--prometheus', metavar='ARQUIVO',
+                        help='Grava ao final as métricas acumuladas no formato de texto do Prometheus')
+    parser.add_argument('--indice-busca', metavar='ARQUIVO',
+                        help='Indexa o texto convertido, página a página, no índice de busca informado '
+                             '(arquivo ou pasta); consulte com "python src/indice_busca.py"')
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    arquivos = expandir_entradas(args.entradas, args.recursivo)
+    if not arquivos:
+        print('Nenhum arquivo PDF encontrado.', file=sys.stderr)
+        return 2
+
+    saida_json = sys.stdout
+    lock_saida = threading.Lock()
+
+    def emitir_resultado(resultado):
+        registro = {
+            'arquivo': resultado['arquivo'],
+            'saida': resultado['saida'],
+            'saidas': resultado['saidas'],
+            'status': 'ok' if resultado['sucesso'] else 'erro',
+            'erro': resultado['erro'],
+            'paginas': resultado['paginas'],
+            'paginas_ocr': resultado['paginas_ocr'],
+            'paginas_sem_ocr': resultado['paginas_sem_ocr'],
+            'paginas_retomadas': resultado['paginas_retomadas'],
+            'cache': resultado['cache'],
+            'duracao': round(resultado['duracao'], 3),
+            'espera': round(resultado['espera'], 3),
+        }
+        with lock_saida:
+            saida_json.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            saida_json.flush()
+
+    preprocessamento = PreprocessamentoOCR(args.ocr_cor, args.corrigir_inclinacao, args.ocr_dpi,
+                                           dpi_minimo=min(100, args.ocr_dpi), dpi_maximo=max(300, args.ocr_dpi),
+                                           imagens_embutidas=not args.sempre_rasterizar)
+    motor_ocr = MotorOCR(args.ocr_workers, idioma=args.idioma, backend=args.backend_ocr,
+                         preprocessamento=preprocessamento)
+    cache = None if args.sem_cache else CacheConversao(args.pasta_cache)
+    indice_busca = abrir_indice_busca(args.indice_busca) if args.indice_busca else None
+    if args.log_metricas:
+        configurar_log_metricas(args.log_metricas, logging.DEBUG if args.metricas_por_pagina else logging.INFO)
+    inicio = time.monotonic()
+    try:
+        # As mensagens dos conversores não podem se misturar às linhas JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            agendador = AgendadorLote(
+                args.saida,
+                args.formato or 'txt',
+                args.ocr == 'sempre',
+                motor_ocr,
+                cache,
+                max_documentos=args.jobs,
+                ao_concluir_arquivo=emitir_resultado,
+                extrator=args.extrator,
+                perfil=args.perfil,
+                paginas=args.paginas,
+                max_caracteres=args.max_caracteres,
+                indice_busca=indice_busca
+            )
+            resultados = agendador.executar(arquivos)
+    finally:
+        motor_ocr.encerrar()
+        if indice_busca is not None:
+            indice_busca.fechar()
+
+    if args.prometheus:
+        registro_metricas.gravar_prometheus(args.prometheus)
+
+    falhas = sum(1 for resultado in resultados if not resultado['sucesso'])
+    print(f'{len(resultados) - falhas} arquivo(s) convertido(s), {falhas} falha(s) em '
+          f'{time.monotonic() - inicio:.1f}s.', file=sys.stderr)
+    return 1 if falhas else 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
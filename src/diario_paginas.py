@@ -0,0 +1,92 @@
+import os
+import json
+from texto_pagina import registro_pagina, texto_do_registro
+
+# Extensão do diário gravado ao lado do arquivo de saída
+EXTENSAO_DIARIO = '.paginas.jsonl'
+
+class DiarioPaginas:
+    """
+    Diário de páginas já extraídas de uma conversão, gravado ao lado do
+    arquivo de saída. Cada página é registrada assim que fica pronta, então
+    uma nova execução com o mesmo arquivo e as mesmas opções continua a
+    partir da primeira página que ainda não foi registrada.
+
+    Formato: a primeira linha guarda a chave da conversão e cada linha
+    seguinte guarda o número e o texto de uma página, em JSON (e as
+    palavras, nas páginas reconhecidas com a posição das palavras).
+    """
+
+    def __init__(self, caminho_saida, chave):
+        """
+        :param caminho_saida: Caminho do arquivo de saída da conversão
+        :param chave: Chave da conversão (conteúdo do PDF e opções de extração)
+        """
+        self.caminho = caminho_saida + EXTENSAO_DIARIO
+        self.chave = chave
+        self.total_registradas = 0
+
+        tamanho_valido = self._verificar_diario_existente()
+        if tamanho_valido:
+            # Descarta uma eventual linha incompleta deixada por uma interrupção
+            os.truncate(self.caminho, tamanho_valido)
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        else:
+            self._arquivo = open(self.caminho, 'w', encoding='utf-8')
+            self._arquivo.write(json.dumps({'chave': chave}) + '\n')
+            self._arquivo.flush()
+
+    def _verificar_diario_existente(self):
+        """
+        Conta as páginas consecutivas registradas por uma execução anterior
+        :return: Tamanho em bytes da parte válida do diário ou 0 se ele não puder ser reaproveitado
+        """
+        if not os.path.exists(self.caminho):
+            return 0
+
+        tamanho_valido = 0
+        with open(self.caminho, 'rb') as arquivo:
+            for numero_linha, linha in enumerate(arquivo):
+                if not linha.endswith(b'\n'):
+                    break
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    break
+                if numero_linha == 0:
+                    if registro.get('chave') != self.chave:
+                        return 0
+                elif registro.get('pagina') != self.total_registradas + 1:
+                    break
+                else:
+                    self.total_registradas += 1
+                tamanho_valido += len(linha)
+        return tamanho_valido
+
+    def paginas_registradas(self):
+        """
+        :return: Gerador com o texto das páginas registradas por execuções anteriores
+        """
+        with open(self.caminho, 'r', encoding='utf-8') as arquivo:
+            next(arquivo)
+            for _, linha in zip(range(self.total_registradas), arquivo):
+                registro = json.loads(linha)
+                yield texto_do_registro(registro if 'palavras' in registro else registro['texto'])
+
+    def registrar(self, numero_pagina, texto):
+        """Grava o texto de uma página no diário"""
+        registro = registro_pagina(texto)
+        registro = {'pagina': numero_pagina, **(registro if isinstance(registro, dict) else {'texto': registro})}
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+
+    def fechar(self):
+        """Fecha o diário mantendo-o no disco para uma retomada futura"""
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+    def concluir(self):
+        """Remove o diário após a conversão terminar com sucesso"""
+        self.fechar()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
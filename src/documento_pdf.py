@@ -0,0 +1,81 @@
+import mmap
+import PyPDF2
+from pdf2image import pdfinfo_from_path
+from ambiente_ocr import obter_ambiente_ocr
+
+class DocumentoPDF:
+    """
+    Sessão de um PDF durante uma conversão. O arquivo é aberto uma única vez
+    e mapeado na memória; o PyPDF2 lê a tabela xref e a árvore de páginas só
+    no primeiro uso, e o número de páginas e o tamanho de cada página ficam
+    guardados. A extração da camada de texto, a escolha do DPI e a extração
+    das imagens embutidas usam a mesma sessão, em vez de cada etapa abrir e
+    interpretar o arquivo de novo. Ferramentas externas (Poppler, PDFium)
+    recebem o caminho do arquivo.
+
+    Uma sessão pertence a uma conversão e não deve ser usada por duas
+    threads ao mesmo tempo.
+    """
+
+    def __init__(self, caminho_pdf):
+        """
+        :param caminho_pdf: Caminho do arquivo PDF
+        """
+        self.caminho = caminho_pdf
+        self._arquivo = open(caminho_pdf, 'rb')
+        try:
+            self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Arquivos vazios (e alguns sistemas de arquivos de rede) não podem ser mapeados
+            self._mapa = None
+        self._leitor = None
+        self._total_paginas = None
+        self._tamanhos = {}
+
+    @property
+    def leitor(self):
+        """PdfReader do PyPDF2, criado no primeiro acesso"""
+        if self._leitor is None:
+            self._leitor = PyPDF2.PdfReader(self._mapa if self._mapa is not None else self._arquivo)
+        return self._leitor
+
+    @property
+    def total_paginas(self):
+        """Número de páginas, lido da árvore de páginas (ou pelo Poppler, se o PyPDF2 não abrir o arquivo)"""
+        if self._total_paginas is None:
+            try:
+                self._total_paginas = len(self.leitor.pages)
+            except Exception:
+                poppler_path = obter_ambiente_ocr().poppler_path
+                self._total_paginas = pdfinfo_from_path(self.caminho, poppler_path=poppler_path)['Pages']
+        return self._total_paginas
+
+    def pagina(self, numero):
+        """Página do PyPDF2 (a partir de 1); o conteúdo só é interpretado quando usado"""
+        return self.leitor.pages[numero - 1]
+
+    def tamanho_pagina(self, numero):
+        """
+        Tamanho físico de uma página
+        :return: Tupla (largura, altura) em pontos (1/72 pol.), considerando o /UserUnit
+        """
+        if numero not in self._tamanhos:
+            pagina = self.pagina(numero)
+            caixa = pagina.mediabox
+            unidade = float(pagina.get('/UserUnit', 1))
+            self._tamanhos[numero] = (float(caixa.width) * unidade, float(caixa.height) * unidade)
+        return self._tamanhos[numero]
+
+    def fechar(self):
+        """Libera o mapeamento e o arquivo"""
+        self._leitor = None
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
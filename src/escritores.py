@@ -0,0 +1,249 @@
+import io
+import os
+import re
+import json
+import zipfile
+import threading
+from xml.sax.saxutils import escape
+from docx import Document
+from docx.shared import Pt
+from texto_pagina import TextoPagina
+
+class EscritorTXT:
+    """
+    Grava o texto de cada página diretamente no arquivo TXT assim que ele é
+    extraído. O arquivo é descarregado no disco a cada página, então uma
+    conversão interrompida mantém as páginas já processadas.
+    """
+
+    def __init__(self, caminho_saida):
+        """
+        :param caminho_saida: Caminho do arquivo TXT
+        """
+        self.caminho_saida = caminho_saida
+        self.possui_texto = False
+        self._arquivo = open(caminho_saida, 'w', encoding='utf-8')
+
+    def adicionar_pagina(self, texto):
+        """Acrescenta o texto de uma página ao arquivo"""
+        self._arquivo.write(texto + '\n')
+        self._arquivo.flush()
+        if texto.strip():
+            self.possui_texto = True
+
+    def fechar(self):
+        """Fecha o arquivo de saída"""
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+PARTE_DOCUMENTO = 'word/document.xml'
+_MODELO_DOCX = None
+_lock_modelo = threading.Lock()
+
+# Caracteres de controle não são aceitos em XML (o python-docx recusava o texto inteiro)
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# Tabulações e quebras de linha interrompem o texto do run, como em Run.text do python-docx
+_TAB_XML = '</w:t><w:tab/><w:t xml:space="preserve">'
+_QUEBRA_LINHA_XML = '</w:t><w:br/><w:t xml:space="preserve">'
+_QUEBRA_PAGINA = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+def _modelo_docx():
+    """
+    Monta uma única vez o pacote DOCX do modelo padrão do python-docx com o
+    estilo Normal em Arial 11
+    :return: Tupla (bytes do pacote sem o word/document.xml, início do
+             document.xml até <w:body>, final a partir de <w:sectPr>)
+    """
+    global _MODELO_DOCX
+    with _lock_modelo:
+        if _MODELO_DOCX is None:
+            doc = Document()
+            style = doc.styles['Normal']
+            style.font.name = 'Arial'
+            style.font.size = Pt(11)
+            original = io.BytesIO()
+            doc.save(original)
+
+            pacote = io.BytesIO()
+            with zipfile.ZipFile(original) as entrada, zipfile.ZipFile(pacote, 'w', zipfile.ZIP_DEFLATED) as saida:
+                for info in entrada.infolist():
+                    if info.filename == PARTE_DOCUMENTO:
+                        documento = entrada.read(info).decode('utf-8')
+                    else:
+                        saida.writestr(info, entrada.read(info))
+            inicio = documento.index('<w:body>') + len('<w:body>')
+            fim = documento.index('<w:sectPr')
+            _MODELO_DOCX = (pacote.getvalue(), documento[:inicio].encode('utf-8'), documento[fim:].encode('utf-8'))
+        return _MODELO_DOCX
+
+def _paragrafo_xml(texto):
+    """Gera o parágrafo que doc.add_paragraph(texto) criaria, com tabulações e quebras de linha no mesmo run"""
+    texto = _CARACTERES_INVALIDOS_XML.sub('', texto)
+    if not texto:
+        return '<w:p/>'
+    xml = escape(texto).replace('\t', _TAB_XML).replace('\n', _QUEBRA_LINHA_XML).replace('\r', _QUEBRA_LINHA_XML)
+    return f'<w:p><w:r><w:t xml:space="preserve">{xml}</w:t></w:r></w:p>'
+
+class EscritorDOCX:
+    """
+    Grava o documento Word sem o modelo de objetos do python-docx: as partes
+    fixas do pacote (estilos com Arial 11, tema, configurações) vêm de um
+    modelo montado uma vez por processo, e o WordprocessingML de cada página
+    é comprimido direto na entrada word/document.xml do arquivo. O custo e a
+    memória ficam próximos aos da saída TXT, qualquer que seja o tamanho do
+    documento.
+    """
+
+    def __init__(self, caminho_saida):
+        """
+        :param caminho_saida: Caminho do arquivo DOCX
+        """
+        self.caminho_saida = caminho_saida
+        self.possui_texto = False
+        self._paginas = 0
+        self._fechado = False
+
+        pacote, self._inicio_documento, self._fim_documento = _modelo_docx()
+        with open(caminho_saida, 'wb') as arquivo:
+            arquivo.write(pacote)
+        # As partes do modelo já estão comprimidas; só o document.xml é acrescentado ao pacote
+        self._zip = zipfile.ZipFile(caminho_saida, 'a', zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._documento = self._zip.open(PARTE_DOCUMENTO, 'w', force_zip64=True)
+        self._documento.write(self._inicio_documento)
+
+    def adicionar_pagina(self, texto):
+        """Acrescenta o texto de uma página ao documento"""
+        # Adiciona uma quebra de página entre as páginas
+        xml = _paragrafo_xml(texto)
+        if self._paginas > 0:
+            xml = _QUEBRA_PAGINA + xml
+        self._documento.write(xml.encode('utf-8'))
+        self._paginas += 1
+        if texto.strip():
+            self.possui_texto = True
+
+    def fechar(self):
+        """Fecha o corpo do documento e o pacote DOCX"""
+        if not self._fechado:
+            self._documento.write(self._fim_documento)
+            self._documento.close()
+            self._zip.close()
+            self._fechado = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+class EscritorJSONL:
+    """
+    Grava uma linha JSON por página com a posição da página na saída, a
+    origem do texto ('texto' para a camada de texto do PDF, 'ocr' para o
+    reconhecimento) e o texto. Nas páginas reconhecidas por OCR, a linha
+    também traz o tamanho da imagem reconhecida e cada palavra com a caixa
+    em pixels dessa imagem e a confiança do Tesseract.
+    """
+
+    def __init__(self, caminho_saida):
+        """
+        :param caminho_saida: Caminho do arquivo JSONL
+        """
+        self.caminho_saida = caminho_saida
+        self.possui_texto = False
+        self._paginas = 0
+        self._arquivo = open(caminho_saida, 'w', encoding='utf-8')
+
+    def adicionar_pagina(self, texto):
+        """Acrescenta uma página ao arquivo"""
+        self._paginas += 1
+        registro = {'pagina': self._paginas, 'origem': 'texto', 'texto': str(texto)}
+        if isinstance(texto, TextoPagina):
+            registro.update(origem='ocr', largura=texto.largura, altura=texto.altura, palavras=texto.palavras)
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+        if texto.strip():
+            self.possui_texto = True
+
+    def fechar(self):
+        """Fecha o arquivo de saída"""
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+ESCRITORES = {
+    'txt': EscritorTXT,
+    'docx': EscritorDOCX,
+    'jsonl': EscritorJSONL,
+}
+
+# Formatos que precisam da posição das palavras reconhecidas pelo OCR
+FORMATOS_COM_PALAVRAS = {'jsonl'}
+
+def normalizar_formatos(formatos):
+    """
+    Converte um formato ou um conjunto de formatos em uma tupla sem
+    repetições, na ordem de ESCRITORES
+    :param formatos: 'txt', 'txt,jsonl' ou uma coleção como {'docx', 'jsonl'}
+    :raises ValueError: Se algum formato não existir ou nenhum for informado
+    """
+    if isinstance(formatos, str):
+        formatos = formatos.split(',')
+    formatos = {formato.strip().lower() for formato in formatos if formato.strip()}
+    desconhecidos = formatos - set(ESCRITORES)
+    if desconhecidos:
+        raise ValueError(f'Formato de saída desconhecido: {", ".join(sorted(desconhecidos))} '
+                         f'(disponíveis: {", ".join(ESCRITORES)})')
+    if not formatos:
+        raise ValueError('Nenhum formato de saída informado')
+    return tuple(formato for formato in ESCRITORES if formato in formatos)
+
+def desfazer_link_saida(caminho_saida):
+    """
+    Remove um arquivo de saída que é hard link de outras saídas, para que
+    uma nova conversão grave um arquivo próprio em vez de alterar as cópias
+    """
+    try:
+        if os.stat(caminho_saida).st_nlink > 1:
+            os.remove(caminho_saida)
+    except FileNotFoundError:
+        pass
+
+def criar_escritor(formato, caminho_saida):
+    """
+    Cria o escritor incremental para o formato informado
+    :param formato: Formato de saída ('txt', 'docx' ou 'jsonl')
+    :param caminho_saida: Caminho do arquivo de saída
+    """
+    # Uma saída compartilhada por hard link com duplicatas (veja reaproveitar_saida) não é truncada no lugar
+    desfazer_link_saida(caminho_saida)
+    return ESCRITORES[formato](caminho_saida)
+
+def criar_escritores(saidas):
+    """
+    Cria os escritores de todas as saídas de uma conversão, que recebem as
+    mesmas páginas de uma única extração
+    :param saidas: Dicionário formato -> caminho do arquivo de saída
+    :return: Lista de escritores, na ordem das saídas
+    """
+    escritores = []
+    try:
+        for formato, caminho_saida in saidas.items():
+            escritores.append(criar_escritor(formato, caminho_saida))
+    except Exception:
+        # Os arquivos já abertos não ficam presos se uma das saídas não puder ser criada
+        for escritor in escritores:
+            escritor.fechar()
+        raise
+    return escritores
@@ -0,0 +1,188 @@
+import os
+import subprocess
+import threading
+from ambiente_ocr import obter_ambiente_ocr
+
+try:
+    import pypdfium2
+except ImportError:
+    # Dependência opcional: sem ela o extrator pypdfium2 não fica disponível
+    pypdfium2 = None
+
+# Extrator de reserva: usado quando o escolhido não está disponível ou não consegue abrir o PDF
+EXTRATOR_RESERVA = 'pypdf2'
+
+# Ordem de preferência da escolha automática (do mais rápido ao mais lento)
+PREFERENCIA_AUTOMATICA = ('pypdfium2', 'pdftotext', 'pypdf2')
+
+# Extratores de texto disponíveis, pelo nome
+EXTRATORES_TEXTO = {}
+
+def registrar_extrator(classe):
+    """Registra uma classe de extrator de texto pelo seu atributo nome (pode ser usada como decorador)"""
+    EXTRATORES_TEXTO[classe.nome] = classe
+    return classe
+
+class ExtratorTexto:
+    """
+    Base dos extratores da camada de texto. Todo extrator recebe o
+    DocumentoPDF da conversão na criação, informa total_paginas, oferece
+    paginas(numeros_paginas),
+    um gerador com o texto de cada página pedida, e fechar(). Só as páginas
+    pedidas são lidas.
+    """
+
+    nome = None
+
+    @staticmethod
+    def disponivel():
+        """Verifica se o extrator pode ser usado nesta máquina"""
+        return True
+
+    def fechar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+@registrar_extrator
+class ExtratorPyPDF2(ExtratorTexto):
+    """
+    Extrai a camada de texto com o PyPDF2, em Python puro. É o extrator mais
+    lento, mas não depende de nada além dos requisitos do projeto.
+    """
+
+    nome = 'pypdf2'
+
+    def __init__(self, documento):
+        # Usa o PdfReader da sessão, compartilhado com o OCR
+        self._documento = documento
+        self.total_paginas = len(documento.leitor.pages)
+
+    def paginas(self, numeros_paginas=None):
+        if numeros_paginas is None:
+            numeros_paginas = range(1, self.total_paginas + 1)
+        # O PyPDF2 só interpreta o conteúdo das páginas acessadas
+        for i in numeros_paginas:
+            yield self._documento.pagina(i).extract_text()
+
+# A PDFium não pode ser usada por duas threads ao mesmo tempo
+_lock_pdfium = threading.Lock()
+
+@registrar_extrator
+class ExtratorPdfium(ExtratorTexto):
+    """Extrai a camada de texto com a PDFium (pypdfium2), a mesma biblioteca do Chrome"""
+
+    nome = 'pypdfium2'
+
+    @staticmethod
+    def disponivel():
+        return pypdfium2 is not None
+
+    def __init__(self, documento):
+        with _lock_pdfium:
+            self._documento = pypdfium2.PdfDocument(documento.caminho)
+            self.total_paginas = len(self._documento)
+
+    def paginas(self, numeros_paginas=None):
+        if numeros_paginas is None:
+            numeros_paginas = range(1, self.total_paginas + 1)
+        for i in numeros_paginas:
+            with _lock_pdfium:
+                pagina = self._documento[i - 1]
+                camada_texto = pagina.get_textpage()
+                texto = camada_texto.get_text_range()
+                camada_texto.close()
+                pagina.close()
+            yield texto.replace('\r\n', '\n')
+
+    def fechar(self):
+        with _lock_pdfium:
+            self._documento.close()
+
+@registrar_extrator
+class ExtratorPdftotext(ExtratorTexto):
+    """
+    Extrai a camada de texto com o pdftotext do Poppler, que o OCR já usa.
+    As páginas são pedidas em blocos para que cada processo do pdftotext
+    atenda várias páginas sem carregar o documento inteiro na memória.
+    """
+
+    nome = 'pdftotext'
+
+    # Páginas extraídas por execução do pdftotext
+    PAGINAS_POR_BLOCO = 32
+
+    @staticmethod
+    def disponivel():
+        return obter_ambiente_ocr().poppler_disponivel
+
+    def __init__(self, documento):
+        self.caminho_pdf = documento.caminho
+        self._poppler_path = obter_ambiente_ocr().poppler_path
+        self.total_paginas = documento.total_paginas
+
+    def paginas(self, numeros_paginas=None):
+        if numeros_paginas is None:
+            numeros_paginas = range(1, self.total_paginas + 1)
+        executavel = os.path.join(self._poppler_path, 'pdftotext') if self._poppler_path else 'pdftotext'
+        for inicio, fim in _blocos_contiguos(numeros_paginas, self.PAGINAS_POR_BLOCO):
+            resultado = subprocess.run(
+                [executavel, '-f', str(inicio), '-l', str(fim), '-enc', 'UTF-8', self.caminho_pdf, '-'],
+                capture_output=True,
+                check=True
+            )
+            # O pdftotext termina cada página com um caractere de quebra de página
+            textos = resultado.stdout.decode('utf-8', errors='replace').split('\f')
+            for numero in range(fim - inicio + 1):
+                yield textos[numero] if numero < len(textos) else ''
+
+def _blocos_contiguos(numeros_paginas, tamanho_maximo):
+    """
+    Agrupa números de página crescentes em blocos contíguos de no máximo tamanho_maximo páginas
+    :return: Gerador de tuplas (primeira, última)
+    """
+    inicio = fim = None
+    for numero in numeros_paginas:
+        if inicio is not None and numero == fim + 1 and numero - inicio < tamanho_maximo:
+            fim = numero
+            continue
+        if inicio is not None:
+            yield inicio, fim
+        inicio = fim = numero
+    if inicio is not None:
+        yield inicio, fim
+
+def escolher_extrator(nome='auto'):
+    """
+    Resolve o nome do extrator a ser usado
+    :param nome: Nome de um extrator registrado ou 'auto' para o mais rápido disponível
+    :return: Nome do extrator
+    :raises ValueError: Se o extrator não existir
+    """
+    if nome == 'auto':
+        return next(candidato for candidato in PREFERENCIA_AUTOMATICA if EXTRATORES_TEXTO[candidato].disponivel())
+    if nome not in EXTRATORES_TEXTO:
+        raise ValueError(f'Extrator de texto desconhecido: {nome} (disponíveis: auto, {", ".join(sorted(EXTRATORES_TEXTO))})')
+    return nome
+
+def abrir_extrator(documento, nome='auto'):
+    """
+    Abre o PDF com o extrator escolhido; se ele não estiver disponível ou não
+    conseguir abrir o arquivo, usa o PyPDF2
+    :param documento: DocumentoPDF da conversão
+    :param nome: Nome de um extrator registrado ou 'auto'
+    """
+    classe = EXTRATORES_TEXTO[escolher_extrator(nome)]
+    if classe.nome != EXTRATOR_RESERVA:
+        if not classe.disponivel():
+            print(f'AVISO: Extrator {classe.nome} não disponível. Usando {EXTRATOR_RESERVA}.')
+        else:
+            try:
+                return classe(documento)
+            except Exception as e:
+                print(f'AVISO: O extrator {classe.nome} não conseguiu abrir o PDF ({e}). Usando {EXTRATOR_RESERVA}.')
+    return EXTRATORES_TEXTO[EXTRATOR_RESERVA](documento)
@@ -0,0 +1,272 @@
+import io
+import os
+import struct
+from PyPDF2.generic import ContentStream
+from PIL import Image
+
+# Operadores que só mudam o estado gráfico: uma página que usa apenas eles e
+# um único Do não tem nada além da imagem (nem texto, nem vetores)
+OPERADORES_ESTADO = {b'q', b'Q', b'cm', b'gs', b'w', b'J', b'j', b'M', b'd', b'ri', b'i'}
+
+# Fração mínima da página que a imagem precisa cobrir para ser tratada como a página digitalizada
+COBERTURA_MINIMA = 0.9
+
+# Imagens até 10% acima do DPI máximo do pré-processamento são usadas sem redução
+FOLGA_DPI = 1.1
+
+def _lista(valor):
+    """Normaliza /Filter e /DecodeParms, que podem ser um único item ou um array"""
+    if valor is None:
+        return []
+    valor = valor.get_object()
+    return list(valor) if isinstance(valor, list) else [valor]
+
+def _componentes_cor(espaco_cor):
+    """Número de componentes de /DeviceGray, /DeviceRGB ou /ICCBased (None para os demais espaços)"""
+    if espaco_cor is None:
+        return None
+    espaco_cor = espaco_cor.get_object()
+    if espaco_cor == '/DeviceGray':
+        return 1
+    if espaco_cor == '/DeviceRGB':
+        return 3
+    if isinstance(espaco_cor, list) and len(espaco_cor) == 2 and espaco_cor[0] == '/ICCBased':
+        componentes = espaco_cor[1].get_object().get('/N')
+        return componentes if componentes in (1, 3) else None
+    return None
+
+def _multiplicar(m, n):
+    """Produto de duas matrizes de transformação do PDF (a, b, c, d, e, f)"""
+    return (m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+            m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+            m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5])
+
+def _faixa_tiff(tiff):
+    """
+    Extrai os dados da única faixa (strip) de um TIFF
+    :return: Bytes da faixa ou None se não for um TIFF de uma faixa
+    """
+    ordem = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if ordem is None or struct.unpack(ordem + 'H', tiff[2:4])[0] != 42:
+        return None
+    posicao = struct.unpack(ordem + 'L', tiff[4:8])[0]
+    total = struct.unpack(ordem + 'H', tiff[posicao:posicao + 2])[0]
+    valores = {}
+    for indice in range(total):
+        inicio = posicao + 2 + indice * 12
+        etiqueta, tipo, quantidade = struct.unpack(ordem + 'HHL', tiff[inicio:inicio + 8])
+        if quantidade == 1:
+            formato = ordem + ('H' if tipo == 3 else 'L')
+            valores[etiqueta] = struct.unpack_from(formato, tiff, inicio + 8)[0]
+    if 273 not in valores or 279 not in valores:
+        return None
+    # StripOffsets e StripByteCounts
+    return tiff[valores[273]:valores[273] + valores[279]]
+
+def _dados_comprimidos(imagem, filtro):
+    """
+    Dados da imagem ainda comprimidos pelo filtro do PDF, obtidos pela API
+    pública do PyPDF2: o get_data() devolve o JPEG (DCTDecode) sem alterá-lo
+    e os dados CCITT dentro de um TIFF montado por ele, de onde são retirados
+    :return: Bytes comprimidos ou None se o formato devolvido não for o esperado
+             (a página é então rasterizada)
+    """
+    dados = imagem.get_data()
+    if filtro == '/DCTDecode':
+        return dados if dados[:2] == b'\xff\xd8' else None
+    if filtro == '/CCITTFaxDecode':
+        return _faixa_tiff(dados)
+    return None
+
+def _tiff_ccitt(dados, largura, altura, parametros, dpi):
+    """
+    Monta um TIFF com os dados CCITT da imagem, sem decodificá-los
+    :return: Bytes do TIFF ou None se os parâmetros não tiverem equivalente no TIFF
+    """
+    k = parametros.get('/K', 0)
+    if parametros.get('/EncodedByteAlign', False) and k < 0:
+        return None
+    colunas = parametros.get('/Columns', 1728)
+    linhas = parametros.get('/Rows', altura) or altura
+    if colunas != largura or linhas != altura:
+        return None
+    # BlackIs1 indica que o codificador inverteu as cores
+    fotometria = 1 if parametros.get('/BlackIs1', False) else 0
+
+    entradas = [
+        (256, 4, largura),                 # ImageWidth
+        (257, 4, altura),                  # ImageLength
+        (258, 3, 1),                       # BitsPerSample
+        (259, 3, 4 if k < 0 else 3),       # Compression: grupo 4 ou grupo 3
+        (262, 3, fotometria),              # PhotometricInterpretation
+        (273, 4, 0),                       # StripOffsets (preenchido abaixo)
+        (277, 3, 1),                       # SamplesPerPixel
+        (278, 4, altura),                  # RowsPerStrip
+        (279, 4, len(dados)),              # StripByteCounts
+        (282, 5, 0),                       # XResolution (preenchido abaixo)
+        (283, 5, 0),                       # YResolution
+        (296, 3, 2),                       # ResolutionUnit: polegada
+    ]
+    if k >= 0:
+        # T4Options: codificação 2D (K > 0) e bits de preenchimento antes de cada linha
+        entradas.append((292, 4, (1 if k > 0 else 0) | (4 if parametros.get('/EncodedByteAlign', False) else 0)))
+    entradas.sort()
+
+    inicio_ifd = 8
+    inicio_resolucao = inicio_ifd + 2 + 12 * len(entradas) + 4
+    inicio_dados = inicio_resolucao + 16
+    ifd = struct.pack('<H', len(entradas))
+    for tag, tipo, valor in entradas:
+        if tag == 273:
+            valor = inicio_dados
+        elif tag in (282, 283):
+            valor = inicio_resolucao + (0 if tag == 282 else 8)
+        # Valores SHORT ocupam os dois primeiros bytes do campo de quatro bytes
+        ifd += struct.pack('<HHIHH' if tipo == 3 else '<HHII', tag, tipo, 1, valor, *((0,) if tipo == 3 else ()))
+    ifd += struct.pack('<I', 0)
+    resolucao = struct.pack('<IIII', int(dpi * 100), 100, int(dpi * 100), 100)
+    return b'II*\x00' + struct.pack('<I', inicio_ifd) + ifd + resolucao + dados
+
+class ExtratorImagens:
+    """
+    Extrai a imagem de páginas digitalizadas, em que a página inteira é uma
+    única imagem JPEG (DCTDecode), CCITT ou FlateDecode: os bytes da imagem
+    são gravados para o OCR na resolução original, sem que o Poppler tenha
+    que decodificar, renderizar e codificar a página de novo. Páginas com
+    texto, vetores, várias imagens, rotação ou outros filtros (JBIG2,
+    JPEG 2000) continuam sendo rasterizadas.
+    """
+
+    def __init__(self, documento, preprocessamento):
+        """
+        :param documento: DocumentoPDF da conversão
+        :param preprocessamento: PreprocessamentoOCR com os limites de DPI e o modo de cor
+        """
+        self.documento = documento
+        self.preprocessamento = preprocessamento
+
+    def _imagem_unica(self, pagina):
+        """
+        Procura a imagem que forma a página
+        :return: Tupla (XObject da imagem, largura e altura ocupadas em pontos) ou None
+        """
+        if int(pagina.get('/Rotate', 0)) % 360:
+            return None
+        recursos = pagina.get('/Resources')
+        objetos = recursos.get_object().get('/XObject') if recursos is not None else None
+        if objetos is None:
+            return None
+        objetos = objetos.get_object()
+        conteudo = pagina.get_contents()
+        if conteudo is None:
+            return None
+
+        matriz = (1, 0, 0, 1, 0, 0)
+        pilha = []
+        desenho = None
+        for operandos, operador in ContentStream(conteudo, self.documento.leitor).operations:
+            if operador == b'q':
+                pilha.append(matriz)
+            elif operador == b'Q':
+                matriz = pilha.pop() if pilha else matriz
+            elif operador == b'cm':
+                matriz = _multiplicar(tuple(float(valor) for valor in operandos), matriz)
+            elif operador == b'Do':
+                if desenho is not None:
+                    return None
+                desenho = (operandos[0], matriz)
+            elif operador not in OPERADORES_ESTADO:
+                return None
+        if desenho is None or desenho[0] not in objetos:
+            return None
+
+        nome, (a, b, c, d, _, _) = desenho
+        imagem = objetos[nome].get_object()
+        # Só imagens na posição normal: sem rotação nem espelhamento
+        if imagem.get('/Subtype') != '/Image' or b or c or a <= 0 or d <= 0:
+            return None
+        caixa = pagina.cropbox
+        area_pagina = float(caixa.width) * float(caixa.height)
+        if area_pagina <= 0 or a * d < COBERTURA_MINIMA * area_pagina:
+            return None
+        unidade = float(pagina.get('/UserUnit', 1))
+        return imagem, a * unidade, d * unidade
+
+    def extrair(self, numero_pagina, pasta):
+        """
+        Grava a imagem da página para o OCR
+        :param numero_pagina: Número da página (a partir de 1)
+        :param pasta: Pasta onde a imagem é gravada
+        :return: Caminho da imagem ou None se a página precisar ser rasterizada
+        """
+        try:
+            encontrada = self._imagem_unica(self.documento.pagina(numero_pagina))
+            if encontrada is None:
+                return None
+            return self._gravar(numero_pagina, pasta, *encontrada)
+        except Exception:
+            # Páginas que não puderem ser analisadas seguem pelo caminho normal
+            return None
+
+    def _gravar(self, numero_pagina, pasta, imagem, largura_pontos, altura_pontos):
+        if imagem.get('/ImageMask') or '/Decode' in imagem or '/SMask' in imagem or '/Mask' in imagem:
+            return None
+        filtros = _lista(imagem.get('/Filter'))
+        if len(filtros) != 1:
+            return None
+        parametros = (_lista(imagem.get('/DecodeParms')) or [{}])[0]
+        parametros = parametros.get_object() if parametros else {}
+        largura, altura = int(imagem['/Width']), int(imagem['/Height'])
+        bits = imagem.get('/BitsPerComponent', 1)
+        componentes = _componentes_cor(imagem.get('/ColorSpace', '/DeviceGray'))
+
+        preprocessamento = self.preprocessamento
+        dpi_original = largura / (largura_pontos / 72)
+        dpi_pagina = preprocessamento.dpi_pagina(largura_pontos, altura_pontos)
+        limite = min(preprocessamento.dpi_maximo, preprocessamento.max_pixels_lado * 72 /
+                     max(largura_pontos, altura_pontos)) * FOLGA_DPI
+        # Imagens de baixa resolução ficam melhores ampliadas pelo Poppler
+        if dpi_original < preprocessamento.dpi_minimo:
+            return None
+
+        # Os dados comprimidos vão direto para o arquivo, sem decodificar a imagem
+        filtro = filtros[0]
+        if filtro == '/DCTDecode' and componentes and bits == 8:
+            dados, extensao = _dados_comprimidos(imagem, filtro), '.jpg'
+        elif filtro == '/CCITTFaxDecode' and componentes == 1:
+            dados = _dados_comprimidos(imagem, filtro)
+            if dados is not None:
+                dados = _tiff_ccitt(dados, largura, altura, parametros, dpi_original)
+            extensao = '.tif'
+        elif filtro == '/FlateDecode' and componentes and bits in (1, 8) and not (bits == 1 and componentes == 3):
+            modo = '1' if bits == 1 else ('L' if componentes == 1 else 'RGB')
+            dados, extensao = Image.frombytes(modo, (largura, altura), imagem.get_data()), '.png'
+        else:
+            return None
+        if dados is None:
+            return None
+
+        caminho = os.path.join(pasta, f'pagina_embutida_{numero_pagina}{extensao}')
+        if dpi_original > limite:
+            # Resoluções acima do limite do pré-processamento são reduzidas ao DPI da página
+            fator = dpi_pagina / dpi_original
+            tamanho = (max(1, round(largura * fator)), max(1, round(altura * fator)))
+            if isinstance(dados, bytes):
+                with Image.open(io.BytesIO(dados)) as aberta:
+                    # No JPEG, a redução por potências de 2 é feita na própria decodificação
+                    aberta.draft(aberta.mode, tamanho)
+                    dados = aberta.convert('L' if aberta.mode == '1' else aberta.mode)
+            elif dados.mode == '1':
+                dados = dados.convert('L')
+            dados = dados.resize(tamanho, Image.LANCZOS)
+            caminho = os.path.join(pasta, f'pagina_embutida_{numero_pagina}.png')
+            dpi_original = dpi_pagina
+
+        if isinstance(dados, bytes):
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(dados)
+        else:
+            if preprocessamento.tons_de_cinza and dados.mode == 'RGB':
+                dados = dados.convert('L')
+            dados.save(caminho, dpi=(dpi_original, dpi_original), compress_level=1)
+        return caminho
@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from cache_conversao import calcular_hash_arquivo
+from selecao_paginas import interpretar_paginas, descrever_paginas, numero_na_selecao
+
+# Nome do banco gravado na pasta de saída
+NOME_INDICE_BUSCA = '.indice_busca.sqlite3'
+
+# Pasta de saída padrão da interface gráfica e do monitor
+PASTA_SAIDA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'arquivos_convertidos')
+
+# O rowid de cada página guarda o documento nos bits altos e o número da página nos 20 bits baixos,
+# para que as páginas de um documento sejam removidas por um intervalo de rowid
+BITS_PAGINA = 20
+MASCARA_PAGINA = (1 << BITS_PAGINA) - 1
+
+# Páginas gravadas entre dois commits: as buscas enxergam um documento enquanto ele é convertido
+PAGINAS_POR_TRANSACAO = 200
+
+def _descrever_selecao(intervalos, max_caracteres):
+    """Descreve a seleção de páginas e o limite de caracteres de uma conversão ('' para o PDF inteiro)"""
+    return f'{descrever_paginas(intervalos)}|{max_caracteres or ""}' if intervalos or max_caracteres else ''
+
+def _consulta_literal(consulta):
+    """Transforma cada palavra da consulta em um termo entre aspas (sem operadores do FTS5)"""
+    return ' '.join('"' + termo.replace('"', '""') + '"' for termo in consulta.split())
+
+class _DocumentoIndexado:
+    """Recebe as páginas de um documento à medida que a conversão as grava"""
+
+    def __init__(self, indice, id_documento, intervalos=None):
+        self._indice = indice
+        self._id = id_documento
+        self._intervalos = intervalos
+
+    def adicionar_pagina(self, numero, texto):
+        """
+        Indexa o texto de uma página (pode ser usada como ao_concluir_pagina das conversões)
+        :param numero: Posição da página na saída, convertida no número da página no PDF pela seleção
+        """
+        numero = numero_na_selecao(self._intervalos, numero)
+        if numero is not None:
+            self._indice._adicionar_pagina(self._id, numero, texto)
+
+    def concluir(self, completo=True):
+        """
+        Grava as páginas do documento
+        :param completo: Se False (por exemplo, com páginas que ficaram sem OCR), as páginas podem
+                         ser buscadas, mas o PDF é indexado de novo na próxima conversão
+        """
+        self._indice._concluir_documento(self._id, completo)
+
+    def descartar(self):
+        """Remove as páginas de uma conversão que falhou"""
+        self._indice._remover_documento(self._id)
+
+class IndiceBusca:
+    """
+    Índice de busca textual (SQLite FTS5) do texto convertido, página a
+    página. Cada página entra no índice assim que a conversão a grava, e um
+    documento só é indexado de novo quando o PDF muda (tamanho, data de
+    modificação e, com o mesmo tamanho, o hash do conteúdo). A busca ignora
+    acentos e maiúsculas e devolve os documentos e as páginas em que os
+    termos aparecem, ordenados pela relevância (BM25).
+
+    Uma única conexão é compartilhada pelas threads de conversão.
+    """
+
+    def __init__(self, caminho):
+        """
+        :param caminho: Arquivo do banco ou pasta de saída onde ele é gravado
+        :raises sqlite3.OperationalError: Se o SQLite não tiver o módulo FTS5
+        """
+        if os.path.isdir(caminho):
+            caminho = os.path.join(caminho, NOME_INDICE_BUSCA)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('''
+            CREATE TABLE IF NOT EXISTS documentos (
+                id INTEGER PRIMARY KEY,
+                caminho TEXT UNIQUE NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                saida TEXT,
+                completo INTEGER NOT NULL,
+                indexado_em REAL NOT NULL,
+                selecao TEXT NOT NULL DEFAULT ''
+            )
+        ''')
+        colunas = {linha[1] for linha in self._conexao.execute('PRAGMA table_info(documentos)')}
+        if 'selecao' not in colunas:
+            self._conexao.execute("ALTER TABLE documentos ADD COLUMN selecao TEXT NOT NULL DEFAULT ''")
+        self._conexao.execute('CREATE INDEX IF NOT EXISTS documentos_saida ON documentos (saida)')
+        self._conexao.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS paginas USING fts5(texto, tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._conexao.commit()
+
+    def precisa_indexar(self, caminho_pdf, info=None, paginas=None, max_caracteres=None):
+        """
+        Verifica se um PDF ainda não foi indexado por completo, foi indexado com
+        outra seleção de páginas ou mudou desde a indexação
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param info: Resultado de os.stat() do arquivo (opcional)
+        :param paginas: Seleção de páginas da conversão, aceita por interpretar_paginas() (None: todas)
+        :param max_caracteres: Limite de caracteres da conversão (opcional)
+        """
+        chave = os.path.normcase(os.path.abspath(caminho_pdf))
+        info = info or os.stat(caminho_pdf)
+        with self._lock:
+            registro = self._conexao.execute(
+                'SELECT id, tamanho, mtime_ns, hash, completo, selecao FROM documentos WHERE caminho = ?', (chave,)
+            ).fetchone()
+        if registro is None or not registro[4]:
+            return True
+        if registro[5] != _descrever_selecao(interpretar_paginas(paginas), max_caracteres):
+            return True
+
+        id_documento, tamanho, mtime_ns, hash_arquivo = registro[:4]
+        if (info.st_size, info.st_mtime_ns) == (tamanho, mtime_ns):
+            return False
+        if info.st_size != tamanho or calcular_hash_arquivo(caminho_pdf) != hash_arquivo:
+            return True
+        # Mesmo conteúdo com outra data (por exemplo, um arquivo copiado de novo)
+        with self._lock:
+            self._conexao.execute('UPDATE documentos SET mtime_ns = ? WHERE id = ?', (info.st_mtime_ns, id_documento))
+            self._conexao.commit()
+        return False
+
+    def iniciar_documento(self, caminho_pdf, info=None, saida=None, hash_arquivo=None, paginas=None,
+                          max_caracteres=None):
+        """
+        Começa a (re)indexação de um PDF, removendo as páginas indexadas antes
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param info: Resultado de os.stat() do arquivo antes da conversão (opcional)
+        :param saida: Arquivo convertido, devolvido nas buscas (opcional)
+        :param hash_arquivo: Hash do conteúdo, se já tiver sido calculado
+        :param paginas: Seleção de páginas da conversão (None: todas), guardada com o documento
+        :param max_caracteres: Limite de caracteres da conversão (opcional), guardado com o documento
+        :return: Objeto com adicionar_pagina(número, texto), concluir() e descartar()
+        """
+        chave = os.path.normcase(os.path.abspath(caminho_pdf))
+        info = info or os.stat(caminho_pdf)
+        hash_arquivo = hash_arquivo or calcular_hash_arquivo(caminho_pdf)
+        intervalos = interpretar_paginas(paginas)
+        with self._lock:
+            self._conexao.execute(
+                'INSERT INTO documentos (caminho, tamanho, mtime_ns, hash, saida, completo, indexado_em, selecao) '
+                'VALUES (?, ?, ?, ?, ?, 0, ?, ?) ON CONFLICT (caminho) DO UPDATE SET tamanho = excluded.tamanho, '
+                'mtime_ns = excluded.mtime_ns, hash = excluded.hash, saida = excluded.saida, completo = 0, '
+                'indexado_em = excluded.indexado_em, selecao = excluded.selecao',
+                (chave, info.st_size, info.st_mtime_ns, hash_arquivo, saida, time.time(),
+                 _descrever_selecao(intervalos, max_caracteres))
+            )
+            id_documento = self._conexao.execute('SELECT id FROM documentos WHERE caminho = ?', (chave,)).fetchone()[0]
+            self._remover_paginas(id_documento)
+            self._conexao.commit()
+        return _DocumentoIndexado(self, id_documento, intervalos)
+
+    def copiar_documento(self, saida_origem, caminho_pdf, info=None, saida=None, hash_arquivo=None):
+        """
+        Indexa um PDF com as páginas de outro já indexado com o mesmo conteúdo
+        (usado quando a saída de um PDF duplicado é reaproveitada sem conversão)
+        :param saida_origem: Arquivo convertido do PDF já indexado
+        :return: True se as páginas foram copiadas, False se a origem não está indexada por completo
+        """
+        chave = os.path.normcase(os.path.abspath(caminho_pdf))
+        with self._lock:
+            origem = self._conexao.execute(
+                'SELECT id, caminho, selecao FROM documentos WHERE saida = ? AND completo = 1', (saida_origem,)
+            ).fetchone()
+        if origem is None:
+            return False
+        if origem[1] == chave:
+            return True
+        documento = self.iniciar_documento(caminho_pdf, info, saida, hash_arquivo)
+        with self._lock:
+            inicio = origem[0] << BITS_PAGINA
+            self._conexao.execute(
+                'INSERT INTO paginas (rowid, texto) SELECT rowid - ? + ?, texto FROM paginas '
+                'WHERE rowid BETWEEN ? AND ?',
+                (inicio, documento._id << BITS_PAGINA, inicio, inicio + MASCARA_PAGINA)
+            )
+            # A cópia tem as mesmas páginas, da mesma seleção, que o original
+            self._conexao.execute('UPDATE documentos SET selecao = ? WHERE id = ?', (origem[2], documento._id))
+        documento.concluir()
+        return True
+
+    def _adicionar_pagina(self, id_documento, numero, texto):
+        if numero > MASCARA_PAGINA:
+            return
+        with self._lock:
+            self._conexao.execute('INSERT OR REPLACE INTO paginas (rowid, texto) VALUES (?, ?)',
+                                  ((id_documento << BITS_PAGINA) + numero, str(texto)))
+            self._pendentes += 1
+            if self._pendentes >= PAGINAS_POR_TRANSACAO:
+                self._conexao.commit()
+                self._pendentes = 0
+
+    def _concluir_documento(self, id_documento, completo=True):
+        with self._lock:
+            self._conexao.execute('UPDATE documentos SET completo = ?, indexado_em = ? WHERE id = ?',
+                                  (int(completo), time.time(), id_documento))
+            self._conexao.commit()
+            self._pendentes = 0
+
+    def _remover_documento(self, id_documento):
+        with self._lock:
+            self._remover_paginas(id_documento)
+            self._conexao.execute('DELETE FROM documentos WHERE id = ?', (id_documento,))
+            self._conexao.commit()
+            self._pendentes = 0
+
+    def _remover_paginas(self, id_documento):
+        inicio = id_documento << BITS_PAGINA
+        self._conexao.execute('DELETE FROM paginas WHERE rowid BETWEEN ? AND ?', (inicio, inicio + MASCARA_PAGINA))
+
+    def _consultar(self, consulta, sintaxe_fts, limite=None, trechos=False):
+        """Executa a consulta no FTS5 e devolve as linhas na ordem de relevância"""
+        expressao = consulta if sintaxe_fts else _consulta_literal(consulta)
+        if not expressao.strip():
+            raise ValueError('Consulta vazia')
+        colunas = "rowid, rank" + (", snippet(paginas, 0, '[', ']', '…', 12)" if trechos else '')
+        sql = f'SELECT {colunas} FROM paginas WHERE paginas MATCH ? ORDER BY rank'
+        parametros = (expressao,)
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros += (limite,)
+        try:
+            with self._lock:
+                return self._conexao.execute(sql, parametros).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f'Consulta inválida: {e}')
+
+    def buscar(self, consulta, limite=20, sintaxe_fts=False):
+        """
+        Procura as páginas que contêm os termos da consulta
+        :param consulta: Palavras procuradas (todas precisam aparecer na página)
+        :param limite: Máximo de páginas devolvidas
+        :param sintaxe_fts: Se True, a consulta usa a sintaxe do FTS5 (OR, NOT, "frase exata", prefixo*, NEAR)
+        :return: Lista de dicionários com documento, saida, pagina, trecho e relevancia
+        :raises ValueError: Se a consulta for vazia ou inválida
+        """
+        linhas = self._consultar(consulta, sintaxe_fts, limite, trechos=True)
+        return self._resultados(linhas)
+
+    def buscar_documentos(self, consulta, limite=20, sintaxe_fts=False):
+        """
+        Procura os documentos com alguma página que contém os termos da consulta
+        :return: Lista de dicionários com documento, saida, paginas (em ordem crescente) e relevancia
+                 (a da melhor página), do documento mais relevante para o menos relevante
+        :raises ValueError: Se a consulta for vazia ou inválida
+        """
+        linhas = self._consultar(consulta, sintaxe_fts)
+        resultados = {}
+        for resultado in self._resultados(linhas):
+            documento = resultados.setdefault(resultado['documento'], {
+                'documento': resultado['documento'], 'saida': resultado['saida'], 'paginas': [],
+                'relevancia': resultado['relevancia'],
+            })
+            documento['paginas'].append(resultado['pagina'])
+        for documento in resultados.values():
+            documento['paginas'].sort()
+        return list(resultados.values())[:limite]
+
+    def _resultados(self, linhas):
+        ids = {linha[0] >> BITS_PAGINA for linha in linhas}
+        if not ids:
+            return []
+        with self._lock:
+            documentos = {id_documento: (caminho, saida) for id_documento, caminho, saida in self._conexao.execute(
+                f'SELECT id, caminho, saida FROM documentos WHERE id IN ({",".join("?" * len(ids))})', tuple(ids)
+            )}
+        resultados = []
+        for linha in linhas:
+            id_documento = linha[0] >> BITS_PAGINA
+            if id_documento not in documentos:
+                continue
+            caminho, saida = documentos[id_documento]
+            resultado = {'documento': caminho, 'saida': saida, 'pagina': linha[0] & MASCARA_PAGINA,
+                         'relevancia': -linha[1]}
+            if len(linha) > 2:
+                resultado['trecho'] = linha[2]
+            resultados.append(resultado)
+        return resultados
+
+    def estatisticas(self):
+        """Retorna quantos documentos e páginas estão no índice"""
+        with self._lock:
+            documentos = self._conexao.execute('SELECT count(*) FROM documentos WHERE completo = 1').fetchone()[0]
+            paginas = self._conexao.execute('SELECT count(*) FROM paginas').fetchone()[0]
+        return {'documentos': documentos, 'paginas': paginas}
+
+    def fechar(self):
+        """Grava as páginas pendentes e fecha a conexão com o banco"""
+        with self._lock:
+            self._conexao.commit()
+            self._conexao.close()
+
+def abrir_indice_busca(caminho):
+    """
+    Abre o índice de busca, avisando em vez de falhar quando o SQLite não tem o FTS5
+    :param caminho: Arquivo do banco ou pasta de saída onde ele é gravado
+    :return: IndiceBusca ou None se o índice não puder ser usado
+    """
+    try:
+        return IndiceBusca(caminho)
+    except sqlite3.Error as e:
+        print(f'Aviso: índice de busca desativado ({e}).')
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Procura um texto nos arquivos convertidos, pelo índice de busca mantido pelas conversões'
+    )
+    parser.add_argument('consulta', help='Palavras procuradas (todas precisam aparecer na mesma página)')
+    parser.add_argument('-i', '--indice', default=PASTA_SAIDA_PADRAO,
+                        help='Banco do índice ou pasta de saída que o contém (padrão: arquivos_convertidos)')
+    parser.add_argument('-n', '--limite', type=int, default=20, help='Máximo de resultados (padrão: 20)')
+    parser.add_argument('--paginas', action='store_true',
+                        help='Lista cada página encontrada, com um trecho do texto, em vez de agrupar por documento')
+    parser.add_argument('--fts', action='store_true',
+                        help='Usa a sintaxe de consulta do FTS5: OR, NOT, "frase exata", prefixo* e NEAR')
+    parser.add_argument('--json', action='store_true', help='Mostra os resultados em JSON-lines')
+    args = parser.parse_args(argv)
+
+    caminho = args.indice
+    if os.path.isdir(caminho):
+        caminho = os.path.join(caminho, NOME_INDICE_BUSCA)
+    if not os.path.exists(caminho):
+        print(f'Índice de busca não encontrado: {caminho}', file=sys.stderr)
+        return 2
+
+    indice = IndiceBusca(caminho)
+    try:
+        inicio = time.perf_counter()
+        if args.paginas:
+            resultados = indice.buscar(args.consulta, args.limite, args.fts)
+        else:
+            resultados = indice.buscar_documentos(args.consulta, args.limite, args.fts)
+        duracao = time.perf_counter() - inicio
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    finally:
+        indice.fechar()
+
+    for resultado in resultados:
+        if args.json:
+            print(json.dumps(resultado, ensure_ascii=False))
+        elif args.paginas:
+            print(f'{resultado["documento"]} (página {resultado["pagina"]}): {resultado["trecho"]}')
+        else:
+            paginas = ', '.join(str(pagina) for pagina in resultado['paginas'])
+            print(f'{resultado["documento"]}: página(s) {paginas}')
+    print(f'{len(resultados)} resultado(s) em {duracao * 1000:.1f} ms.', file=sys.stderr)
+    return 0 if resultados else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
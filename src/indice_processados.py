@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import threading
+from cache_conversao import calcular_hash_arquivo
+from escritores import desfazer_link_saida
+
+# Nome do banco gravado na pasta de saída do monitor
+NOME_INDICE = '.indice_processados.sqlite3'
+
+def descrever_opcoes(formato_saida, usar_ocr):
+    """
+    Resume as opções que mudam o resultado da conversão de um arquivo
+    :param formato_saida: Formato de saída ou tupla de formatos (por exemplo ('txt', 'jsonl'))
+    """
+    if not isinstance(formato_saida, str):
+        formato_saida = '+'.join(formato_saida)
+    return f'{formato_saida}|ocr={int(bool(usar_ocr))}'
+
+def reaproveitar_saida(saida_existente, caminho_saida):
+    """
+    Cria o arquivo de saída a partir de outro já convertido com o mesmo
+    conteúdo: um hard link quando o sistema de arquivos permite, senão uma cópia
+    :param saida_existente: Arquivo convertido anteriormente
+    :param caminho_saida: Arquivo a ser criado (substituído, se existir)
+    :return: 'link' ou 'copia'
+    """
+    if os.path.exists(caminho_saida) and os.path.samefile(saida_existente, caminho_saida):
+        return 'link'
+    temporario = caminho_saida + '.tmp'
+    if os.path.lexists(temporario):
+        os.remove(temporario)
+    try:
+        os.link(saida_existente, temporario)
+        modo = 'link'
+    except OSError:
+        # Outro disco, sistema de arquivos sem hard links ou limite de links atingido
+        shutil.copyfile(saida_existente, temporario)
+        modo = 'copia'
+    os.replace(temporario, caminho_saida)
+    return modo
+
+class IndiceProcessados:
+    """
+    Índice persistente (SQLite) dos PDFs já convertidos pelo monitor, com
+    caminho, tamanho, data de modificação, hash do conteúdo e arquivo de
+    saída. Na inicialização o índice inteiro é carregado em memória, então
+    decidir se um arquivo precisa ser convertido custa apenas uma consulta
+    a um dicionário e o stat que a varredura da pasta já fez.
+
+    O índice também é consultado pelo conteúdo: um PDF com o mesmo conteúdo
+    de outro já convertido (o mesmo documento enviado com outro nome) reusa
+    a saída existente. O hash só é calculado quando algum arquivo convertido
+    tem exatamente o mesmo tamanho.
+    """
+
+    def __init__(self, pasta_saida):
+        """
+        :param pasta_saida: Pasta de saída onde o banco do índice é gravado
+        """
+        self.caminho = os.path.join(pasta_saida, NOME_INDICE)
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute('PRAGMA journal_mode=WAL')
+        self._conexao.execute('''
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                saida TEXT NOT NULL,
+                opcoes TEXT NOT NULL,
+                convertido_em REAL NOT NULL
+            )
+        ''')
+        self._conexao.execute('CREATE INDEX IF NOT EXISTS arquivos_conteudo ON arquivos (hash, opcoes)')
+        self._conexao.commit()
+
+        # Cópias em memória:
+        # caminho -> (tamanho, mtime_ns, hash, opcoes, saida)
+        self._arquivos = {}
+        # (tamanho, opcoes) dos conteúdos já convertidos: decide se vale calcular o hash
+        self._tamanhos = set()
+        # (hash em bytes, opcoes) -> arquivo de saída
+        self._conteudos = {}
+        consulta = 'SELECT caminho, tamanho, mtime_ns, hash, opcoes, saida FROM arquivos'
+        for caminho, tamanho, mtime_ns, hash_arquivo, opcoes, saida in self._conexao.execute(consulta):
+            # As mesmas opções se repetem em todas as linhas: uma única string para todas
+            opcoes = sys.intern(opcoes)
+            self._arquivos[caminho] = (tamanho, mtime_ns, hash_arquivo, opcoes, saida)
+            self._indexar_conteudo(tamanho, hash_arquivo, opcoes, saida)
+
+    def _indexar_conteudo(self, tamanho, hash_arquivo, opcoes, saida):
+        self._tamanhos.add((tamanho, opcoes))
+        self._conteudos[(bytes.fromhex(hash_arquivo), opcoes)] = saida
+
+    def precisa_converter(self, caminho_pdf, info, opcoes):
+        """
+        Verifica se um PDF é novo, mudou desde a última conversão ou teve a saída apagada
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param info: Resultado de os.stat() (ou DirEntry.stat()) do arquivo
+        :param opcoes: Opções da conversão, geradas por descrever_opcoes()
+        """
+        chave = os.path.normcase(os.path.abspath(caminho_pdf))
+        with self._lock:
+            registro = self._arquivos.get(chave)
+        if registro is None or registro[3] != opcoes:
+            return True
+
+        tamanho, mtime_ns, hash_arquivo, _, saida = registro
+        # Uma saída apagada depois da conversão é gerada de novo
+        if not os.path.exists(saida):
+            return True
+        if (info.st_size, info.st_mtime_ns) == (tamanho, mtime_ns):
+            return False
+        if info.st_size != tamanho:
+            return True
+
+        # Mesmo tamanho com data diferente: só o conteúdo decide (por exemplo, um arquivo copiado de novo)
+        if calcular_hash_arquivo(caminho_pdf) != hash_arquivo:
+            return True
+        self._atualizar_data(chave, info)
+        return False
+
+    def buscar_conteudo(self, caminho_pdf, info, opcoes):
+        """
+        Procura a saída de um PDF já convertido com o mesmo conteúdo
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param info: Resultado de os.stat() do arquivo
+        :param opcoes: Opções da conversão, geradas por descrever_opcoes()
+        :return: Tupla (arquivo de saída existente ou None, hash do conteúdo ou None se não foi calculado)
+        """
+        with self._lock:
+            if (info.st_size, opcoes) not in self._tamanhos:
+                return None, None
+        hash_arquivo = calcular_hash_arquivo(caminho_pdf)
+        with self._lock:
+            saida = self._conteudos.get((bytes.fromhex(hash_arquivo), opcoes))
+        if saida is None or not os.path.exists(saida):
+            return None, hash_arquivo
+        return saida, hash_arquivo
+
+    def _atualizar_data(self, chave, info):
+        with self._lock:
+            tamanho, _, hash_arquivo, opcoes, saida = self._arquivos[chave]
+            self._arquivos[chave] = (tamanho, info.st_mtime_ns, hash_arquivo, opcoes, saida)
+            self._conexao.execute('UPDATE arquivos SET mtime_ns = ? WHERE caminho = ?', (info.st_mtime_ns, chave))
+            self._conexao.commit()
+
+    def registrar(self, caminho_pdf, info, caminho_saida, opcoes, hash_arquivo=None):
+        """
+        Registra a conversão concluída de um PDF
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param info: Resultado de os.stat() do arquivo antes da conversão
+        :param caminho_saida: Caminho do arquivo convertido
+        :param opcoes: Opções da conversão, geradas por descrever_opcoes()
+        :param hash_arquivo: Hash do conteúdo, se já tiver sido calculado
+        """
+        chave = os.path.normcase(os.path.abspath(caminho_pdf))
+        hash_arquivo = hash_arquivo or calcular_hash_arquivo(caminho_pdf)
+        opcoes = sys.intern(opcoes)
+        with self._lock:
+            self._arquivos[chave] = (info.st_size, info.st_mtime_ns, hash_arquivo, opcoes, caminho_saida)
+            self._indexar_conteudo(info.st_size, hash_arquivo, opcoes, caminho_saida)
+            self._conexao.execute(
+                'INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (chave, info.st_size, info.st_mtime_ns, hash_arquivo, caminho_saida, opcoes, time.time())
+            )
+            self._conexao.commit()
+
+    def fechar(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conexao.close()
@@ -1,54 +1,92 @@
 import sys
 import os
+import time
 import subprocess
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                            QRadioButton, QButtonGroup, QCheckBox, QProgressBar, 
+                            QCheckBox, QProgressBar, 
                             QMessageBox, QFrame)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QIcon, QDragEnterEvent, QDropEvent, QPixmap
-from pdf_to_txt import converter_pdf_para_txt, converter_pdf_para_docx
+from PyQt6.QtGui import QIcon, QDragEnterEvent, QDropEvent, QPixmap, QShortcut, QKeySequence
+from motor_ocr import MotorOCR
+from agendador_lote import AgendadorLote
+from cache_conversao import CacheConversao
+from metricas import logger as metrics_logger, configurar_log_metricas
+from perfil_conversao import MODOS_PERFIL
+from indice_busca import abrir_indice_busca
 import darkdetect
+import multiprocessing
 
 class PDFConverterThread(QThread):
     progress = pyqtSignal(int)
+    eta = pyqtSignal(str)
     finished = pyqtSignal()
     error = pyqtSignal(str)
     
-    def __init__(self, files, output_format, use_ocr):
+    def __init__(self, files, output_formats, use_ocr, ocr_workers=None, profile=None):
         super().__init__()
         self.files = files
-        self.output_format = output_format
+        self.output_formats = output_formats
         self.use_ocr = use_ocr
+        self.ocr_workers = ocr_workers
+        self.profile = profile
     
     def run(self):
+        # O mesmo pool de OCR é reaproveitado por todos os arquivos do lote
+        motor_ocr = MotorOCR(self.ocr_workers)
+        cache = CacheConversao()
+        search_index = None
         try:
             # Cria pasta de saída se não existir
             output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "arquivos_convertidos")
             os.makedirs(output_dir, exist_ok=True)
 
-            total_files = len(self.files)
-            for i, pdf_file in enumerate(self.files, 1):
-                # Define o caminho do arquivo de saída
-                output_name = os.path.splitext(os.path.basename(pdf_file))[0]
-                output_ext = ".txt" if self.output_format.lower() == "txt" else ".docx"
-                output_path = os.path.join(output_dir, output_name + output_ext)
-
-                # Converte o arquivo
-                if self.output_format.lower() == "txt":
-                    success, message = converter_pdf_para_txt(pdf_file, output_path, self.use_ocr)
-                else:
-                    success, message = converter_pdf_para_docx(pdf_file, output_path, self.use_ocr)
-
-                if not success:
-                    self.error.emit(message)
-                    return
-
-                self.progress.emit(int((i / total_files) * 100))
+            # Índice de busca do texto convertido, o mesmo usado pelo monitor
+            search_index = abrir_indice_busca(output_dir)
+
+            # Converte vários arquivos ao mesmo tempo, com progresso por página;
+            # todos os formatos marcados saem da mesma extração de cada arquivo
+            agendador = AgendadorLote(
+                output_dir,
+                self.output_formats,
+                self.use_ocr,
+                motor_ocr,
+                cache,
+                ao_progresso=self.report_progress,
+                perfil=self.profile,
+                indice_busca=search_index
+            )
+            start = time.monotonic()
+            results = agendador.executar(self.files)
+
+            # Resumo do lote no log de métricas (ativado pela variável CONVERSOR_LOG_METRICAS)
+            metrics_logger.info('lote', extra={'metricas': {
+                'evento': 'lote', 'origem': 'interface', 'arquivos': len(results),
+                'falhas': sum(1 for r in results if not r['sucesso']),
+                'paginas': sum(r['paginas'] for r in results),
+                'paginas_ocr': sum(r['paginas_ocr'] for r in results),
+                'duracao': round(time.monotonic() - start, 6),
+            }})
+
+            failed = [os.path.basename(r['arquivo']) for r in results if not r['sucesso']]
+            if failed:
+                self.error.emit("Não foi possível converter: " + ", ".join(failed))
+                return
 
             self.finished.emit()
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            motor_ocr.encerrar()
+            if search_index is not None:
+                search_index.fechar()
+
+    def report_progress(self, done_pages, total_pages, remaining_seconds):
+        if total_pages:
+            self.progress.emit(int((done_pages / total_pages) * 100))
+        if remaining_seconds is not None:
+            minutes, seconds = divmod(int(remaining_seconds), 60)
+            self.eta.emit(f"{done_pages} de {total_pages} páginas - tempo restante: {minutes:02d}:{seconds:02d}")
 
 class DropArea(QWidget):
     filesDropped = pyqtSignal(list)
@@ -120,27 +158,27 @@ class MainWindow(QMainWindow):
         options_layout.setSpacing(15)
         options_layout.setContentsMargins(0, 0, 0, 0)
 
-        # Formato de saída com RadioButtons em layout horizontal
+        # Formatos de saída com CheckBoxes em layout horizontal (vários podem ser gerados juntos)
         format_layout = QHBoxLayout()
         format_label = QLabel("Formato de saída:")
         format_layout.addWidget(format_label)
-        
-        self.format_group = QButtonGroup()
-        self.docx_radio = QRadioButton("DOCX")
-        self.txt_radio = QRadioButton("TXT")
-        self.docx_radio.setChecked(True)
-        
-        format_layout.addWidget(self.docx_radio)
-        format_layout.addWidget(self.txt_radio)
+
+        self.docx_checkbox = QCheckBox("DOCX")
+        self.txt_checkbox = QCheckBox("TXT")
+        self.jsonl_checkbox = QCheckBox("JSONL")
+        self.jsonl_checkbox.setToolTip("Uma linha JSON por página, com a posição e a confiança das palavras reconhecidas pelo OCR.")
+        self.docx_checkbox.setChecked(True)
+
+        format_layout.addWidget(self.docx_checkbox)
+        format_layout.addWidget(self.txt_checkbox)
+        format_layout.addWidget(self.jsonl_checkbox)
         format_layout.addStretch()
         
-        self.format_group.addButton(self.docx_radio)
-        self.format_group.addButton(self.txt_radio)
-        
         options_layout.addLayout(format_layout)
 
         # Opção de OCR
         self.ocr_checkbox = QCheckBox("Usar reconhecimento de imagem para texto (OCR)")
+        self.ocr_checkbox.setToolTip("Aplica OCR em todas as páginas. Sem esta opção, o OCR é usado apenas nas páginas sem texto.")
         options_layout.addWidget(self.ocr_checkbox)
         
         layout.addWidget(options_container)
@@ -151,6 +189,11 @@ class MainWindow(QMainWindow):
         self.progress_bar.setFixedHeight(15)
         layout.addWidget(self.progress_bar)
 
+        # Páginas concluídas e tempo restante estimado
+        self.eta_label = QLabel()
+        self.eta_label.setVisible(False)
+        layout.addWidget(self.eta_label)
+
         # Container para botões
         buttons_layout = QHBoxLayout()
         buttons_layout.setSpacing(15)
@@ -178,6 +221,12 @@ class MainWindow(QMainWindow):
         # Inicializar thread de conversão
         self.converter_thread = None
 
+        # Modo de perfil oculto (Ctrl+Shift+P alterna entre desligado, cpu e memoria):
+        # grava um relatório de perfil ao lado de cada arquivo convertido
+        self.profile_mode = None
+        self.profile_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        self.profile_shortcut.activated.connect(self.toggle_profile_mode)
+
     def setup_theme(self):
         is_dark = darkdetect.isDark()
         if is_dark:
@@ -201,16 +250,6 @@ class MainWindow(QMainWindow):
                 QPushButton:disabled {
                     background-color: #4a4a4a;
                 }
-                QRadioButton {
-                    color: white;
-                    font-size: 14px;
-                    padding: 5px;
-                    spacing: 8px;
-                }
-                QRadioButton::indicator {
-                    width: 18px;
-                    height: 18px;
-                }
                 QCheckBox {
                     color: white;
                     font-size: 14px;
@@ -259,15 +298,6 @@ class MainWindow(QMainWindow):
                 QPushButton:disabled {
                     background-color: #cccccc;
                 }
-                QRadioButton {
-                    font-size: 14px;
-                    padding: 5px;
-                    spacing: 8px;
-                }
-                QRadioButton::indicator {
-                    width: 18px;
-                    height: 18px;
-                }
                 QCheckBox {
                     font-size: 14px;
                     padding: 5px;
@@ -295,8 +325,17 @@ class MainWindow(QMainWindow):
                 }
             """)
 
-    def get_output_format(self):
-        return "DOCX" if self.docx_radio.isChecked() else "TXT"
+    def toggle_profile_mode(self):
+        modes = (None,) + MODOS_PERFIL
+        self.profile_mode = modes[(modes.index(self.profile_mode) + 1) % len(modes)]
+        if self.profile_mode:
+            self.setWindowTitle(f"Conversor de PDF [perfil: {self.profile_mode}]")
+        else:
+            self.setWindowTitle("Conversor de PDF")
+
+    def get_output_formats(self):
+        checkboxes = (("docx", self.docx_checkbox), ("txt", self.txt_checkbox), ("jsonl", self.jsonl_checkbox))
+        return {output_format for output_format, checkbox in checkboxes if checkbox.isChecked()}
 
     def open_output_folder(self):
         output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "arquivos_convertidos")
@@ -318,20 +357,28 @@ class MainWindow(QMainWindow):
         if not self.selected_files:
             return
 
+        output_formats = self.get_output_formats()
+        if not output_formats:
+            QMessageBox.warning(self, "Formato de saída", "Selecione ao menos um formato de saída.")
+            return
+
         # Desabilita botões durante a conversão
         self.convert_button.setEnabled(False)
         self.drop_area.setAcceptDrops(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.eta_label.setText("")
+        self.eta_label.setVisible(True)
 
         # Configura e inicia a thread de conversão
-        output_format = "DOCX" if self.docx_radio.isChecked() else "TXT"
         self.converter_thread = PDFConverterThread(
             self.selected_files,
-            output_format,
-            self.ocr_checkbox.isChecked()
+            output_formats,
+            self.ocr_checkbox.isChecked(),
+            profile=self.profile_mode
         )
         self.converter_thread.progress.connect(self.update_progress)
+        self.converter_thread.eta.connect(self.eta_label.setText)
         self.converter_thread.finished.connect(self.conversion_finished)
         self.converter_thread.error.connect(self.show_error)
         self.converter_thread.start()
@@ -341,6 +388,7 @@ class MainWindow(QMainWindow):
 
     def conversion_finished(self):
         self.progress_bar.setVisible(False)
+        self.eta_label.setVisible(False)
         self.convert_button.setEnabled(True)
         self.drop_area.setAcceptDrops(True)
         self.drop_area.label.setText("Arraste arquivos PDF aqui ou clique para selecionar")
@@ -354,6 +402,7 @@ class MainWindow(QMainWindow):
 
     def show_error(self, message):
         self.progress_bar.setVisible(False)
+        self.eta_label.setVisible(False)
         self.convert_button.setEnabled(True)
         self.drop_area.setAcceptDrops(True)
         
@@ -370,4 +419,9 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Necessário para o pool de OCR no executável gerado pelo PyInstaller
+    multiprocessing.freeze_support()
+    # Log de métricas opcional: caminho do arquivo JSON-lines ou '-' para a saída de erro
+    if os.environ.get('CONVERSOR_LOG_METRICAS'):
+        configurar_log_metricas(os.environ['CONVERSOR_LOG_METRICAS'])
     main() 
\ No newline at end of file
@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import time
+import logging
+import itertools
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Logger das métricas: silencioso até que um handler seja configurado
+logger = logging.getLogger('conversor_pdf.metricas')
+
+# Etapas medidas em cada conversão
+ETAPAS = ('abertura', 'extracao', 'rasterizacao', 'ocr', 'escrita', 'cache')
+
+def _formatar_rotulos(rotulos):
+    """Formata os rótulos de uma série: {nome="valor",...}"""
+    if not rotulos:
+        return ''
+    pares = []
+    for nome, valor in rotulos:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nome}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+class RegistroMetricas:
+    """
+    Contadores e medidores acumulados pelo processo, exportados no formato
+    de texto do Prometheus. Cada série é identificada pelo nome e pelos rótulos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (nome da série, rótulos) -> valor
+        self._valores = {}
+        # nome da série -> (nome da métrica, tipo)
+        self._metricas = {}
+
+    def _somar(self, serie, metrica, tipo, rotulos, valor):
+        chave = (serie, tuple(sorted(rotulos.items())))
+        self._metricas.setdefault(serie, (metrica, tipo))
+        self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        """Soma um valor a um contador"""
+        with self._lock:
+            self._somar(nome, nome, 'counter', rotulos, valor)
+
+    def definir(self, nome, valor, **rotulos):
+        """Define o valor atual de um medidor (por exemplo, o tamanho de uma fila)"""
+        with self._lock:
+            self._metricas.setdefault(nome, (nome, 'gauge'))
+            self._valores[(nome, tuple(sorted(rotulos.items())))] = valor
+
+    def observar(self, nome, segundos, **rotulos):
+        """Registra uma duração: acumula a soma (nome_sum) e a quantidade (nome_count)"""
+        with self._lock:
+            self._somar(nome + '_sum', nome, 'summary', rotulos, segundos)
+            self._somar(nome + '_count', nome, 'summary', rotulos, 1)
+
+    def valores(self):
+        """Retorna uma cópia das séries: (nome, rótulos) -> valor"""
+        with self._lock:
+            return dict(self._valores)
+
+    def texto_prometheus(self):
+        """Gera as métricas no formato de texto do Prometheus"""
+        with self._lock:
+            valores = sorted(self._valores.items())
+            metricas = dict(self._metricas)
+        linhas = []
+        anunciadas = set()
+        for (serie, rotulos), valor in valores:
+            metrica, tipo = metricas[serie]
+            if metrica not in anunciadas:
+                linhas.append(f'# TYPE {metrica} {tipo}')
+                anunciadas.add(metrica)
+            linhas.append(f'{serie}{_formatar_rotulos(rotulos)} {valor:g}' if isinstance(valor, float)
+                          else f'{serie}{_formatar_rotulos(rotulos)} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+    def gravar_prometheus(self, caminho):
+        """
+        Grava as métricas em um arquivo (por exemplo, para o coletor textfile do
+        node_exporter). O arquivo é substituído de uma vez, nunca lido pela metade.
+        """
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+# Registro compartilhado por todas as conversões do processo
+registro_metricas = RegistroMetricas()
+
+class MedidorConversao:
+    """
+    Mede uma conversão: o tempo de cada etapa por página e no total, os bytes
+    lidos e gravados e o uso do cache. Cada medida vai para o logger de
+    métricas (campos estruturados em record.metricas) e para o registro do processo.
+    """
+
+    def __init__(self, caminho_pdf, formato, registro=None):
+        """
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param formato: Formato de saída ('txt' ou 'docx')
+        :param registro: RegistroMetricas que acumula as medidas (padrão: o do processo)
+        """
+        self.caminho_pdf = caminho_pdf
+        self.formato = formato
+        self.registro = registro or registro_metricas
+        self.etapas = {}
+        self._lock = threading.Lock()
+        self._inicio = time.perf_counter()
+
+    @contextlib.contextmanager
+    def etapa(self, nome, pagina=None, paginas=1):
+        """Mede o bloco como uma etapa da conversão"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio, pagina, paginas)
+
+    def registrar(self, etapa, segundos, pagina=None, paginas=1):
+        """
+        Registra a duração de uma etapa
+        :param pagina: Número da página medida (None para etapas do documento inteiro)
+        :param paginas: Quantas páginas a medida cobre (por exemplo, uma rasterização em lote)
+        """
+        with self._lock:
+            self.etapas[etapa] = self.etapas.get(etapa, 0.0) + segundos
+        self.registro.observar('conversor_etapa_segundos', segundos, etapa=etapa)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('etapa', extra={'metricas': {
+                'evento': 'etapa', 'documento': self.caminho_pdf, 'etapa': etapa, 'pagina': pagina,
+                'paginas': paginas, 'duracao': round(segundos, 6),
+            }})
+
+    def medir_paginas(self, etapa, paginas, numeros_paginas=None):
+        """
+        Repassa os itens de um gerador de páginas medindo o tempo de produzir cada um
+        :param etapa: Etapa registrada para cada página
+        :param paginas: Iterável com o texto de cada página
+        :param numeros_paginas: Números das páginas produzidas (padrão: 1, 2, 3...)
+        """
+        iterador = iter(paginas)
+        numeros = iter(numeros_paginas) if numeros_paginas is not None else itertools.count(1)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            self.registrar(etapa, time.perf_counter() - inicio, next(numeros, None))
+            yield item
+
+    def concluir(self, caminho_saida=None, estatisticas=None, erro=None):
+        """
+        Registra o resumo da conversão
+        :param caminho_saida: Arquivo gerado (None se a conversão falhou)
+        :param estatisticas: Dicionário de estatísticas preenchido pelo conversor
+        :param erro: Descrição do erro, se houver
+        """
+        estatisticas = estatisticas or {}
+        duracao = time.perf_counter() - self._inicio
+        bytes_entrada = os.path.getsize(self.caminho_pdf) if os.path.exists(self.caminho_pdf) else 0
+        bytes_saida = os.path.getsize(caminho_saida) if caminho_saida and os.path.exists(caminho_saida) else 0
+        resultado = 'ok' if caminho_saida else 'erro'
+
+        self.registro.incrementar('conversor_documentos_total', resultado=resultado, formato=self.formato)
+        self.registro.observar('conversor_documento_segundos', duracao, formato=self.formato)
+        self.registro.incrementar('conversor_bytes_entrada_total', bytes_entrada)
+        self.registro.incrementar('conversor_bytes_saida_total', bytes_saida)
+        self.registro.incrementar('conversor_paginas_total', estatisticas.get('paginas', 0))
+        self.registro.incrementar('conversor_paginas_ocr_total', estatisticas.get('paginas_ocr', 0))
+        self.registro.incrementar('conversor_cache_total', resultado='acerto' if estatisticas.get('cache') else 'falha')
+
+        logger.info('conversao', extra={'metricas': {
+            'evento': 'conversao', 'documento': self.caminho_pdf, 'saida': caminho_saida, 'formato': self.formato,
+            'resultado': resultado, 'erro': erro, 'duracao': round(duracao, 6),
+            'bytes_entrada': bytes_entrada, 'bytes_saida': bytes_saida,
+            'paginas': estatisticas.get('paginas', 0), 'paginas_ocr': estatisticas.get('paginas_ocr', 0),
+            'paginas_sem_ocr': estatisticas.get('paginas_sem_ocr', 0),
+            'paginas_retomadas': estatisticas.get('paginas_retomadas', 0), 'cache': estatisticas.get('cache', False),
+            'etapas': {etapa: round(segundos, 6) for etapa, segundos in self.etapas.items()},
+        }})
+
+def registrar_espera_fila(fila, segundos, documento=None):
+    """Registra quanto tempo um documento esperou na fila antes de começar a ser convertido"""
+    registro_metricas.observar('conversor_fila_espera_segundos', segundos, fila=fila)
+    logger.info('espera_fila', extra={'metricas': {
+        'evento': 'espera_fila', 'fila': fila, 'documento': documento, 'duracao': round(segundos, 6),
+    }})
+
+class FormatadorJSON(logging.Formatter):
+    """Formata cada registro como uma linha JSON com os campos estruturados das métricas"""
+
+    def format(self, record):
+        campos = {
+            'hora': self.formatTime(record),
+            'nivel': record.levelname,
+            'mensagem': record.getMessage(),
+        }
+        campos.update(getattr(record, 'metricas', {}))
+        return json.dumps(campos, ensure_ascii=False, default=str)
+
+def configurar_log_metricas(destino=None, nivel=logging.INFO):
+    """
+    Envia as métricas para um arquivo JSON-lines ou para a saída de erro
+    :param destino: Caminho do arquivo (None ou '-': saída de erro)
+    :param nivel: logging.INFO para um registro por documento; logging.DEBUG inclui cada página
+    """
+    if destino in (None, '-'):
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = logging.FileHandler(destino, encoding='utf-8')
+    handler.setFormatter(FormatadorJSON())
+    logger.addHandler(handler)
+    logger.setLevel(nivel)
+    return handler
+
+def iniciar_servidor_metricas(porta, endereco='127.0.0.1', registro=None):
+    """
+    Expõe as métricas em http://endereco:porta/metrics em uma thread separada
+    :return: O servidor HTTP (use shutdown() para encerrá-lo)
+    """
+    registro = registro or registro_metricas
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            corpo = registro.texto_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((endereco, porta), _Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
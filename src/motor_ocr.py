@@ -0,0 +1,265 @@
+import os
+import copy
+import time
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from ambiente_ocr import obter_ambiente_ocr
+from documento_pdf import DocumentoPDF
+from backends_ocr import BACKEND_PADRAO, obter_classe_backend
+from preprocessamento_ocr import PreprocessamentoOCR
+from imagens_embutidas import ExtratorImagens
+
+def numero_workers_padrao():
+    """Retorna o número padrão de processos de OCR (um por núcleo)"""
+    return os.cpu_count() or 1
+
+# Backend e pré-processamento criados uma única vez em cada processo do pool
+_backend_worker = None
+_preprocessamento_worker = None
+
+def _inicializar_worker(nome_backend, ambiente, idioma, preprocessamento):
+    """Cria o backend de OCR de cada processo do pool"""
+    global _backend_worker, _preprocessamento_worker
+    _backend_worker = obter_classe_backend(nome_backend)(ambiente, idioma)
+    _preprocessamento_worker = preprocessamento
+
+def _reconhecer_imagem(backend, imagem, com_palavras):
+    """Executa o OCR de uma imagem já pré-processada, com ou sem a posição das palavras"""
+    if com_palavras:
+        return backend.reconhecer_palavras(imagem)
+    return backend.reconhecer(imagem)
+
+def _ocr_pagina(imagem, com_palavras=False):
+    """
+    Extrai o texto de uma única página (executado nos processos do pool)
+    :param imagem: Imagem PIL ou caminho do arquivo de imagem da página
+    :param com_palavras: Se True, devolve uma TextoPagina com a posição das palavras
+    :return: Tupla (texto, segundos gastos no processo com a página)
+    """
+    inicio = time.perf_counter()
+    texto = _reconhecer_imagem(_backend_worker, _preprocessamento_worker.processar(imagem), com_palavras)
+    return texto, time.perf_counter() - inicio
+
+def rasterizar_paginas(caminho_pdf, primeira, ultima, dpi, pasta, tons_de_cinza=True, poppler_path=None):
+    """
+    Rasteriza um intervalo de páginas com o pdftoppm do Poppler. Ao contrário
+    do convert_from_path do pdf2image, não executa o pdfinfo (que interpreta
+    o arquivo inteiro) a cada chamada: o número de páginas já é conhecido.
+    :param pasta: Pasta onde as imagens são gravadas
+    :param tons_de_cinza: Se True, gera as imagens em tons de cinza
+    :param poppler_path: Pasta dos executáveis do Poppler (None: os do PATH)
+    :return: Caminhos das imagens, na ordem das páginas
+    """
+    executavel = os.path.join(poppler_path, 'pdftoppm') if poppler_path else 'pdftoppm'
+    prefixo = f'pagina{primeira}'
+    comando = [executavel, '-r', str(dpi), '-f', str(primeira), '-l', str(ultima)]
+    if tons_de_cinza:
+        comando.append('-gray')
+    # Sem abrir uma janela de console a cada chamada no Windows
+    subprocess.run(comando + [caminho_pdf, os.path.join(pasta, prefixo)], capture_output=True, check=True,
+                   creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    # O pdftoppm acrescenta ao prefixo o número da página, com o mesmo número de dígitos em todas
+    return sorted(os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.startswith(prefixo + '-'))
+
+def _intervalos_contiguos(numeros_paginas, dpis):
+    """
+    Agrupa números de página crescentes em intervalos contíguos com o mesmo DPI
+    :param dpis: Dicionário número da página -> DPI
+    :return: Lista de tuplas (primeira, última, DPI)
+    """
+    intervalos = []
+    for numero in numeros_paginas:
+        if intervalos and intervalos[-1][1] == numero - 1 and intervalos[-1][2] == dpis[numero]:
+            intervalos[-1][1] = numero
+        else:
+            intervalos.append([numero, numero, dpis[numero]])
+    return [tuple(intervalo) for intervalo in intervalos]
+
+class MotorOCR:
+    """
+    Distribui o OCR das páginas entre vários processos e devolve os textos
+    na ordem original das páginas. O pool é criado sob demanda e reaproveitado
+    entre documentos até que encerrar() seja chamado.
+    """
+
+    def __init__(self, num_workers=None, idioma='por', tesseract_cmd=None, max_paginas_residentes=None,
+                 backend=BACKEND_PADRAO, preprocessamento=None):
+        """
+        :param num_workers: Número de processos de OCR (padrão: um por núcleo)
+        :param idioma: Idioma usado pelo Tesseract
+        :param tesseract_cmd: Caminho do executável do Tesseract (padrão: o encontrado no sistema)
+        :param max_paginas_residentes: Máximo de páginas rasterizadas ao mesmo tempo
+                                       (padrão: duas por processo de OCR)
+        :param backend: Nome do backend de OCR registrado em backends_ocr
+        :param preprocessamento: PreprocessamentoOCR com DPI e tratamento das imagens
+                                 (padrão: tons de cinza e DPI escolhido pelo tamanho da página)
+        """
+        self.num_workers = max(1, num_workers or numero_workers_padrao())
+        self.idioma = idioma
+        self.tesseract_cmd = tesseract_cmd
+        self.max_paginas_residentes = max(1, max_paginas_residentes or 2 * self.num_workers)
+        self.classe_backend = obter_classe_backend(backend)
+        self.preprocessamento = preprocessamento or PreprocessamentoOCR()
+        self._executor = None
+        self._backend_local = None
+        self._lock = threading.Lock()
+        self._lock_backend_local = threading.Lock()
+
+    def ambiente(self):
+        """Retorna as ferramentas de OCR usadas pelo motor (a busca só ocorre no primeiro uso)"""
+        ambiente = obter_ambiente_ocr()
+        if self.tesseract_cmd and self.tesseract_cmd != ambiente.tesseract_cmd:
+            ambiente = copy.copy(ambiente)
+            ambiente.tesseract_cmd = self.tesseract_cmd
+        return ambiente
+
+    def descricao(self):
+        """Resume as opções do motor que mudam o texto reconhecido (usado na chave do cache)"""
+        return f'{self.classe_backend.nome}|{self.preprocessamento.descricao()}'
+
+    def disponivel(self):
+        """Verifica se o backend do motor pode ser usado nesta máquina"""
+        return self.classe_backend.disponivel(self.ambiente())
+
+    def _obter_executor(self):
+        # O motor pode ser compartilhado por várias conversões simultâneas
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    initializer=_inicializar_worker,
+                    initargs=(self.classe_backend.nome, self.ambiente(), self.idioma, self.preprocessamento)
+                )
+            return self._executor
+
+    def _obter_backend_local(self):
+        # Backend usado quando o OCR roda no próprio processo
+        with self._lock:
+            if self._backend_local is None:
+                self._backend_local = self.classe_backend(self.ambiente(), self.idioma)
+            return self._backend_local
+
+    def reconhecer(self, imagens, numeros_paginas=None, total_paginas=None, medidor=None, com_palavras=False):
+        """
+        Executa o OCR de uma lista de imagens de página
+        :param imagens: Lista de imagens PIL ou de caminhos de imagem, uma por página
+        :param numeros_paginas: Números das páginas das imagens (usados nas mensagens)
+        :param total_paginas: Total de páginas do documento (usado nas mensagens)
+        :param medidor: MedidorConversao que recebe o tempo de OCR de cada página (opcional)
+        :param com_palavras: Se True, cada texto é uma TextoPagina com a caixa e a confiança de cada palavra,
+                             obtidas na mesma passada do OCR
+        :return: Lista com o texto de cada página, na mesma ordem
+        """
+        numeros_paginas = numeros_paginas or range(1, len(imagens) + 1)
+        total = total_paginas or len(imagens)
+        if self.num_workers == 1:
+            backend = self._obter_backend_local()
+            textos = []
+            for numero, imagem in zip(numeros_paginas, imagens):
+                print(f'Processando página {numero} de {total}...')
+                # O backend local não é compartilhado entre threads ao mesmo tempo
+                with self._lock_backend_local:
+                    inicio = time.perf_counter()
+                    textos.append(_reconhecer_imagem(backend, self.preprocessamento.processar(imagem),
+                                                     com_palavras))
+                if medidor:
+                    medidor.registrar('ocr', time.perf_counter() - inicio, numero)
+            return textos
+
+        executor = self._obter_executor()
+        futuros = [executor.submit(_ocr_pagina, imagem, com_palavras) for imagem in imagens]
+        textos = []
+        for numero, futuro in zip(numeros_paginas, futuros):
+            texto, segundos = futuro.result()
+            textos.append(texto)
+            if medidor:
+                medidor.registrar('ocr', segundos, numero)
+            print(f'Página {numero} de {total} processada')
+        return textos
+
+    def reconhecer_paginas(self, caminho_pdf, numeros_paginas, poppler_path=None, total_paginas=None,
+                           medidor=None, documento=None, com_palavras=False):
+        """
+        Rasteriza e reconhece as páginas informadas em janelas de no máximo
+        max_paginas_residentes páginas. Páginas digitalizadas usam a imagem
+        embutida no PDF em vez de serem rasterizadas, se o pré-processamento
+        permitir. As imagens de cada janela são gravadas
+        em uma pasta temporária, lidas diretamente pelos processos de OCR e
+        apagadas antes da próxima janela, de modo que o uso de memória não
+        cresce com o tamanho do documento.
+        :param caminho_pdf: Caminho do arquivo PDF
+        :param numeros_paginas: Números das páginas (a partir de 1) em ordem crescente
+        :param poppler_path: Pasta dos executáveis do Poppler (padrão: a encontrada no sistema)
+        :param total_paginas: Total de páginas do documento (usado nas mensagens)
+        :param medidor: MedidorConversao que recebe o tempo de cada etapa (opcional)
+        :param documento: DocumentoPDF da conversão, para não interpretar o arquivo de novo (opcional)
+        :param com_palavras: Se True, os textos são TextoPagina com a posição das palavras
+        :return: Gerador de tuplas (número da página, texto)
+        """
+        poppler_path = poppler_path or self.ambiente().poppler_path
+        numeros_paginas = list(numeros_paginas)
+        if not numeros_paginas:
+            return
+        documento_proprio = documento is None
+        if documento_proprio:
+            documento = DocumentoPDF(caminho_pdf)
+        try:
+            inicio = time.perf_counter()
+            dpis = self.preprocessamento.dpis_paginas(documento, numeros_paginas)
+            if medidor:
+                medidor.registrar('abertura', time.perf_counter() - inicio)
+            extrator_imagens = None
+            if self.preprocessamento.imagens_embutidas:
+                extrator_imagens = ExtratorImagens(documento, self.preprocessamento)
+            with tempfile.TemporaryDirectory(prefix='ocr_paginas_') as pasta_temporaria:
+                for posicao in range(0, len(numeros_paginas), self.max_paginas_residentes):
+                    janela = numeros_paginas[posicao:posicao + self.max_paginas_residentes]
+                    imagens = {}
+                    if extrator_imagens is not None:
+                        for numero in janela:
+                            inicio = time.perf_counter()
+                            caminho_imagem = extrator_imagens.extrair(numero, pasta_temporaria)
+                            if caminho_imagem is not None:
+                                imagens[numero] = caminho_imagem
+                                if medidor:
+                                    medidor.registrar('rasterizacao', time.perf_counter() - inicio, numero)
+
+                    restantes = [numero for numero in janela if numero not in imagens]
+                    for primeira, ultima, dpi in _intervalos_contiguos(restantes, dpis):
+                        inicio = time.perf_counter()
+                        caminhos = rasterizar_paginas(caminho_pdf, primeira, ultima, dpi, pasta_temporaria,
+                                                      self.preprocessamento.tons_de_cinza, poppler_path)
+                        imagens.update(zip(range(primeira, ultima + 1), caminhos))
+                        if medidor:
+                            medidor.registrar('rasterizacao', time.perf_counter() - inicio, primeira,
+                                              ultima - primeira + 1)
+                    caminhos_imagens = [imagens[numero] for numero in janela]
+                    textos = self.reconhecer(caminhos_imagens, janela, total_paginas or numeros_paginas[-1],
+                                             medidor, com_palavras)
+
+                    # Libera as imagens da janela antes de rasterizar a próxima
+                    for caminho_imagem in caminhos_imagens:
+                        os.remove(caminho_imagem)
+
+                    yield from zip(janela, textos)
+        finally:
+            if documento_proprio:
+                documento.fechar()
+
+    def encerrar(self):
+        """Finaliza os processos do pool e o backend local, se existirem"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._backend_local is not None:
+                self._backend_local.encerrar()
+                self._backend_local = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.encerrar()
@@ -1,246 +1,453 @@
-import PyPDF2
 import os
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import tempfile
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+import itertools
+import contextlib
+from motor_ocr import MotorOCR
+from escritores import criar_escritores, normalizar_formatos, FORMATOS_COM_PALAVRAS
+from cache_conversao import gerar_chave_conversao, variante_chave
+from diario_paginas import DiarioPaginas
+from ambiente_ocr import obter_ambiente_ocr
+from backends_ocr import BACKEND_PADRAO, obter_classe_backend
+from extratores_texto import abrir_extrator, escolher_extrator
+from metricas import MedidorConversao, RegistroMetricas
+from perfil_conversao import PerfilConversao, motor_serial
+from documento_pdf import DocumentoPDF
+from texto_pagina import TextoPagina
+from selecao_paginas import interpretar_paginas, descrever_paginas, numeros_paginas
 
 def encontrar_tesseract():
-    """Procura o Tesseract em diferentes locais comuns"""
-    possiveis_caminhos = [
-        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-        os.path.expanduser('~\\AppData\\Local\\Programs\\Tesseract-OCR\\tesseract.exe'),
-        os.path.expanduser('~\\AppData\\Local\\Programs\\Python\\Python3*\\Scripts\\tesseract.exe'),
-        os.path.expanduser('~\\AppData\\Local\\Packages\\PythonSoftwareFoundation.Python.3*\\LocalCache\\local-packages\\Python3*\\Scripts\\tesseract.exe')
-    ]
-    
-    for caminho in possiveis_caminhos:
-        if os.path.exists(caminho):
-            return caminho
-    
-    return None
-
-def verificar_idioma_tesseract():
-    """Verifica se o arquivo de idioma português está disponível"""
-    possiveis_caminhos = [
-        r'C:\Program Files\Tesseract-OCR\tessdata\por.traineddata',
-        r'C:\Program Files (x86)\Tesseract-OCR\tessdata\por.traineddata',
-        os.path.expanduser('~\\AppData\\Local\\Programs\\Tesseract-OCR\\tessdata\\por.traineddata')
-    ]
-    
-    for caminho in possiveis_caminhos:
-        if os.path.exists(caminho):
-            return True
-    
-    return False
-
-# Configura o caminho do Tesseract
-caminho_tesseract = encontrar_tesseract()
-if caminho_tesseract:
-    pytesseract.pytesseract.tesseract_cmd = caminho_tesseract
-    if not verificar_idioma_tesseract():
-        print('AVISO: Arquivo de idioma português não encontrado.')
+    """Procura o Tesseract no PATH, nas variáveis de ambiente e em locais comuns"""
+    return obter_ambiente_ocr().tesseract_cmd
+
+def verificar_idioma_tesseract(idioma='por'):
+    """Verifica se o arquivo de idioma (português, por padrão) está disponível"""
+    return obter_ambiente_ocr().idioma_disponivel(idioma)
+
+# Páginas com menos caracteres que isso (sem contar espaços) são tratadas como
+# imagens escaneadas e passam pelo OCR
+MIN_CARACTERES_PAGINA = 20
+
+def _verificar_ocr_disponivel(motor_ocr=None):
+    """
+    Verifica se o Tesseract, o idioma do OCR e o Poppler estão instalados. A
+    busca pelas ferramentas só acontece no primeiro uso do OCR e fica guardada
+    para as próximas conversões.
+    :param motor_ocr: MotorOCR cujo idioma e backend serão verificados (opcional)
+    """
+    ambiente = obter_ambiente_ocr() if motor_ocr is None else motor_ocr.ambiente()
+    idioma = motor_ocr.idioma if motor_ocr is not None else 'por'
+    classe_backend = motor_ocr.classe_backend if motor_ocr is not None else obter_classe_backend(BACKEND_PADRAO)
+
+    if not classe_backend.disponivel(ambiente):
+        if classe_backend.nome != BACKEND_PADRAO:
+            print(f'Erro: Backend de OCR "{classe_backend.nome}" não disponível.')
+            print(classe_backend.instalacao)
+            return False
+        print('Erro: OCR não disponível. Tesseract não encontrado.')
+        print('Por favor, instale o Tesseract seguindo as instruções:')
+        print('1. Baixe o Tesseract de: https://github.com/UB-Mannheim/tesseract/wiki')
+        print('2. Execute o instalador')
+        print('3. Marque a opção "Add to system PATH" durante a instalação')
+        print('4. Reinicie o terminal após a instalação')
+        print('No Linux, instale o pacote tesseract-ocr ou informe o executável na variável TESSERACT_CMD.')
+        return False
+
+    if not all(parte in classe_backend.idiomas(ambiente) for parte in idioma.split('+')):
+        print(f'Erro: Arquivo de idioma {idioma} não encontrado.')
         print('Por favor:')
-        print('1. Baixe o arquivo por.traineddata de: https://github.com/tesseract-ocr/tessdata')
+        print(f'1. Baixe o arquivo {idioma}.traineddata de: https://github.com/tesseract-ocr/tessdata')
         print('2. Copie o arquivo para a pasta tessdata do Tesseract')
-        print('3. O caminho deve ser: C:\\Program Files\\Tesseract-OCR\\tessdata\\por.traineddata')
-else:
-    print('AVISO: Tesseract não encontrado. O OCR não estará disponível.')
-    print('Por favor, instale o Tesseract seguindo as instruções:')
-    print('1. Baixe o Tesseract de: https://github.com/UB-Mannheim/tesseract/wiki')
-    print('2. Execute o instalador')
-    print('3. Marque a opção "Add to system PATH" durante a instalação')
-    print('4. Reinicie o terminal após a instalação')
-
-# Configura o caminho do Poppler
-POPPLER_PATH = r'C:\Program Files\poppler\Library\bin'
-
-def converter_pdf_para_txt(caminho_pdf, caminho_saida=None, usar_ocr=False):
+        print(f'3. O caminho deve ser: C:\\Program Files\\Tesseract-OCR\\tessdata\\{idioma}.traineddata')
+        return False
+
+    # Verifica se o Poppler está instalado
+    if not ambiente.poppler_disponivel:
+        print('Erro: Poppler não encontrado.')
+        print('Por favor, instale o Poppler seguindo as instruções:')
+        print('1. Baixe o Poppler de: https://github.com/oschwartz10612/poppler-windows/releases/')
+        print('2. Extraia o arquivo ZIP')
+        print('3. Copie a pasta para C:\\Program Files\\poppler')
+        print('4. Adicione C:\\Program Files\\poppler\\Library\\bin ao PATH do sistema')
+        print('No Linux, instale o pacote poppler-utils ou informe a pasta na variável POPPLER_PATH.')
+        return False
+
+    return True
+
+def _paginas_ocr(caminho_pdf, motor_ocr=None, pular=0, estatisticas=None, medidor=None, paginas=None,
+                 com_palavras=False):
     """
-    Converte um arquivo PDF para TXT
+    Extrai o texto das páginas do PDF usando OCR
     :param caminho_pdf: Caminho do arquivo PDF
-    :param caminho_saida: Caminho onde o arquivo TXT será salvo (opcional)
-    :param usar_ocr: Se True, usa OCR para extrair texto de imagens
-    :return: Caminho do arquivo TXT gerado
+    :param motor_ocr: MotorOCR usado para paralelizar as páginas (opcional)
+    :param pular: Quantas das páginas selecionadas já foram gravadas e não são extraídas de novo
+    :param estatisticas: Dicionário onde as páginas reconhecidas são contadas (opcional)
+    :param medidor: MedidorConversao que registra o tempo de cada etapa (opcional)
+    :param paginas: Intervalos de interpretar_paginas() (None: todas as páginas)
+    :param com_palavras: Se True, o OCR também informa a posição de cada palavra (TextoPagina)
+    :return: Gerador com o texto de cada página
     """
+    if medidor is None:
+        medidor = MedidorConversao(caminho_pdf, None, RegistroMetricas())
+    print('Usando OCR para extrair texto das imagens...')
+    motor_proprio = None
+    if motor_ocr is None:
+        motor_ocr = motor_proprio = MotorOCR()
     try:
-        # Verifica se o arquivo existe
-        if not os.path.exists(caminho_pdf):
-            print(f'Erro: O arquivo "{caminho_pdf}" não foi encontrado.')
-            print('Verifique se:')
-            print('1. O caminho está correto')
-            print('2. O arquivo existe no local especificado')
-            print('3. Você incluiu a extensão .pdf no nome do arquivo')
-            return None
+        # O arquivo é aberto e interpretado uma única vez para a contagem, o DPI e as imagens embutidas
+        with DocumentoPDF(caminho_pdf) as documento:
+            with medidor.etapa('abertura'):
+                total = documento.total_paginas
+            numeros = numeros_paginas(paginas, total)[pular:]
+            if estatisticas is not None:
+                estatisticas['paginas_previstas'] = pular + len(numeros)
 
-        # Verifica se é um arquivo PDF
-        if not caminho_pdf.lower().endswith('.pdf'):
-            print('Erro: O arquivo deve ter a extensão .pdf')
-            return None
+            # Rasteriza só as páginas selecionadas, em janelas, e distribui o OCR entre os processos do motor
+            for _, texto in motor_ocr.reconhecer_paginas(caminho_pdf, numeros, total_paginas=total, medidor=medidor,
+                                                         documento=documento, com_palavras=com_palavras):
+                if estatisticas is not None:
+                    estatisticas['paginas_ocr'] += 1
+                yield texto
+    finally:
+        if motor_proprio is not None:
+            motor_proprio.encerrar()
+
+def _possui_camada_texto(texto, min_caracteres):
+    """Verifica se o texto extraído de uma página tem caracteres suficientes"""
+    return len(''.join(texto.split())) >= min_caracteres
+
+def _paginas_hibridas(caminho_pdf, motor_ocr=None, min_caracteres=MIN_CARACTERES_PAGINA, pular=0,
+                      estatisticas=None, extrator='auto', medidor=None, paginas=None, com_palavras=False):
+    """
+    Extrai o texto das páginas pela camada de texto e usa OCR apenas nas
+    páginas em que a camada de texto não existe ou é insuficiente
+    :param caminho_pdf: Caminho do arquivo PDF
+    :param motor_ocr: MotorOCR usado para paralelizar as páginas (opcional)
+    :param min_caracteres: Mínimo de caracteres (sem espaços) para aceitar o texto da página
+    :param pular: Quantas das páginas selecionadas já foram gravadas e não são extraídas de novo
+    :param estatisticas: Dicionário onde as páginas reconhecidas por OCR e as que ficaram sem OCR
+                         por falta do Tesseract ou do Poppler são contadas (opcional)
+    :param extrator: Extrator da camada de texto (nome registrado em extratores_texto ou 'auto')
+    :param medidor: MedidorConversao que registra o tempo de cada etapa (opcional)
+    :param paginas: Intervalos de interpretar_paginas() (None: todas as páginas)
+    :param com_palavras: Se True, o OCR das páginas sem texto também informa a posição de cada palavra
+    :return: Gerador com o texto de cada página
+    """
+    if medidor is None:
+        medidor = MedidorConversao(caminho_pdf, None, RegistroMetricas())
+    # O pool só é iniciado se alguma página realmente precisar de OCR
+    motor_proprio = None
+    if motor_ocr is None:
+        motor_ocr = motor_proprio = MotorOCR()
+    ocr_disponivel = None
+    try:
+        # A camada de texto e o OCR das páginas sem texto usam a mesma sessão do arquivo
+        with DocumentoPDF(caminho_pdf) as documento:
+            with medidor.etapa('abertura'):
+                extrator_texto = abrir_extrator(documento, extrator)
+            with extrator_texto:
+                total = extrator_texto.total_paginas
+                # Só as páginas selecionadas são lidas pelo extrator
+                numeros = numeros_paginas(paginas, total)[pular:]
+                if estatisticas is not None:
+                    # Total de páginas da seleção, conhecido assim que o arquivo é aberto
+                    estatisticas['paginas_previstas'] = pular + len(numeros)
+                textos = medidor.medir_paginas('extracao', extrator_texto.paginas(numeros), numeros)
 
-        # Se não foi especificado um caminho de saída, usa o mesmo nome do PDF
-        if caminho_saida is None:
-            caminho_saida = os.path.splitext(caminho_pdf)[0] + '.txt'
+                # Páginas já extraídas aguardando o OCR das páginas sem texto da mesma janela
+                pendentes = []
+                sem_texto = []
+                for posicao, (numero, texto) in enumerate(zip(numeros, textos), 1):
+                    print(f'Processando página {numero} de {total}...')
+                    pendentes.append(texto)
+                    if not _possui_camada_texto(texto, min_caracteres):
+                        sem_texto.append(numero)
 
-        texto_completo = ''
+                    # Só segura as páginas enquanto houver OCR pendente na janela, e nunca mais que uma janela
+                    if sem_texto and len(pendentes) < motor_ocr.max_paginas_residentes and posicao < len(numeros):
+                        continue
+
+                    if sem_texto:
+                        if ocr_disponivel is None:
+                            print('Páginas sem texto encontradas. Tentando usar OCR...')
+                            ocr_disponivel = _verificar_ocr_disponivel(motor_ocr)
+                        if ocr_disponivel:
+                            janela = numeros[posicao - len(pendentes):posicao]
+                            reconhecidas = motor_ocr.reconhecer_paginas(caminho_pdf, sem_texto, total_paginas=total,
+                                                                        medidor=medidor, documento=documento,
+                                                                        com_palavras=com_palavras)
+                            for numero_ocr, texto_ocr in reconhecidas:
+                                pendentes[janela.index(numero_ocr)] = texto_ocr
+                            if estatisticas is not None:
+                                estatisticas['paginas_ocr'] += len(sem_texto)
+                        elif estatisticas is not None:
+                            # As páginas seguem em branco, e a conversão fica incompleta
+                            estatisticas['paginas_sem_ocr'] += len(sem_texto)
+
+                    yield from pendentes
+                    pendentes = []
+                    sem_texto = []
+    finally:
+        if motor_proprio is not None:
+            motor_proprio.encerrar()
+
+def _converter_pdf(caminho_pdf, saidas, usar_ocr, motor_ocr, min_caracteres_pagina, cache, retomar,
+                   progresso, estatisticas, extrator, perfil=None, ao_concluir_pagina=None, paginas=None,
+                   max_caracteres=None):
+    """
+    Converte o PDF medindo cada etapa; o resumo da conversão é registrado
+    nas métricas mesmo quando ela falha
+    :param saidas: Dicionário formato -> caminho do arquivo de saída
+    :param perfil: 'cpu' ou 'memoria' para perfilar a conversão e gravar o relatório ao lado da saída
+    :param ao_concluir_pagina: Função chamada com (número, texto) de cada página gravada
+    :param paginas: Seleção de páginas aceita por interpretar_paginas() (None: todas)
+    :param max_caracteres: Encerra a conversão na página em que o texto gravado atinge esse total
+    :return: Dicionário formato -> caminho dos arquivos gerados
+    """
+    if estatisticas is None:
+        estatisticas = {}
+    # O relatório de perfil fica ao lado da primeira saída
+    caminho_saida = next(iter(saidas.values()))
+    medidor = MedidorConversao(caminho_pdf, '+'.join(saidas))
+    perfilador = None
+    encerrar_motor = False
+    if perfil:
+        perfilador = PerfilConversao(perfil)
+        motor_ocr, encerrar_motor = motor_serial(motor_ocr)
+        perfilador.iniciar()
+    try:
+        resultado = _executar_conversao(caminho_pdf, saidas, usar_ocr=usar_ocr, motor_ocr=motor_ocr,
+                                        min_caracteres_pagina=min_caracteres_pagina, cache=cache, retomar=retomar,
+                                        progresso=progresso, estatisticas=estatisticas, extrator=extrator,
+                                        medidor=medidor, ao_concluir_pagina=ao_concluir_pagina,
+                                        selecao_paginas=paginas, max_caracteres=max_caracteres)
+    except Exception as e:
+        medidor.concluir(None, estatisticas, str(e))
+        raise
+    finally:
+        # O relatório também é gravado quando a conversão falha: é justamente o caso a investigar
+        if perfilador is not None:
+            perfilador.parar()
+            perfilador.gravar_relatorio(caminho_saida + '.perfil.txt', caminho_pdf, medidor.etapas)
+        if encerrar_motor:
+            motor_ocr.encerrar()
+    medidor.concluir(caminho_saida if resultado else None, estatisticas,
+                     None if resultado else 'Não foi possível converter o arquivo')
+    return resultado
+
+def _executar_conversao(caminho_pdf, saidas, usar_ocr, motor_ocr, min_caracteres_pagina, cache, retomar,
+                        progresso, estatisticas, extrator, medidor, ao_concluir_pagina=None,
+                        selecao_paginas=None, max_caracteres=None):
+    """
+    Extrai o texto do PDF página a página e grava cada página nos escritores
+    de todos os formatos de saída assim que ela fica pronta
+    :return: Dicionário formato -> caminho dos arquivos gerados
+    """
+    estatisticas.update({'paginas': 0, 'paginas_ocr': 0, 'paginas_sem_ocr': 0, 'paginas_retomadas': 0,
+                         'cache': False})
+    intervalos = interpretar_paginas(selecao_paginas)
+    # A posição das palavras só é pedida ao OCR quando algum formato a grava
+    com_palavras = not FORMATOS_COM_PALAVRAS.isdisjoint(saidas)
+
+    chave = None
+    if cache is not None or retomar:
+        # Sem um motor compartilhado, a conversão usa um MotorOCR com as opções padrão
+        motor_chave = motor_ocr if motor_ocr is not None else MotorOCR(1)
+        selecao = f'{descrever_paginas(intervalos)}|{max_caracteres or ""}' if intervalos or max_caracteres else ''
+        chave = gerar_chave_conversao(caminho_pdf, usar_ocr, motor_chave.idioma, min_caracteres_pagina,
+                                      motor_chave.descricao(), '' if usar_ocr else escolher_extrator(extrator),
+                                      selecao)
+    # As entradas do cache sem páginas de OCR servem a todos os formatos; as com OCR ficam na chave
+    # da conversão (sem a posição das palavras) ou na variante 'palavras'
+    chave_texto = chave_palavras = None
+    if chave is not None:
+        chave_texto = variante_chave(chave, 'texto')
+        chave_palavras = variante_chave(chave, 'palavras')
+
+    paginas = None
+    extracao = None
+    entrada_cache = None
+    diario = None
+    caracteres = 0
+    # Páginas de OCR com a posição das palavras, também as retomadas do diário
+    gravou_palavras = False
+    if cache is not None:
+        if com_palavras:
+            paginas = cache.obter(chave_palavras, chave_texto)
+        else:
+            paginas = cache.obter(chave_texto, chave, chave_palavras)
+        if paginas is not None:
+            paginas = medidor.medir_paginas('cache', paginas)
+            estatisticas['cache'] = True
+            print('Texto encontrado no cache de conversões.')
+
+    if paginas is None:
+        if usar_ocr and not _verificar_ocr_disponivel(motor_ocr):
+            return None
+
+        # Páginas registradas por uma execução anterior interrompida não são extraídas de novo
+        pular = 0
+        if retomar:
+            diario = DiarioPaginas(next(iter(saidas.values())), chave_palavras if com_palavras else chave)
+            pular = diario.total_registradas
+            estatisticas['paginas_retomadas'] = diario.total_registradas
+            if diario.total_registradas:
+                print(f'Retomando a conversão depois de {pular} página(s) já gravada(s)...')
 
         if usar_ocr:
-            if not caminho_tesseract:
-                print('Erro: OCR não disponível. Tesseract não encontrado.')
-                return None
-            
-            if not verificar_idioma_tesseract():
-                print('Erro: Arquivo de idioma português não encontrado.')
-                print('Por favor, instale o arquivo por.traineddata seguindo as instruções acima.')
-                return None
-                
-            print('Usando OCR para extrair texto das imagens...')
-            # Verifica se o Poppler está instalado
-            if not os.path.exists(POPPLER_PATH):
-                print(f'Erro: Poppler não encontrado em {POPPLER_PATH}')
-                print('Por favor, instale o Poppler seguindo as instruções:')
-                print('1. Baixe o Poppler de: https://github.com/oschwartz10612/poppler-windows/releases/')
-                print('2. Extraia o arquivo ZIP')
-                print('3. Copie a pasta para C:\\Program Files\\poppler')
-                print('4. Adicione C:\\Program Files\\poppler\\Library\\bin ao PATH do sistema')
-                return None
-
-            # Converte PDF para imagens
-            imagens = convert_from_path(caminho_pdf, poppler_path=POPPLER_PATH)
-            
-            # Processa cada página
-            for i, imagem in enumerate(imagens):
-                print(f'Processando página {i+1} de {len(imagens)}...')
-                # Extrai texto da imagem usando OCR
-                texto = pytesseract.image_to_string(imagem, lang='por')
-                texto_completo += texto + '\n'
+            extracao = _paginas_ocr(caminho_pdf, motor_ocr, pular, estatisticas, medidor, intervalos, com_palavras)
         else:
-            # Tenta primeiro extrair texto normalmente
-            with open(caminho_pdf, 'rb') as arquivo_pdf:
-                leitor_pdf = PyPDF2.PdfReader(arquivo_pdf)
-                
-                # Extrai o texto de todas as páginas
-                for pagina in leitor_pdf.pages:
-                    texto_completo += pagina.extract_text() + '\n'
-            
-            # Se não encontrou texto, tenta usar OCR
-            if not texto_completo.strip():
-                print('Nenhum texto encontrado. Tentando usar OCR...')
-                return converter_pdf_para_txt(caminho_pdf, caminho_saida, usar_ocr=True)
-        
-        # Salva o texto em um arquivo TXT
-        with open(caminho_saida, 'w', encoding='utf-8') as arquivo_txt:
-            arquivo_txt.write(texto_completo)
-        
-        print(f'Arquivo TXT criado com sucesso: {caminho_saida}')
-        return caminho_saida
-            
-    except Exception as e:
-        print(f'Erro ao converter o PDF: {str(e)}')
+            # Extrai o texto normalmente e usa OCR só nas páginas sem texto
+            extracao = _paginas_hibridas(caminho_pdf, motor_ocr, min_caracteres_pagina, pular, estatisticas,
+                                         extrator, medidor, intervalos, com_palavras)
+        paginas = extracao
+        if diario is not None:
+            paginas = itertools.chain(diario.paginas_registradas(), paginas)
+        if cache is not None:
+            entrada_cache = cache.iniciar_entrada(chave)
+
+    try:
+        with contextlib.ExitStack() as pilha:
+            # Cada página extraída é gravada em todas as saídas
+            escritores = [pilha.enter_context(escritor) for escritor in criar_escritores(saidas)]
+            for numero, texto in enumerate(paginas, 1):
+                with medidor.etapa('escrita', numero):
+                    for escritor in escritores:
+                        escritor.adicionar_pagina(texto)
+                if entrada_cache is not None:
+                    entrada_cache.adicionar_pagina(texto)
+                    gravou_palavras = gravou_palavras or isinstance(texto, TextoPagina)
+                # Depois de uma página que ficou sem OCR, o diário para: a retomada a extrai de novo
+                if diario is not None and numero > diario.total_registradas and not estatisticas['paginas_sem_ocr']:
+                    diario.registrar(numero, texto)
+                estatisticas['paginas'] = numero
+                if progresso is not None:
+                    progresso(numero)
+                if ao_concluir_pagina is not None:
+                    ao_concluir_pagina(numero, texto)
+                caracteres += len(texto)
+                if max_caracteres and caracteres >= max_caracteres:
+                    print(f'Limite de {max_caracteres} caracteres atingido após {numero} página(s).')
+                    break
+            # As páginas seguintes não são extraídas nem rasterizadas
+            if extracao is not None:
+                extracao.close()
+            # No DOCX, o documento inteiro é gravado no disco ao fechar
+            with medidor.etapa('escrita'):
+                for escritor in escritores:
+                    escritor.fechar()
+    except Exception:
+        if entrada_cache is not None:
+            entrada_cache.descartar()
+        if diario is not None:
+            diario.fechar()
+        raise
+
+    if diario is not None:
+        diario.concluir()
+
+    if not any(escritor.possui_texto for escritor in escritores):
+        if entrada_cache is not None:
+            entrada_cache.descartar()
+        print('Erro: Nenhum texto encontrado no PDF.')
         return None
 
-def converter_pdf_para_docx(caminho_pdf, caminho_saida=None, usar_ocr=False):
+    if estatisticas['paginas_sem_ocr']:
+        # Sem o OCR, o texto dessas páginas falta: a conversão não vai para o cache e é refeita depois
+        print(f'Aviso: {estatisticas["paginas_sem_ocr"]} página(s) sem texto ficaram em branco porque o OCR '
+              f'não está disponível.')
+        if entrada_cache is not None:
+            entrada_cache.descartar()
+    elif entrada_cache is not None:
+        if com_palavras:
+            com_ocr = gravou_palavras
+        else:
+            # As páginas retomadas do diário podem ter vindo do OCR
+            com_ocr = estatisticas['paginas_ocr'] or estatisticas['paginas_retomadas']
+        if not com_ocr:
+            entrada_cache.confirmar(chave_texto)
+        else:
+            entrada_cache.confirmar(chave_palavras if com_palavras else chave)
+
+    for formato, caminho_saida in saidas.items():
+        print(f'Arquivo {formato.upper()} criado com sucesso: {caminho_saida}')
+    return dict(saidas)
+
+def _validar_pdf(caminho_pdf):
+    """Verifica se o caminho informado aponta para um arquivo PDF existente"""
+    # Verifica se o arquivo existe
+    if not os.path.exists(caminho_pdf):
+        print(f'Erro: O arquivo "{caminho_pdf}" não foi encontrado.')
+        print('Verifique se:')
+        print('1. O caminho está correto')
+        print('2. O arquivo existe no local especificado')
+        print('3. Você incluiu a extensão .pdf no nome do arquivo')
+        return False
+
+    # Verifica se é um arquivo PDF
+    if not caminho_pdf.lower().endswith('.pdf'):
+        print('Erro: O arquivo deve ter a extensão .pdf')
+        return False
+
+    return True
+
+def converter_pdf(caminho_pdf, saidas, usar_ocr=False, motor_ocr=None, min_caracteres_pagina=MIN_CARACTERES_PAGINA,
+                  cache=None, retomar=False, progresso=None, estatisticas=None, extrator='auto', perfil=None,
+                  ao_concluir_pagina=None, paginas=None, max_caracteres=None):
     """
-    Converte um arquivo PDF para DOCX
+    Converte um arquivo PDF para um ou mais formatos com uma única extração:
+    cada página é lida (ou reconhecida pelo OCR) uma vez e gravada em todas
+    as saídas. Com a saída 'jsonl', o OCR também informa a caixa e a
+    confiança de cada palavra, na mesma execução do Tesseract.
     :param caminho_pdf: Caminho do arquivo PDF
-    :param caminho_saida: Caminho onde o arquivo DOCX será salvo (opcional)
-    :param usar_ocr: Se True, usa OCR para extrair texto de imagens
-    :return: Caminho do arquivo DOCX gerado
+    :param saidas: Dicionário formato -> caminho de saída (None: ao lado do PDF, com a extensão do
+                   formato) ou apenas os formatos, como {'txt', 'jsonl'} ou 'docx,jsonl'
+    :param usar_ocr: Se True, usa OCR em todas as páginas; se False, usa OCR apenas
+                     nas páginas sem camada de texto
+    :param motor_ocr: MotorOCR compartilhado para o OCR paralelo (opcional)
+    :param min_caracteres_pagina: Mínimo de caracteres para considerar que a página tem texto
+    :param cache: CacheConversao usado para reaproveitar extrações anteriores (opcional)
+    :param retomar: Se True, registra as páginas em um diário ao lado da primeira saída e retoma
+                    uma conversão interrompida a partir da primeira página não registrada
+    :param progresso: Função chamada com o número de cada página concluída (opcional)
+    :param estatisticas: Dicionário preenchido com páginas, páginas com OCR e uso do cache (opcional)
+    :param extrator: Extrator da camada de texto: 'auto' (o mais rápido instalado), 'pypdfium2',
+                     'pdftotext' ou 'pypdf2'
+    :param perfil: 'cpu' (cProfile) ou 'memoria' (tracemalloc) para gravar, ao lado da primeira saída,
+                   um relatório com o tempo ou a memória de cada biblioteca usada na conversão (opcional)
+    :param ao_concluir_pagina: Função chamada com (número, texto) de cada página gravada na saída (opcional)
+    :param paginas: Páginas convertidas, como '1-3,5,10-' ou uma lista de números (padrão: todas);
+                    só essas páginas são lidas ou rasterizadas
+    :param max_caracteres: Encerra a conversão ao fim da página em que o texto gravado atinge esse
+                           número de caracteres; as páginas seguintes não são processadas (opcional)
+    :return: Dicionário formato -> caminho dos arquivos gerados
     """
     try:
-        # Verifica se o arquivo existe
-        if not os.path.exists(caminho_pdf):
-            print(f'Erro: O arquivo "{caminho_pdf}" não foi encontrado.')
-            print('Verifique se:')
-            print('1. O caminho está correto')
-            print('2. O arquivo existe no local especificado')
-            print('3. Você incluiu a extensão .pdf no nome do arquivo')
-            return None
-
-        # Verifica se é um arquivo PDF
-        if not caminho_pdf.lower().endswith('.pdf'):
-            print('Erro: O arquivo deve ter a extensão .pdf')
+        if not _validar_pdf(caminho_pdf):
             return None
 
-        # Se não foi especificado um caminho de saída, usa o mesmo nome do PDF
-        if caminho_saida is None:
-            caminho_saida = os.path.splitext(caminho_pdf)[0] + '.docx'
+        caminhos = saidas if isinstance(saidas, dict) else dict.fromkeys(normalizar_formatos(saidas))
+        # Formatos sem caminho de saída usam o mesmo nome do PDF
+        base = os.path.splitext(caminho_pdf)[0]
+        saidas = {formato: caminhos[formato] or f'{base}.{formato}' for formato in normalizar_formatos(caminhos)}
 
-        # Cria um novo documento Word
-        doc = Document()
-        
-        # Configura o estilo padrão
-        style = doc.styles['Normal']
-        style.font.name = 'Arial'
-        style.font.size = Pt(11)
+        return _converter_pdf(caminho_pdf, saidas, usar_ocr=usar_ocr, motor_ocr=motor_ocr,
+                              min_caracteres_pagina=min_caracteres_pagina, cache=cache, retomar=retomar,
+                              progresso=progresso, estatisticas=estatisticas, extrator=extrator, perfil=perfil,
+                              ao_concluir_pagina=ao_concluir_pagina, paginas=paginas, max_caracteres=max_caracteres)
 
-        if usar_ocr:
-            if not caminho_tesseract:
-                print('Erro: OCR não disponível. Tesseract não encontrado.')
-                return None
-            
-            if not verificar_idioma_tesseract():
-                print('Erro: Arquivo de idioma português não encontrado.')
-                print('Por favor, instale o arquivo por.traineddata seguindo as instruções acima.')
-                return None
-                
-            print('Usando OCR para extrair texto das imagens...')
-            # Verifica se o Poppler está instalado
-            if not os.path.exists(POPPLER_PATH):
-                print(f'Erro: Poppler não encontrado em {POPPLER_PATH}')
-                print('Por favor, instale o Poppler seguindo as instruções:')
-                print('1. Baixe o Poppler de: https://github.com/oschwartz10612/poppler-windows/releases/')
-                print('2. Extraia o arquivo ZIP')
-                print('3. Copie a pasta para C:\\Program Files\\poppler')
-                print('4. Adicione C:\\Program Files\\poppler\\Library\\bin ao PATH do sistema')
-                return None
-
-            # Converte PDF para imagens
-            imagens = convert_from_path(caminho_pdf, poppler_path=POPPLER_PATH)
-            
-            # Processa cada página
-            for i, imagem in enumerate(imagens):
-                print(f'Processando página {i+1} de {len(imagens)}...')
-                # Extrai texto da imagem usando OCR
-                texto = pytesseract.image_to_string(imagem, lang='por')
-                # Adiciona o texto ao documento Word
-                paragrafo = doc.add_paragraph(texto)
-                # Adiciona uma quebra de página após cada página
-                if i < len(imagens) - 1:
-                    doc.add_page_break()
-        else:
-            # Tenta primeiro extrair texto normalmente
-            with open(caminho_pdf, 'rb') as arquivo_pdf:
-                leitor_pdf = PyPDF2.PdfReader(arquivo_pdf)
-                
-                # Extrai o texto de todas as páginas
-                for i, pagina in enumerate(leitor_pdf.pages):
-                    print(f'Processando página {i+1} de {len(leitor_pdf.pages)}...')
-                    texto = pagina.extract_text()
-                    # Adiciona o texto ao documento Word
-                    paragrafo = doc.add_paragraph(texto)
-                    # Adiciona uma quebra de página após cada página
-                    if i < len(leitor_pdf.pages) - 1:
-                        doc.add_page_break()
-            
-            # Se não encontrou texto, tenta usar OCR
-            if not doc.paragraphs:
-                print('Nenhum texto encontrado. Tentando usar OCR...')
-                return converter_pdf_para_docx(caminho_pdf, caminho_saida, usar_ocr=True)
-        
-        # Salva o documento
-        doc.save(caminho_saida)
-        print(f'Arquivo DOCX criado com sucesso: {caminho_saida}')
-        return caminho_saida
-            
     except Exception as e:
         print(f'Erro ao converter o PDF: {str(e)}')
         return None
 
+def converter_pdf_para_txt(caminho_pdf, caminho_saida=None, usar_ocr=False, **opcoes):
+    """Converte um arquivo PDF para TXT; as demais opções são as de converter_pdf()"""
+    saidas = converter_pdf(caminho_pdf, {'txt': caminho_saida}, usar_ocr=usar_ocr, **opcoes)
+    return saidas['txt'] if saidas else None
+
+def converter_pdf_para_docx(caminho_pdf, caminho_saida=None, usar_ocr=False, **opcoes):
+    """Converte um arquivo PDF para DOCX; as demais opções são as de converter_pdf()"""
+    saidas = converter_pdf(caminho_pdf, {'docx': caminho_saida}, usar_ocr=usar_ocr, **opcoes)
+    return saidas['docx'] if saidas else None
+
 if __name__ == '__main__':
     print('=== Conversor de PDF ===')
     print('1. Converter para TXT')
@@ -0,0 +1,203 @@
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from motor_ocr import MotorOCR
+
+# Modos de perfil: tempo de CPU (cProfile) ou memória alocada (tracemalloc)
+MODOS_PERFIL = ('cpu', 'memoria')
+
+# Etapas do relatório, na ordem em que a memória é atribuída:
+# (etapa, trecho do caminho do módulo, funções de entrada medidas pelo cProfile)
+ETAPAS_PERFIL = (
+    ('PyPDF2 - extração do texto', 'PyPDF2/', ('extract_text',)),
+    ('pypdfium2 - extração do texto', 'pypdfium2/', ('get_text_range',)),
+    ('imagens embutidas das páginas', 'imagens_embutidas.py', ('extrair',)),
+    ('pré-processamento das imagens', 'preprocessamento_ocr.py', ('processar',)),
+    # Gravação da imagem temporária e execução do Tesseract, com ou sem a posição das palavras
+    ('pytesseract - OCR', 'pytesseract/', ('save', 'run_tesseract')),
+    ('tesserocr - OCR', 'backends_ocr.py', ('GetUTF8Text',)),
+    # Depois do OCR: no modo serial, o OCR também roda dentro de motor_ocr.py
+    ('Poppler - rasterização', 'motor_ocr.py', ('rasterizar_paginas',)),
+    ('escrita da saída (TXT/DOCX/JSONL)', 'escritores.py', ('adicionar_pagina', 'fechar')),
+)
+
+# Quadros guardados em cada alocação: o suficiente para chegar da biblioteca até o conversor
+QUADROS_TRACEMALLOC = 40
+
+def _funcao_da_etapa(caminho, funcao, trecho, funcoes):
+    """Verifica se uma função do cProfile é uma das funções de entrada da etapa"""
+    # Funções em C (como as do tesserocr) aparecem com o caminho '~' e o nome do método entre aspas
+    if caminho == '~':
+        return any(f"'{nome}'" in funcao for nome in funcoes)
+    return trecho in caminho.replace('\\', '/') and funcao in funcoes
+
+def motor_serial(motor_ocr):
+    """
+    Retorna um MotorOCR com as mesmas opções que roda o OCR no próprio processo,
+    para que o tempo e a memória do Tesseract apareçam no perfil
+    :return: Tupla (motor, True se o motor foi criado aqui e deve ser encerrado)
+    """
+    if motor_ocr is not None and motor_ocr.num_workers == 1:
+        return motor_ocr, False
+    if motor_ocr is None:
+        return MotorOCR(1), True
+    return MotorOCR(1, motor_ocr.idioma, motor_ocr.tesseract_cmd, backend=motor_ocr.classe_backend.nome,
+                    preprocessamento=motor_ocr.preprocessamento), True
+
+class PerfilConversao:
+    """
+    Perfila uma única conversão e grava um relatório que atribui o tempo (modo
+    'cpu', com o cProfile) ou a memória (modo 'memoria', com o tracemalloc) a
+    cada biblioteca usada: PyPDF2, Poppler, pytesseract e a escrita da saída.
+
+    O cProfile mede apenas a thread que chamou iniciar(), e o tracemalloc
+    mede o processo inteiro: perfile uma conversão de cada vez.
+    """
+
+    def __init__(self, modo='cpu', intervalo_amostragem=0.05):
+        """
+        :param modo: 'cpu' ou 'memoria'
+        :param intervalo_amostragem: No modo 'memoria', intervalo em segundos entre as leituras do pico
+        """
+        if modo not in MODOS_PERFIL:
+            raise ValueError(f'Modo de perfil inválido: {modo} (use {", ".join(MODOS_PERFIL)})')
+        self.modo = modo
+        self.intervalo_amostragem = intervalo_amostragem
+        self.duracao = 0.0
+        self._perfil = None
+        self._inicio = None
+        self._parar_amostragem = threading.Event()
+        self._amostrador = None
+        self._pico = 0
+        self._retrato_pico = None
+
+    def iniciar(self):
+        """Começa a medir"""
+        self._inicio = time.perf_counter()
+        if self.modo == 'cpu':
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        else:
+            tracemalloc.start(QUADROS_TRACEMALLOC)
+            self._parar_amostragem.clear()
+            self._amostrador = threading.Thread(target=self._amostrar_memoria, daemon=True)
+            self._amostrador.start()
+
+    def parar(self):
+        """Termina a medição"""
+        if self.modo == 'cpu':
+            self._perfil.disable()
+        else:
+            self._parar_amostragem.set()
+            self._amostrador.join()
+            self._registrar_pico()
+            tracemalloc.stop()
+        self.duracao = time.perf_counter() - self._inicio
+
+    def _amostrar_memoria(self):
+        while not self._parar_amostragem.wait(self.intervalo_amostragem):
+            self._registrar_pico()
+
+    def _registrar_pico(self):
+        # Guarda as alocações do momento de maior uso; um novo retrato só é tirado
+        # quando o uso passa o pico anterior em mais de 10%, pois tirá-lo é caro
+        atual, _ = tracemalloc.get_traced_memory()
+        if self._retrato_pico is None or atual > self._pico * 1.1:
+            self._pico = atual
+            self._retrato_pico = tracemalloc.take_snapshot()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.parar()
+
+    def _relatorio_cpu(self, linhas):
+        estatisticas = pstats.Stats(self._perfil)
+        total = estatisticas.total_tt
+        linhas.append(f'Tempo de CPU medido: {total:.3f}s')
+        linhas.append('')
+        linhas.append(f'{"etapa":<40} {"chamadas":>9} {"acumulado":>11} {"%":>6}')
+        atribuido = 0.0
+        for etapa, trecho, funcoes in ETAPAS_PERFIL:
+            chamadas, acumulado = 0, 0.0
+            for (caminho, _, funcao), (_, nc, _, ct, _) in estatisticas.stats.items():
+                if _funcao_da_etapa(caminho, funcao, trecho, funcoes):
+                    chamadas += nc
+                    acumulado += ct
+            if chamadas:
+                atribuido += acumulado
+                linhas.append(f'{etapa:<40} {chamadas:>9} {acumulado:>10.3f}s '
+                              f'{acumulado / total if total else 0:>6.1%}')
+        outros = max(0.0, total - atribuido)
+        linhas.append(f'{"demais (conversor, cache, E/S)":<40} {"":>9} {outros:>10.3f}s '
+                      f'{outros / total if total else 0:>6.1%}')
+
+        saida = io.StringIO()
+        estatisticas.stream = saida
+        estatisticas.sort_stats('cumulative').print_stats(40)
+        linhas.append('')
+        linhas.append('Funções com maior tempo acumulado:')
+        linhas.append(saida.getvalue().strip('\n'))
+
+    def _relatorio_memoria(self, linhas):
+        linhas.append(f'Pico de memória alocada pelo Python: {self._pico / 2 ** 20:.1f} MB')
+        linhas.append('(imagens e buffers alocados fora do Python, como os do Tesseract, não aparecem)')
+        linhas.append('')
+        if self._retrato_pico is None:
+            return
+
+        # Cada alocação do pico vai para a primeira etapa que aparece na sua pilha de chamadas
+        por_etapa = {etapa: 0 for etapa, _, _ in ETAPAS_PERFIL}
+        outros = 0
+        for rastro in self._retrato_pico.traces:
+            caminhos = [quadro.filename.replace('\\', '/') for quadro in rastro.traceback]
+            for etapa, trecho, _ in ETAPAS_PERFIL:
+                if any(trecho in caminho for caminho in caminhos):
+                    por_etapa[etapa] += rastro.size
+                    break
+            else:
+                outros += rastro.size
+
+        total = sum(por_etapa.values()) + outros
+        linhas.append(f'{"etapa (no momento do pico)":<40} {"MB":>9} {"%":>6}')
+        for etapa, tamanho in por_etapa.items():
+            if tamanho:
+                linhas.append(f'{etapa:<40} {tamanho / 2 ** 20:>9.2f} {tamanho / total:>6.1%}')
+        linhas.append(f'{"demais":<40} {outros / 2 ** 20:>9.2f} {outros / total if total else 0:>6.1%}')
+
+        linhas.append('')
+        linhas.append('Linhas com mais memória alocada no pico:')
+        for estatistica in self._retrato_pico.statistics('lineno')[:25]:
+            linhas.append(str(estatistica))
+
+    def gravar_relatorio(self, caminho_relatorio, caminho_pdf, etapas=None):
+        """
+        Grava o relatório do perfil. No modo 'cpu', grava também os dados do
+        cProfile em caminho_relatorio + '.prof' (para o pstats ou o snakeviz).
+        :param caminho_relatorio: Arquivo de texto do relatório
+        :param caminho_pdf: PDF convertido (apenas informativo)
+        :param etapas: Tempo de cada etapa medido pelo MedidorConversao (opcional)
+        """
+        linhas = [
+            f'Perfil da conversão ({self.modo})',
+            f'Arquivo: {caminho_pdf}',
+            f'Duração: {self.duracao:.3f}s',
+        ]
+        if etapas:
+            linhas.append('Tempo por etapa da conversão: ' + ', '.join(
+                f'{etapa} {segundos:.3f}s' for etapa, segundos in etapas.items()))
+        linhas.append('')
+        if self.modo == 'cpu':
+            self._relatorio_cpu(linhas)
+            self._perfil.dump_stats(caminho_relatorio + '.prof')
+        else:
+            self._relatorio_memoria(linhas)
+
+        with open(caminho_relatorio, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('\n'.join(linhas) + '\n')
+        print(f'Relatório de perfil gravado em: {caminho_relatorio}')
@@ -0,0 +1,155 @@
+import numpy as np
+from PIL import Image
+
+# Modos de renderização das páginas pelo Poppler
+MODOS_COR = ('cor', 'cinza', 'binario')
+
+# Páginas cujo lado maior tem menos polegadas que isso (recibos, cartões,
+# fichas) costumam ter letras pequenas e são rasterizadas com o DPI máximo
+LADO_PAGINA_PEQUENA = 7.0
+
+def limiar_otsu(cinza):
+    """
+    Calcula o limiar de Otsu de uma imagem em tons de cinza
+    :param cinza: Array NumPy uint8 com a imagem
+    :return: Maior tom (0 a 255) da classe escura: pixels <= limiar são texto
+    """
+    histograma = np.bincount(cinza.ravel(), minlength=256).astype(np.float64)
+    peso_fundo = np.cumsum(histograma)
+    soma = np.cumsum(histograma * np.arange(256))
+    total, soma_total = peso_fundo[-1], soma[-1]
+    peso_frente = total - peso_fundo
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media_fundo = soma / peso_fundo
+        media_frente = (soma_total - soma) / peso_frente
+        variancia = peso_fundo * peso_frente * (media_fundo - media_frente) ** 2
+    return int(np.nanargmax(variancia))
+
+def estimar_inclinacao(texto, angulo_maximo=5.0, passo=0.25, max_pontos=200000):
+    """
+    Estima a inclinação das linhas de texto pelo perfil de projeção: para
+    cada ângulo candidato, os pixels de texto são projetados nas linhas e o
+    ângulo com o perfil mais concentrado (linhas bem separadas) vence. Cada
+    ângulo é avaliado com operações vetorizadas do NumPy, sem girar a imagem.
+    :param texto: Array booleano com True nos pixels de texto
+    :param angulo_maximo: Maior inclinação procurada, em graus, para cada lado
+    :param passo: Intervalo entre os ângulos testados, em graus
+    :param max_pontos: Máximo de pixels usados na estimativa (os demais são amostrados)
+    :return: Ângulo em graus (positivo: texto subindo para a direita)
+    """
+    linhas, colunas = np.nonzero(texto)
+    if len(linhas) < 100:
+        return 0.0
+    if len(linhas) > max_pontos:
+        amostra = np.random.default_rng(0).choice(len(linhas), max_pontos, replace=False)
+        linhas, colunas = linhas[amostra], colunas[amostra]
+
+    angulos = np.arange(-angulo_maximo, angulo_maximo + passo / 2, passo)
+    pontuacao = []
+    for angulo in angulos:
+        projecao = np.rint(linhas + colunas * np.tan(np.radians(angulo))).astype(np.int64)
+        histograma = np.bincount(projecao - projecao.min())
+        pontuacao.append(np.dot(histograma, histograma))
+    return float(angulos[int(np.argmax(pontuacao))])
+
+class PreprocessamentoOCR:
+    """
+    Prepara as páginas para o OCR: escolhe o DPI de cada página pelo seu
+    tamanho físico (ou usa a imagem embutida das páginas digitalizadas),
+    pede ao Poppler a imagem já em tons de cinza e, se
+    configurado, binariza (limiar de Otsu) e corrige a inclinação da página
+    antes de entregá-la ao Tesseract.
+    """
+
+    def __init__(self, modo_cor='cinza', corrigir_inclinacao=False, dpi=200, dpi_minimo=100, dpi_maximo=300,
+                 max_pixels_lado=4000, imagens_embutidas=True):
+        """
+        :param modo_cor: 'cor' (imagem colorida, como antes), 'cinza' (tons de cinza
+                         gerados pelo Poppler) ou 'binario' (tons de cinza + limiar de Otsu)
+        :param corrigir_inclinacao: Se True, endireita páginas escaneadas tortas
+        :param dpi: Resolução das páginas de tamanho comum (A4, carta)
+        :param dpi_minimo: Menor resolução usada em páginas muito grandes
+        :param dpi_maximo: Resolução das páginas pequenas
+        :param max_pixels_lado: Tamanho máximo, em pixels, do lado maior da página rasterizada
+        :param imagens_embutidas: Se True, páginas digitalizadas (uma única imagem cobrindo a página)
+                                  entregam ao OCR a própria imagem embutida, sem rasterização
+        """
+        if modo_cor not in MODOS_COR:
+            raise ValueError(f'Modo de cor inválido: {modo_cor} (use {", ".join(MODOS_COR)})')
+        self.modo_cor = modo_cor
+        self.corrigir_inclinacao = corrigir_inclinacao
+        self.dpi = dpi
+        self.dpi_minimo = dpi_minimo
+        self.dpi_maximo = dpi_maximo
+        self.max_pixels_lado = max_pixels_lado
+        self.imagens_embutidas = imagens_embutidas
+
+    @property
+    def tons_de_cinza(self):
+        """Se o Poppler deve gerar as imagens em tons de cinza"""
+        return self.modo_cor != 'cor'
+
+    def descricao(self):
+        """Resume as opções que mudam o texto reconhecido (usado na chave do cache)"""
+        descricao = (f'{self.modo_cor}|inclinacao={int(self.corrigir_inclinacao)}|dpi={self.dpi}'
+                     f'|{self.dpi_minimo}-{self.dpi_maximo}|{self.max_pixels_lado}')
+        if self.imagens_embutidas:
+            descricao += '|embutidas'
+        return descricao
+
+    def dpi_pagina(self, largura_pontos, altura_pontos):
+        """
+        Escolhe o DPI de uma página a partir do seu tamanho em pontos (1/72 pol.)
+        """
+        lado_maior = max(largura_pontos, altura_pontos) / 72
+        if lado_maior <= 0:
+            return self.dpi
+        if lado_maior < LADO_PAGINA_PEQUENA:
+            dpi = max(self.dpi, self.dpi_maximo)
+        else:
+            dpi = self.dpi
+        # Páginas grandes (plantas, pôsteres) não podem gerar imagens gigantes
+        dpi = min(dpi, self.max_pixels_lado / lado_maior)
+        return int(max(self.dpi_minimo, min(dpi, self.dpi_maximo)))
+
+    def dpis_paginas(self, documento, numeros_paginas):
+        """
+        Escolhe o DPI de cada página informada
+        :param documento: DocumentoPDF da conversão
+        :return: Dicionário número da página -> DPI
+        """
+        try:
+            return {numero: self.dpi_pagina(*documento.tamanho_pagina(numero)) for numero in numeros_paginas}
+        except Exception:
+            # Sem o tamanho das páginas, usa o DPI comum em todas
+            return {numero: self.dpi for numero in numeros_paginas}
+
+    def processar(self, imagem):
+        """
+        Aplica o limiar e a correção de inclinação a uma página (executado nos processos de OCR)
+        :param imagem: Imagem PIL ou caminho do arquivo de imagem da página
+        :return: A própria entrada, se não houver nada a fazer, ou a imagem PIL processada
+        """
+        if self.modo_cor != 'binario' and not self.corrigir_inclinacao:
+            return imagem
+
+        if isinstance(imagem, str):
+            with Image.open(imagem) as aberta:
+                imagem = aberta.convert('L')
+        else:
+            imagem = imagem.convert('L')
+        cinza = np.asarray(imagem)
+        limiar = limiar_otsu(cinza)
+
+        if self.corrigir_inclinacao:
+            # A estimativa usa uma versão reduzida da página: o ângulo não depende da resolução
+            fator = max(1, max(cinza.shape) // 1000)
+            angulo = estimar_inclinacao(cinza[::fator, ::fator] <= limiar)
+            if abs(angulo) >= 0.1:
+                imagem = imagem.rotate(-angulo, resample=Image.BILINEAR, expand=True, fillcolor=255)
+                cinza = np.asarray(imagem)
+
+        if self.modo_cor == 'binario':
+            imagem = Image.fromarray(np.where(cinza <= limiar, 0, 255).astype(np.uint8))
+        return imagem
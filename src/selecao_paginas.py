@@ -0,0 +1,92 @@
+def interpretar_paginas(especificacao):
+    """
+    Interpreta uma seleção de páginas
+    :param especificacao: Texto como '1-3,5,10-' (da página 10 até o fim), lista de números
+                          de página, range, intervalos já interpretados ou None (todas as páginas)
+    :return: Tupla ordenada de intervalos (primeira, última ou None para o fim), sem
+             sobreposições, ou None para todas as páginas
+    :raises ValueError: Se a seleção for inválida
+    """
+    if especificacao is None:
+        return None
+    if isinstance(especificacao, str):
+        intervalos = []
+        for parte in especificacao.replace(' ', '').split(','):
+            if not parte:
+                continue
+            inicio, separador, fim = parte.partition('-')
+            try:
+                primeira = int(inicio) if inicio else 1
+                ultima = (int(fim) if fim else None) if separador else primeira
+            except ValueError:
+                raise ValueError(f'Seleção de páginas inválida: {parte}')
+            intervalos.append((primeira, ultima))
+    else:
+        intervalos = []
+        for item in especificacao:
+            # Aceita o próprio resultado: os intervalos já interpretados passam sem mudança
+            if isinstance(item, (tuple, list)):
+                primeira, ultima = item
+                intervalos.append((int(primeira), None if ultima is None else int(ultima)))
+            else:
+                intervalos.append((int(item), int(item)))
+
+    if not intervalos:
+        raise ValueError('A seleção de páginas está vazia')
+    for primeira, ultima in intervalos:
+        if primeira < 1 or (ultima is not None and ultima < primeira):
+            raise ValueError(f'Intervalo de páginas inválido: {descrever_paginas([(primeira, ultima)])}')
+
+    # Junta intervalos sobrepostos ou vizinhos
+    unidos = []
+    for primeira, ultima in sorted(intervalos, key=lambda intervalo: intervalo[0]):
+        if unidos and (unidos[-1][1] is None or primeira <= unidos[-1][1] + 1):
+            if unidos[-1][1] is not None:
+                unidos[-1][1] = None if ultima is None else max(unidos[-1][1], ultima)
+        else:
+            unidos.append([primeira, ultima])
+    return tuple(tuple(intervalo) for intervalo in unidos)
+
+def descrever_paginas(intervalos):
+    """Descreve os intervalos no formato aceito por interpretar_paginas ('' para todas as páginas)"""
+    if intervalos is None:
+        return ''
+    partes = []
+    for primeira, ultima in intervalos:
+        if ultima is None:
+            partes.append(f'{primeira}-')
+        elif ultima == primeira:
+            partes.append(str(primeira))
+        else:
+            partes.append(f'{primeira}-{ultima}')
+    return ','.join(partes)
+
+def numeros_paginas(intervalos, total_paginas):
+    """
+    Lista os números das páginas selecionadas que existem no documento
+    :param intervalos: Resultado de interpretar_paginas() (None: todas)
+    :param total_paginas: Número de páginas do documento
+    :return: Lista crescente de números de página
+    """
+    if intervalos is None:
+        return list(range(1, total_paginas + 1))
+    numeros = []
+    for primeira, ultima in intervalos:
+        ultima = total_paginas if ultima is None else min(ultima, total_paginas)
+        numeros.extend(range(primeira, ultima + 1))
+    return numeros
+
+def numero_na_selecao(intervalos, posicao):
+    """
+    Número, no PDF, da página que ocupa uma posição na saída de uma conversão
+    :param intervalos: Resultado de interpretar_paginas() (None: todas)
+    :param posicao: Posição da página na saída, a partir de 1
+    :return: Número da página no PDF
+    """
+    if intervalos is None:
+        return posicao
+    for primeira, ultima in intervalos:
+        if ultima is None or posicao <= ultima - primeira + 1:
+            return primeira + posicao - 1
+        posicao -= ultima - primeira + 1
+    return None
@@ -0,0 +1,518 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from pdf_to_txt import converter_pdf
+from motor_ocr import MotorOCR
+from cache_conversao import CacheConversao
+from extratores_texto import EXTRATORES_TEXTO
+from selecao_paginas import interpretar_paginas
+from escritores import ESCRITORES
+
+# Bytes lidos ou gravados por vez ao copiar uploads e downloads
+TAMANHO_BLOCO = 64 * 1024
+
+# Tempo máximo, em segundos, para o cliente enviar a linha de requisição e os cabeçalhos
+TEMPO_LIMITE_CABECALHOS = 30
+
+TIPOS_SAIDA = {
+    'txt': 'text/plain; charset=utf-8',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'jsonl': 'application/jsonl; charset=utf-8',
+}
+
+MENSAGENS_HTTP = {
+    200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 411: 'Length Required', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+class _ErroHTTP(Exception):
+    """Interrompe o atendimento de uma requisição com um código de status"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+class TrabalhoConversao:
+    """
+    Uma conversão recebida pelo serviço. As páginas ficam disponíveis à medida
+    que são gravadas; quem acompanha o trabalho espera por proxima_mudanca().
+    Todos os métodos são usados apenas na thread do laço de eventos.
+    """
+
+    def __init__(self, id_trabalho, nome, formato, usar_ocr, pasta, paginas=None, max_caracteres=None):
+        self.id = id_trabalho
+        self.nome = nome
+        self.formato = formato
+        self.usar_ocr = usar_ocr
+        self.selecao_paginas = paginas
+        self.max_caracteres = max_caracteres
+        self.pasta = pasta
+        self.caminho_pdf = os.path.join(pasta, 'entrada.pdf')
+        self.caminho_saida = os.path.join(pasta, os.path.splitext(nome)[0] + '.' + formato)
+        self.status = 'na_fila'
+        self.erro = None
+        self.paginas = []
+        self.estatisticas = {}
+        self.criado_em = time.time()
+        self.iniciado_em = None
+        self.concluido_em = None
+        self._mudanca = asyncio.get_running_loop().create_future()
+
+    @property
+    def terminado(self):
+        return self.status in ('concluido', 'erro')
+
+    def _avisar(self):
+        self._mudanca.set_result(None)
+        self._mudanca = asyncio.get_running_loop().create_future()
+
+    def proxima_mudanca(self):
+        """Futuro concluído na próxima página ou mudança de status (compartilhado: não o cancele)"""
+        return self._mudanca
+
+    def iniciar(self):
+        self.status = 'convertendo'
+        self.iniciado_em = time.time()
+        self._avisar()
+
+    def adicionar_pagina(self, numero, texto):
+        # Páginas retomadas ou vindas do cache também chegam em ordem, a partir da primeira
+        if numero == len(self.paginas) + 1:
+            self.paginas.append(texto)
+            self._avisar()
+
+    def concluir(self, saida, erro=None):
+        self.status = 'concluido' if saida else 'erro'
+        self.erro = None if saida else (erro or 'Não foi possível converter o arquivo')
+        self.concluido_em = time.time()
+        self._avisar()
+
+    def resumo(self):
+        """Estado do trabalho como dicionário JSON"""
+        fim = self.concluido_em or time.time()
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'formato': self.formato,
+            'ocr': self.usar_ocr,
+            'status': self.status,
+            'erro': self.erro,
+            'paginas_concluidas': len(self.paginas),
+            'paginas_ocr': self.estatisticas.get('paginas_ocr', 0),
+            'paginas_sem_ocr': self.estatisticas.get('paginas_sem_ocr', 0),
+            'cache': self.estatisticas.get('cache', False),
+            'duracao': round(fim - self.iniciado_em, 3) if self.iniciado_em else None,
+            'links': {
+                'estado': f'/conversoes/{self.id}',
+                'paginas': f'/conversoes/{self.id}/paginas',
+                'eventos': f'/conversoes/{self.id}/eventos',
+                'arquivo': f'/conversoes/{self.id}/arquivo',
+            },
+        }
+
+class ServicoConversao:
+    """
+    Serviço HTTP local (asyncio) que recebe PDFs e os converte em um pool de
+    threads compartilhado, com o mesmo MotorOCR e o mesmo cache para todos os
+    trabalhos. O upload é gravado no disco em blocos, sem ficar inteiro na
+    memória, e o resultado de cada página pode ser consultado ou recebido
+    em fluxo enquanto a conversão acontece.
+
+    Rotas:
+        POST   /conversoes?formato=txt|docx|jsonl&ocr=0|1&nome=arquivo.pdf  (corpo: o PDF)
+               opcionais: &paginas=1-3,10-&max_caracteres=N
+        GET    /conversoes                     trabalhos existentes
+        GET    /conversoes/<id>                estado do trabalho
+        GET    /conversoes/<id>/paginas?desde=N   páginas prontas a partir da N
+        GET    /conversoes/<id>/eventos?desde=N   páginas em fluxo (uma linha JSON por página)
+        GET    /conversoes/<id>/arquivo        arquivo convertido
+        DELETE /conversoes/<id>                remove o trabalho e seus arquivos
+        GET    /saude
+    """
+
+    def __init__(self, pasta_trabalho=None, endereco='127.0.0.1', porta=8765, max_documentos=None,
+                 motor_ocr=None, cache=None, extrator='auto', max_bytes=512 * 1024 ** 2, max_trabalhos=1000,
+                 retencao=3600):
+        """
+        :param pasta_trabalho: Pasta dos uploads e das saídas (padrão: uma pasta temporária)
+        :param endereco: Endereço em que o serviço escuta (padrão: apenas a máquina local)
+        :param porta: Porta TCP (0: uma porta livre qualquer)
+        :param max_documentos: Conversões simultâneas no pool (padrão: um por núcleo)
+        :param motor_ocr: MotorOCR compartilhado pelos trabalhos (padrão: um com as opções padrão)
+        :param cache: CacheConversao compartilhado pelos trabalhos (opcional)
+        :param extrator: Extrator da camada de texto (nome registrado em extratores_texto ou 'auto')
+        :param max_bytes: Tamanho máximo de um upload
+        :param max_trabalhos: Máximo de trabalhos guardados (na fila, em andamento ou concluídos)
+        :param retencao: Segundos que um trabalho concluído fica disponível antes de ser removido
+        """
+        self.pasta_trabalho = pasta_trabalho
+        self.endereco = endereco
+        self.porta = porta
+        self.max_documentos = max(1, max_documentos or os.cpu_count() or 1)
+        self.motor_ocr = motor_ocr
+        self.cache = cache
+        self.extrator = extrator
+        self.max_bytes = max_bytes
+        self.max_trabalhos = max_trabalhos
+        self.retencao = retencao
+
+        self.trabalhos = {}
+        self._pasta_temporaria = None
+        self._encerrar_motor = False
+        self._executor = None
+        self._servidor = None
+        self._limpeza = None
+
+    async def iniciar(self):
+        """Abre a porta e começa a aceitar conexões"""
+        if self.pasta_trabalho is None:
+            self._pasta_temporaria = tempfile.mkdtemp(prefix='servico_conversao_')
+            self.pasta_trabalho = self._pasta_temporaria
+        os.makedirs(self.pasta_trabalho, exist_ok=True)
+        if self.motor_ocr is None:
+            self.motor_ocr = MotorOCR()
+            self._encerrar_motor = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_documentos, thread_name_prefix='conversao')
+        self._servidor = await asyncio.start_server(self._atender, self.endereco, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        self._limpeza = asyncio.create_task(self._remover_expirados())
+
+    async def encerrar(self):
+        """Para de aceitar conexões, cancela os trabalhos na fila e libera o pool"""
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        self._limpeza.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        if self._encerrar_motor:
+            self.motor_ocr.encerrar()
+        if self._pasta_temporaria:
+            shutil.rmtree(self._pasta_temporaria, ignore_errors=True)
+
+    async def servir(self):
+        """Inicia o serviço e atende até ser cancelado"""
+        await self.iniciar()
+        print(f'Serviço de conversão em http://{self.endereco}:{self.porta}/conversoes')
+        try:
+            await self._servidor.serve_forever()
+        finally:
+            await self.encerrar()
+
+    async def _remover_expirados(self):
+        while True:
+            await asyncio.sleep(min(60, self.retencao))
+            limite = time.time() - self.retencao
+            for trabalho in list(self.trabalhos.values()):
+                if trabalho.terminado and trabalho.concluido_em < limite:
+                    self._remover(trabalho)
+
+    def _remover(self, trabalho):
+        del self.trabalhos[trabalho.id]
+        shutil.rmtree(trabalho.pasta, ignore_errors=True)
+
+    # Conversão
+
+    def _converter(self, trabalho, loop):
+        """Executado nas threads do pool"""
+        loop.call_soon_threadsafe(trabalho.iniciar)
+        erro = None
+        try:
+            saidas = converter_pdf(
+                trabalho.caminho_pdf,
+                {trabalho.formato: trabalho.caminho_saida},
+                trabalho.usar_ocr,
+                self.motor_ocr,
+                cache=self.cache,
+                estatisticas=trabalho.estatisticas,
+                extrator=self.extrator,
+                paginas=trabalho.selecao_paginas,
+                max_caracteres=trabalho.max_caracteres,
+                ao_concluir_pagina=lambda numero, texto: loop.call_soon_threadsafe(
+                    trabalho.adicionar_pagina, numero, texto)
+            )
+            saida = saidas[trabalho.formato] if saidas else None
+        except Exception as e:
+            saida, erro = None, str(e)
+        loop.call_soon_threadsafe(trabalho.concluir, saida, erro)
+
+    # HTTP
+
+    async def _atender(self, leitor, escritor):
+        try:
+            try:
+                metodo, alvo, cabecalhos = await asyncio.wait_for(self._ler_cabecalhos(leitor),
+                                                                  TEMPO_LIMITE_CABECALHOS)
+                await self._rotear(metodo, alvo, cabecalhos, leitor, escritor)
+            except _ErroHTTP as e:
+                await self._responder_json(escritor, e.status, {'erro': str(e)})
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                pass
+            except Exception as e:
+                print(f'Erro no serviço de conversão: {str(e)}')
+                await self._responder_json(escritor, 500, {'erro': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def _ler_cabecalhos(self, leitor):
+        linha = await leitor.readline()
+        if not linha:
+            raise asyncio.IncompleteReadError(linha, None)
+        partes = linha.decode('latin-1').split()
+        if len(partes) != 3:
+            raise _ErroHTTP(400, 'Linha de requisição inválida')
+        cabecalhos = {}
+        while True:
+            linha = await leitor.readline()
+            if linha in (b'\r\n', b'\n'):
+                break
+            if not linha:
+                raise asyncio.IncompleteReadError(linha, None)
+            if len(cabecalhos) >= 100:
+                raise _ErroHTTP(400, 'Cabeçalhos demais')
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        return partes[0].upper(), partes[1], cabecalhos
+
+    async def _rotear(self, metodo, alvo, cabecalhos, leitor, escritor):
+        url = urlsplit(alvo)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        partes = [parte for parte in url.path.split('/') if parte]
+
+        if partes == ['saude']:
+            await self._responder_json(escritor, 200, {'status': 'ok', 'trabalhos': len(self.trabalhos)})
+            return
+        if not partes or partes[0] != 'conversoes' or len(partes) > 3:
+            raise _ErroHTTP(404, 'Rota não encontrada')
+
+        if len(partes) == 1:
+            if metodo == 'POST':
+                await self._receber_upload(parametros, cabecalhos, leitor, escritor)
+            elif metodo == 'GET':
+                await self._responder_json(escritor, 200, [t.resumo() for t in self.trabalhos.values()])
+            else:
+                raise _ErroHTTP(405, 'Método não permitido')
+            return
+
+        trabalho = self.trabalhos.get(partes[1])
+        if trabalho is None:
+            raise _ErroHTTP(404, 'Trabalho não encontrado')
+        recurso = partes[2] if len(partes) == 3 else None
+
+        if recurso is None and metodo == 'DELETE':
+            if not trabalho.terminado:
+                raise _ErroHTTP(409, 'O trabalho ainda está em andamento')
+            self._remover(trabalho)
+            await self._responder_json(escritor, 200, {'id': trabalho.id, 'status': 'removido'})
+        elif metodo != 'GET':
+            raise _ErroHTTP(405, 'Método não permitido')
+        elif recurso is None:
+            await self._responder_json(escritor, 200, trabalho.resumo())
+        elif recurso == 'paginas':
+            desde = self._parametro_inteiro(parametros, 'desde', 1)
+            paginas = [{'pagina': numero, 'texto': texto}
+                       for numero, texto in enumerate(trabalho.paginas[desde - 1:], desde)]
+            await self._responder_json(escritor, 200, {
+                'status': trabalho.status, 'paginas': paginas, 'proxima': desde + len(paginas),
+            })
+        elif recurso == 'eventos':
+            await self._transmitir_paginas(trabalho, self._parametro_inteiro(parametros, 'desde', 1), escritor)
+        elif recurso == 'arquivo':
+            await self._enviar_arquivo(trabalho, escritor)
+        else:
+            raise _ErroHTTP(404, 'Rota não encontrada')
+
+    @staticmethod
+    def _parametro_inteiro(parametros, nome, padrao):
+        try:
+            return max(1, int(parametros.get(nome, padrao)))
+        except ValueError:
+            raise _ErroHTTP(400, f'Parâmetro {nome} inválido')
+
+    async def _receber_upload(self, parametros, cabecalhos, leitor, escritor):
+        formato = parametros.get('formato', 'txt').lower()
+        if formato not in ESCRITORES:
+            raise _ErroHTTP(400, f'Formato inválido (use {", ".join(ESCRITORES)})')
+        if len(self.trabalhos) >= self.max_trabalhos:
+            raise _ErroHTTP(503, 'Trabalhos demais; tente novamente mais tarde')
+        nome = os.path.basename(parametros.get('nome', '')) or 'documento.pdf'
+        if not nome.lower().endswith('.pdf'):
+            nome += '.pdf'
+        try:
+            paginas = interpretar_paginas(parametros['paginas']) if parametros.get('paginas') else None
+        except ValueError as e:
+            raise _ErroHTTP(400, str(e))
+        max_caracteres = self._parametro_inteiro(parametros, 'max_caracteres', 0) if 'max_caracteres' in parametros \
+            else None
+
+        id_trabalho = uuid.uuid4().hex
+        pasta = os.path.join(self.pasta_trabalho, id_trabalho)
+        os.makedirs(pasta)
+        trabalho = TrabalhoConversao(id_trabalho, nome, formato, parametros.get('ocr', '0') in ('1', 'sim', 'true'),
+                                     pasta, paginas, max_caracteres)
+        try:
+            if cabecalhos.get('expect', '').lower() == '100-continue':
+                escritor.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                await escritor.drain()
+            with open(trabalho.caminho_pdf, 'wb') as arquivo:
+                await self._copiar_corpo(leitor, cabecalhos, arquivo)
+            with open(trabalho.caminho_pdf, 'rb') as arquivo:
+                if b'%PDF-' not in arquivo.read(1024):
+                    raise _ErroHTTP(415, 'O corpo da requisição não é um arquivo PDF')
+        except BaseException:
+            shutil.rmtree(pasta, ignore_errors=True)
+            raise
+
+        self.trabalhos[id_trabalho] = trabalho
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(self._executor, self._converter, trabalho, loop)
+        await self._responder_json(escritor, 202, trabalho.resumo())
+
+    async def _copiar_corpo(self, leitor, cabecalhos, arquivo):
+        """Grava o corpo da requisição no arquivo, bloco a bloco"""
+        if cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+            total = 0
+            while True:
+                linha = await leitor.readline()
+                try:
+                    tamanho = int(linha.split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise _ErroHTTP(400, 'Bloco inválido no corpo da requisição')
+                if tamanho == 0:
+                    # Ignora os cabeçalhos finais, se houver
+                    while await leitor.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return total
+                total += tamanho
+                if total > self.max_bytes:
+                    raise _ErroHTTP(413, 'Arquivo grande demais')
+                await self._copiar(leitor, tamanho, arquivo)
+                await leitor.readexactly(2)
+
+        if 'content-length' not in cabecalhos:
+            raise _ErroHTTP(411, 'Informe o Content-Length ou use Transfer-Encoding: chunked')
+        try:
+            tamanho = int(cabecalhos['content-length'])
+        except ValueError:
+            raise _ErroHTTP(400, 'Content-Length inválido')
+        if tamanho > self.max_bytes:
+            raise _ErroHTTP(413, 'Arquivo grande demais')
+        await self._copiar(leitor, tamanho, arquivo)
+        return tamanho
+
+    @staticmethod
+    async def _copiar(leitor, tamanho, arquivo):
+        restante = tamanho
+        while restante:
+            bloco = await leitor.read(min(TAMANHO_BLOCO, restante))
+            if not bloco:
+                raise asyncio.IncompleteReadError(b'', restante)
+            arquivo.write(bloco)
+            restante -= len(bloco)
+
+    async def _transmitir_paginas(self, trabalho, desde, escritor):
+        """Envia cada página (uma linha JSON) assim que ela fica pronta, até o fim do trabalho"""
+        self._escrever_cabecalho(escritor, 200, 'application/x-ndjson; charset=utf-8', {'Transfer-Encoding': 'chunked'})
+        proxima = desde
+        while True:
+            # Lê o estado antes de enviar: páginas que chegarem durante o envio disparam uma nova volta
+            mudanca = trabalho.proxima_mudanca()
+            terminado = trabalho.terminado
+            for numero in range(proxima, len(trabalho.paginas) + 1):
+                evento = {'evento': 'pagina', 'pagina': numero, 'texto': trabalho.paginas[numero - 1]}
+                await self._enviar_bloco(escritor, json.dumps(evento, ensure_ascii=False) + '\n')
+                proxima = numero + 1
+            if terminado:
+                break
+            # O shield impede que uma conexão encerrada cancele o futuro dos outros clientes
+            await asyncio.shield(mudanca)
+
+        evento = {'evento': 'fim', 'status': trabalho.status, 'erro': trabalho.erro, 'paginas': len(trabalho.paginas)}
+        await self._enviar_bloco(escritor, json.dumps(evento, ensure_ascii=False) + '\n')
+        escritor.write(b'0\r\n\r\n')
+        await escritor.drain()
+
+    @staticmethod
+    async def _enviar_bloco(escritor, texto):
+        dados = texto.encode('utf-8')
+        escritor.write(f'{len(dados):X}\r\n'.encode('ascii') + dados + b'\r\n')
+        await escritor.drain()
+
+    async def _enviar_arquivo(self, trabalho, escritor):
+        if trabalho.status != 'concluido':
+            raise _ErroHTTP(409, f'O trabalho não foi concluído (status: {trabalho.status})')
+        nome = os.path.basename(trabalho.caminho_saida)
+        self._escrever_cabecalho(escritor, 200, TIPOS_SAIDA[trabalho.formato], {
+            'Content-Length': str(os.path.getsize(trabalho.caminho_saida)),
+            'Content-Disposition': f'attachment; filename="{nome}"',
+        })
+        with open(trabalho.caminho_saida, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b''):
+                escritor.write(bloco)
+                await escritor.drain()
+
+    @staticmethod
+    def _escrever_cabecalho(escritor, status, tipo, extras=None):
+        linhas = [f'HTTP/1.1 {status} {MENSAGENS_HTTP.get(status, "")}', f'Content-Type: {tipo}', 'Connection: close']
+        linhas += [f'{nome}: {valor}' for nome, valor in (extras or {}).items()]
+        escritor.write(('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1'))
+
+    async def _responder_json(self, escritor, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self._escrever_cabecalho(escritor, status, 'application/json; charset=utf-8',
+                                 {'Content-Length': str(len(corpo))})
+        escritor.write(corpo)
+        await escritor.drain()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serviço HTTP local de conversão de PDF para TXT/DOCX')
+    parser.add_argument('--endereco', default='127.0.0.1', help='Endereço em que o serviço escuta (padrão: 127.0.0.1)')
+    parser.add_argument('-p', '--porta', type=int, default=8765, help='Porta TCP (padrão: 8765)')
+    parser.add_argument('--pasta', help='Pasta dos uploads e das saídas (padrão: uma pasta temporária)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Documentos convertidos ao mesmo tempo (padrão: um por núcleo)')
+    parser.add_argument('--ocr-workers', type=int, default=None,
+                        help='Processos de OCR compartilhados pelos documentos (padrão: um por núcleo)')
+    parser.add_argument('--idioma', default='por', help='Idioma do Tesseract (padrão: por)')
+    parser.add_argument('--extrator', choices=['auto'] + sorted(EXTRATORES_TEXTO), default='auto',
+                        help='Biblioteca que lê a camada de texto')
+    parser.add_argument('--sem-cache', action='store_true', help='Não usa o cache de conversões')
+    parser.add_argument('--max-mb', type=int, default=512, help='Tamanho máximo de cada PDF enviado, em MB')
+    parser.add_argument('--retencao', type=int, default=3600,
+                        help='Segundos que um trabalho concluído fica disponível (padrão: 3600)')
+    args = parser.parse_args(argv)
+
+    motor_ocr = MotorOCR(args.ocr_workers, idioma=args.idioma)
+    servico = ServicoConversao(
+        args.pasta,
+        args.endereco,
+        args.porta,
+        max_documentos=args.jobs,
+        motor_ocr=motor_ocr,
+        cache=None if args.sem_cache else CacheConversao(),
+        extrator=args.extrator,
+        max_bytes=args.max_mb * 1024 ** 2,
+        retencao=args.retencao
+    )
+    try:
+        asyncio.run(servico.servir())
+    except KeyboardInterrupt:
+        print('\nServiço encerrado.')
+    finally:
+        motor_ocr.encerrar()
+    return 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,38 @@
+class TextoPagina(str):
+    """
+    Texto de uma página reconhecida por OCR junto com as palavras que o
+    Tesseract encontrou: cada palavra tem o texto, a caixa [x0, y0, x1, y1]
+    em pixels da imagem reconhecida e a confiança (0 a 100). Como é uma
+    string, o restante da conversão (escritores, cache, diário, limite de
+    caracteres) trata a página como texto comum; só quem precisa da posição
+    das palavras, como a saída JSONL, lê os atributos.
+    """
+
+    def __new__(cls, texto, palavras=(), largura=None, altura=None):
+        """
+        :param texto: Texto da página
+        :param palavras: Lista de dicionários com 'texto', 'caixa' e 'confianca'
+        :param largura: Largura em pixels da imagem reconhecida
+        :param altura: Altura em pixels da imagem reconhecida
+        """
+        pagina = super().__new__(cls, texto)
+        pagina.palavras = list(palavras)
+        pagina.largura = largura
+        pagina.altura = altura
+        return pagina
+
+def registro_pagina(texto):
+    """
+    Converte o texto de uma página em um valor JSON (usado pelo cache e pelo diário)
+    :return: A própria string ou, para uma TextoPagina, um dicionário com o texto e as palavras
+    """
+    if isinstance(texto, TextoPagina):
+        return {'texto': str(texto), 'palavras': texto.palavras, 'largura': texto.largura, 'altura': texto.altura}
+    return texto
+
+def texto_do_registro(registro):
+    """Reconstrói o texto de uma página gravado por registro_pagina()"""
+    if isinstance(registro, dict):
+        return TextoPagina(registro['texto'], registro.get('palavras', ()), registro.get('largura'),
+                           registro.get('altura'))
+    return registro